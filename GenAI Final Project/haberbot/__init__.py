@@ -0,0 +1,5 @@
+"""HaberBot: Resmi Gazete ve güncel haberler için LangGraph tabanlı ajan sistemi.
+
+Streamlit arayüzü (`app.py`) ve yardımcı komut satırı araçları bu paketteki
+ayarları, grafik tanımını ve paylaşımlı kaynakları kullanır.
+"""
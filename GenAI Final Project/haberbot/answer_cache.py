@@ -0,0 +1,307 @@
+"""`app.invoke` önünde çalışan, diske kalıcı anlamsal cevap önbelleği.
+
+Aynı sorunun farklı ifadeleri için supervisor -> agent -> LLM zincirinin
+tekrar çalışmaması amaçlanır:
+- Normalize edilmiş soru metni birebir eşleşirse embedding hiç hesaplanmaz.
+- Aksi halde bge-m3 soru embedding'i kayıtlı sorularla kosinüs benzerliğiyle
+  karşılaştırılır; eşik aşılırsa kayıtlı cevap döner.
+
+Kayıtlar SQLite'ta tutulur (yeniden başlatmalarda korunur); kaynağa göre TTL
+uygulanır ve kapasite dolunca en uzun süredir kullanılmayan kayıt silinir (LRU).
+"""
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from haberbot import config
+from haberbot.classifier import normalize
+from haberbot.lexical import is_identifier_query
+from haberbot.metadata import parse_query_filters
+from haberbot.telemetry import annotate, log, metrics, span, trace
+
+if TYPE_CHECKING:
+    from haberbot.runtime import Runtime
+
+
+def normalize_question(question: str) -> str:
+    """Birebir eşleşme anahtarı: küçük harf, tek boşluk, sondaki noktalama atılmış."""
+    text = re.sub(r"\s+", " ", normalize(question))
+    return text.rstrip(" ?!.")
+
+
+class AnswerCache:
+    """Soru embedding'ine göre anahtarlanmış, TTL ve LRU destekli cevap önbelleği."""
+
+    def __init__(self, path: str = None, threshold: float = None, max_entries: int = None):
+        self.path = path or config.ANSWER_CACHE_PATH
+        self.threshold = threshold if threshold is not None else config.ANSWER_CACHE_THRESHOLD
+        self.max_entries = max_entries or config.ANSWER_CACHE_MAX_ENTRIES
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS answers (
+            id INTEGER PRIMARY KEY,
+            question_key TEXT UNIQUE,
+            embedding BLOB,
+            answer TEXT,
+            source TEXT,
+            context TEXT,
+            expires_at REAL,
+            last_access REAL,
+            context_ids TEXT)""")
+        if "context_ids" not in {row[1] for row in self._db.execute("PRAGMA table_info(answers)")}:
+            self._db.execute("ALTER TABLE answers ADD COLUMN context_ids TEXT") # Eski önbellek dosyaları
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+        # Anlamsal arama için embedding matrisi bellekte tutulur. İlk `_size` satır geçerlidir;
+        # kayıt eklemek/silmek tabloyu yeniden okumaz (satır sona eklenir, silinen satırın yerine son satır taşınır)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._matrix = None
+        self._size = 0
+        self._row_of = {} # Kayıt ID -> matris satırı
+        self._load_matrix()
+
+    # --- İç yardımcılar ---
+    def _load_matrix(self):
+        rows = self._db.execute("SELECT id, embedding FROM answers WHERE embedding IS NOT NULL").fetchall()
+        self._row_of = {r[0]: i for i, r in enumerate(rows)}
+        self._size = len(rows)
+        if not rows:
+            self._ids, self._matrix = np.empty(0, dtype=np.int64), None
+            return
+        self._ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self._matrix = np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+
+    def _append_row(self, entry_id: int, vec: np.ndarray):
+        if self._matrix is None or (self._size == 0 and self._matrix.shape[1] != vec.shape[0]):
+            self._matrix = np.empty((64, vec.shape[0]), dtype=np.float32)
+            self._ids = np.empty(64, dtype=np.int64)
+        elif self._size == len(self._ids):
+            # Kapasite iki katına çıkarılır; ekleme maliyeti sabit kalır (amortize)
+            self._matrix = np.concatenate([self._matrix, np.empty_like(self._matrix)])
+            self._ids = np.concatenate([self._ids, np.empty_like(self._ids)])
+        self._matrix[self._size] = vec
+        self._ids[self._size] = entry_id
+        self._row_of[entry_id] = self._size
+        self._size += 1
+
+    def _drop_rows(self, entry_ids):
+        for entry_id in entry_ids:
+            row = self._row_of.pop(entry_id, None)
+            if row is None:
+                continue
+            last = self._size - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._row_of[int(self._ids[row])] = row
+            self._size = last
+
+    def _purge_expired(self, now: float):
+        expired = [r[0] for r in self._db.execute("SELECT id FROM answers WHERE expires_at <= ?", (now,))]
+        if expired:
+            self._db.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in expired])
+            self._db.commit()
+            self._drop_rows(expired)
+
+    def _row_to_result(self, row, now: float) -> dict:
+        entry_id, answer, source, context, context_ids = row
+        self._db.execute("UPDATE answers SET last_access = ? WHERE id = ?", (now, entry_id))
+        self._db.commit()
+        return {"answer": answer, "source": source, "context": json.loads(context) if context else None,
+                "context_ids": json.loads(context_ids) if context_ids else None}
+
+    # --- Genel arayüz ---
+    def lookup_exact(self, question: str) -> Optional[dict]:
+        """Normalize edilmiş metin birebir eşleşirse kayıtlı sonucu döndürür (embedding gerekmez)."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, answer, source, context, context_ids FROM answers WHERE question_key = ? AND expires_at > ?",
+                (normalize_question(question), now)).fetchone()
+            if row is None:
+                return None
+            self.hits_exact += 1
+            return self._row_to_result(row, now)
+
+    def lookup_semantic(self, embedding) -> Optional[dict]:
+        """Embedding'e en benzer kayıt eşik üstündeyse sonucunu döndürür."""
+        now = time.time()
+        q = np.asarray(embedding, dtype=np.float32)
+        q = q / (np.linalg.norm(q) + 1e-12)
+        with self._lock:
+            self._purge_expired(now)
+            if self._size == 0 or self._matrix.shape[1] != q.shape[0]:
+                self.misses += 1
+                return None
+            sims = self._matrix[:self._size] @ q
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+            row = self._db.execute("SELECT id, answer, source, context, context_ids FROM answers WHERE id = ?",
+                                   (int(self._ids[best]),)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits_semantic += 1
+            log.info(f"Anlamsal önbellek isabeti (benzerlik: {sims[best]:.3f})")
+            return self._row_to_result(row, now)
+
+    def store(self, question: str, embedding, result: dict):
+        """Grafik sonucunu kaynağına göre TTL ile kaydeder; kapasite aşılırsa LRU ile siler."""
+        source = result.get("source")
+        ttl = config.ANSWER_CACHE_TTL.get(source)
+        if ttl is None or result.get("error"):
+            return # Hatalı veya önbelleğe alınmayacak kaynaklı cevaplar saklanmaz
+        now = time.time()
+        vec = None
+        if embedding is not None:
+            vec = np.asarray(embedding, dtype=np.float32)
+            vec = vec / (np.linalg.norm(vec) + 1e-12)
+        key = normalize_question(question)
+        context, context_ids = result.get("context"), result.get("context_ids")
+        with self._lock:
+            # Aynı soru anahtarındaki eski kayıt REPLACE ile silinir; matristen de çıkarılır
+            removed = [r[0] for r in self._db.execute("SELECT id FROM answers WHERE question_key = ?", (key,))]
+            cursor = self._db.execute(
+                "INSERT OR REPLACE INTO answers (question_key, embedding, answer, source, context, expires_at, last_access, "
+                "context_ids) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, vec.tobytes() if vec is not None else None, result.get("answer"), source,
+                 json.dumps(context, ensure_ascii=False) if context is not None else None, now + ttl, now,
+                 json.dumps(context_ids, ensure_ascii=False) if context_ids is not None else None))
+            entry_id = cursor.lastrowid
+            overflow = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - self.max_entries
+            evicted = []
+            if overflow > 0:
+                evicted = [r[0] for r in self._db.execute(
+                    "SELECT id FROM answers ORDER BY last_access ASC LIMIT ?", (overflow,))]
+                self._db.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in evicted])
+            self._db.commit()
+            self._drop_rows(removed + evicted)
+            if vec is not None and entry_id not in evicted:
+                self._append_row(entry_id, vec)
+
+    def invalidate_source(self, source: str):
+        """Belirli kaynaktan gelen tüm kayıtları siler (ör. indeks değiştiğinde 'Resmi Gazete')."""
+        with self._lock:
+            self._db.execute("DELETE FROM answers WHERE source = ?", (source,))
+            self._db.commit()
+            self._load_matrix()
+
+    def sync_index_fingerprint(self, fingerprint):
+        """ChromaDB indeksi önceki çalıştırmadan farklıysa Resmi Gazete cevaplarını geçersiz kılar."""
+        value = json.dumps(list(fingerprint) if fingerprint else None)
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'index_fingerprint'").fetchone()
+            changed = row is not None and row[0] != value
+            self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('index_fingerprint', ?)", (value,))
+            self._db.commit()
+        if changed:
+            log.info("İndeks değişmiş, önbellekteki Resmi Gazete cevapları siliniyor.")
+            self.invalidate_source("Resmi Gazete")
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        lookups = self.hits_exact + self.hits_semantic + self.misses
+        return {
+            "entries": entries,
+            "hits_exact": self.hits_exact,
+            "hits_semantic": self.hits_semantic,
+            "misses": self.misses,
+            "hit_rate": (self.hits_exact + self.hits_semantic) / lookups if lookups else 0.0,
+        }
+
+
+def cache_lookup(rt: "Runtime", question: str):
+    """Önbellekte soruyu arar; (isabet durumu veya None, soru embedding'i) döndürür.
+
+    Birebir eşleşmede embedding hesaplanmaz ve None döner. Iska durumunda
+    hesaplanan embedding `cache_store` için geri verilir.
+    """
+    cache = rt.answer_cache
+    if cache is None:
+        return None, None
+
+    with span("answer_cache") as attrs:
+        hit = cache.lookup_exact(question)
+        if hit is not None:
+            _record_cache_result(attrs, "exact", hit)
+            return {"question": question, "error": None, "cache_hit": "exact", **hit}, None
+
+        # Kanun/karar numarası içeren sorularda anlamsal eşleşme yanıltıcıdır
+        # ("7524 sayılı" ile "7525 sayılı" neredeyse aynı embedding'e sahip); sadece birebir eşleşme kullanılır.
+        # Tarih veya gazete sayısı içeren sorular da öyle ("Mart 2024 tebliğleri" ile "Nisan 2024 tebliğleri")
+        filters = parse_query_filters(question)
+        if is_identifier_query(question) or filters.date_from is not None or filters.issue is not None:
+            cache.record_miss()
+            _record_cache_result(attrs, "miss")
+            return None, None
+
+        embedding = None
+        try:
+            embedding = rt.embed_query(question)
+            hit = cache.lookup_semantic(embedding)
+            if hit is not None:
+                _record_cache_result(attrs, "semantic", hit)
+                return {"question": question, "error": None, "cache_hit": "semantic", **hit}, embedding
+        except Exception as e:
+            # Embedding alınamazsa önbelleği atlayıp grafiği normal çalıştır
+            log.warning(f"Önbellek araması sırasında embedding hatası: {e}")
+        _record_cache_result(attrs, "miss")
+        return None, embedding
+
+
+def _record_cache_result(attrs: dict, result: str, hit: dict = None):
+    attrs["result"] = result
+    metrics.inc("haberbot_answer_cache_total", result=result)
+    annotate(cache=result, **({"source": hit.get("source")} if hit else {}))
+
+
+def cache_store(rt: "Runtime", question: str, embedding, final_state):
+    """Grafiğin nihai durumunu (önbellek açıksa) kaydeder."""
+    if rt.answer_cache is not None and final_state and isinstance(final_state, dict):
+        rt.answer_cache.store(question, embedding, final_state)
+
+
+def cached_invoke(rt: "Runtime", question: str, invoke_config: dict = None, request_id: str = None) -> dict:
+    """Önbellek varsa önce ona bakar, yoksa grafiği çalıştırıp sonucu kaydeder.
+
+    Dönen sözlük grafiğin nihai durumudur; önbellekten geldiyse `cache_hit`
+    alanı "exact" veya "semantic" olur. İstek izlenir ve `request_id` alanı eklenir.
+    """
+    with trace(question, request_id) as current:
+        hit, embedding = cache_lookup(rt, question)
+        if hit is not None:
+            return {**hit, "request_id": current.request_id}
+        final_state = rt.app.invoke({"question": question}, invoke_config)
+        cache_store(rt, question, embedding, final_state)
+        return {**final_state, "request_id": current.request_id}
+
+
+async def acached_invoke(rt: "Runtime", question: str, invoke_config: dict = None, request_id: str = None) -> dict:
+    """`cached_invoke`'un asenkron sürümü; grafik `ainvoke` ile çalışır (HTTP API için)."""
+    with trace(question, request_id) as current:
+        hit, embedding = await asyncio.to_thread(cache_lookup, rt, question)
+        if hit is not None:
+            return {**hit, "request_id": current.request_id}
+        final_state = await rt.app.ainvoke({"question": question}, invoke_config)
+        await asyncio.to_thread(cache_store, rt, question, embedding, final_state)
+        return {**final_state, "request_id": current.request_id}
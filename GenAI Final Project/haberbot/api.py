@@ -0,0 +1,211 @@
+"""LangGraph iş akışını sunan başsız (headless) asenkron HTTP servisi.
+
+Streamlit dışındaki istemciler (iç araçlar, toplu değerlendirme vb.) ve
+Streamlit'in kendisi (`HABERBOT_API_URL` ayarlıysa) bu servis üzerinden soru
+sorar. Grafik `ainvoke`/`astream` ile çalışır; Ollama'ya giden LLM ve
+embedding çağrıları `haberbot.limits` sınırlayıcılarından geçer. Kapasite
+dolduğunda istek beklemeye alınmak yerine hemen 503 ve `Retry-After` döner.
+
+Uç noktalar:
+    POST /query   {"question": "..."} -> nihai durum (JSON)
+    POST /stream  {"question": "..."} -> NDJSON olay akışı: {"type": "status"|"token"|"final"|"error", "data": ...}
+    POST /context {"ids": [...]} -> {"passages": [...]}: geçmişteki bir cevabın bağlamı
+    GET  /stats, GET /health, POST /reload
+    GET  /metrics -> Prometheus metin formatında metrikler (bkz. `haberbot.telemetry`)
+
+İsteğe `X-Request-ID` başlığı eklenirse iz ve loglar bu kimlikle yazılır;
+yoksa üretilir ve yanıtta (`request_id` alanı, `X-Request-ID` başlığı) döner.
+
+Çalıştırmak için:
+    python -m haberbot.api [--host 0.0.0.0] [--port 8000]
+"""
+import argparse
+import asyncio
+import json
+import uuid
+from contextlib import asynccontextmanager
+from typing import List
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.background import BackgroundTask
+
+from haberbot import config
+from haberbot.answer_cache import acached_invoke
+from haberbot.limits import OverloadedError
+from haberbot.runtime import get_runtime, reload_runtime
+from haberbot.streaming import astream_answer
+from haberbot.telemetry import log, metrics
+
+INVOKE_CONFIG = {"recursion_limit": 5} # Sonsuz döngüleri engellemek için limit (Streamlit ile aynı)
+# İstemciye döndürülen durum alanları (ön getirme Future'ları gibi iç alanlar hariç)
+PUBLIC_FIELDS = ("request_id", "question", "classification", "classification_method", "context", "context_ids",
+                 "answer", "source", "error", "cache_hit")
+RETRY_AFTER_SECONDS = 5
+
+
+class QueryRequest(BaseModel):
+    question: str
+
+
+class ContextRequest(BaseModel):
+    ids: List[str]
+
+
+def public_state(state: dict) -> dict:
+    return {key: state.get(key) for key in PUBLIC_FIELDS}
+
+
+def overloaded_response(message: str) -> JSONResponse:
+    return JSONResponse(status_code=503, headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+                        content={"error": "overloaded", "detail": message})
+
+
+class Admission:
+    """API'nin aynı anda işlediği istek sayısını sınırlar; dolduğunda beklemeden reddeder."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        # Tek event loop üzerinde çalıştığı için kilide gerek yok
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+
+    def releaser(self):
+        """Yalnızca ilk çağrıda slotu bırakan bir fonksiyon döndürür (birden çok yoldan çağrılabilir)."""
+        released = False
+
+        def release_once():
+            nonlocal released
+            if not released:
+                released = True
+                self.release()
+        return release_once
+
+
+admission = Admission(config.API_MAX_INFLIGHT)
+
+
+async def current_runtime():
+    """Paylaşımlı Runtime'ı döndürür; ilk kurulum/yeniden yükleme event loop'u bloklamaz."""
+    try:
+        return await asyncio.to_thread(get_runtime)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Modeller ve indeks ilk istekte değil, servis açılırken yüklenir
+    rt = await asyncio.to_thread(get_runtime)
+    for warning in rt.warnings:
+        log.warning(warning)
+    yield
+
+
+app = FastAPI(title="Haberbot API", lifespan=lifespan)
+
+
+@app.post("/query")
+async def query(request: QueryRequest, x_request_id: str | None = Header(default=None)):
+    request_id = x_request_id or uuid.uuid4().hex[:16]
+    if not admission.try_acquire():
+        return overloaded_response("Sunucu kapasitesi dolu, lütfen biraz sonra tekrar deneyin.")
+    try:
+        rt = await current_runtime()
+        final_state = await acached_invoke(rt, request.question, INVOKE_CONFIG, request_id)
+        return JSONResponse(public_state(final_state), headers={"X-Request-ID": request_id})
+    except OverloadedError as e:
+        return overloaded_response(str(e))
+    finally:
+        admission.release()
+
+
+@app.post("/stream")
+async def stream(request: QueryRequest, x_request_id: str | None = Header(default=None)):
+    request_id = x_request_id or uuid.uuid4().hex[:16]
+    if not admission.try_acquire():
+        return overloaded_response("Sunucu kapasitesi dolu, lütfen biraz sonra tekrar deneyin.")
+    # Gövde hiç okunmazsa (istemci erken koparsa) üreticinin finally'si çalışmaz; slot yanıt bitince
+    # arka plan görevinde de bırakılır. Hangisi önce çalışırsa o bırakır.
+    release = admission.releaser()
+    try:
+        rt = await current_runtime()
+    except HTTPException:
+        release()
+        raise
+
+    async def events():
+        try:
+            async for kind, payload in astream_answer(rt, request.question, INVOKE_CONFIG, request_id):
+                if kind == "final":
+                    payload = public_state(payload)
+                yield json.dumps({"type": kind, "data": payload}, ensure_ascii=False) + "\n"
+        except OverloadedError as e:
+            # Akış başladıktan sonra durum kodu değiştirilemez; hata olay olarak gönderilir
+            yield json.dumps({"type": "error", "data": {"error": "overloaded", "detail": str(e)}}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            log.error(f"Akış sırasında: {e}")
+            yield json.dumps({"type": "error", "data": {"error": "internal", "detail": str(e)}}, ensure_ascii=False) + "\n"
+        finally:
+            release()
+
+    return StreamingResponse(events(), media_type="application/x-ndjson", headers={"X-Request-ID": request_id},
+                             background=BackgroundTask(release))
+
+
+@app.get("/stats")
+async def stats():
+    rt = await current_runtime()
+    return {**rt.stats(), "api": {"in_flight": admission.in_flight, "max_in_flight": admission.limit,
+                                  "rejected": admission.rejected}}
+
+
+@app.post("/context")
+async def context(request: ContextRequest):
+    """Chunk ID'lerinden RAG bağlamını yeniden oluşturur (arayüz geçmişte sadece ID saklar)."""
+    rt = await current_runtime()
+    return {"passages": await asyncio.to_thread(rt.fetch_context, request.ids)}
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.post("/reload")
+async def reload():
+    try:
+        rt = await asyncio.to_thread(reload_runtime)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    return {"startup_seconds": rt.startup_seconds, "warnings": rt.warnings}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Haberbot HTTP API")
+    parser.add_argument("--host", default=config.API_HOST)
+    parser.add_argument("--port", type=int, default=config.API_PORT)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
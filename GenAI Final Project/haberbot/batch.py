@@ -0,0 +1,255 @@
+"""Soru dosyasını toplu olarak çalıştıran değerlendirme modu (QA regresyon koşuları).
+
+Soruları tek tek `app.invoke` ile çalıştırmak her soru için ayrı embedding
+çağrısı, ayrı Chroma sorgusu ve art arda LLM üretimi demektir; yüzlerce
+soruluk bir koşu saatler sürer. Bu modül:
+- Tüm soruları tek toplu çağrıda embed eder (`CachedEmbeddings.embed_queries`;
+  Ollama'da tek `/api/embed` isteği); vektörler koşuya ait ayrı bir önbelleğe
+  yazılır, grafikteki ön sınıflandırıcı tekrar embed etmez,
+- Ön sınıflandırıcının Resmi Gazete dışı dediği sorular hariç, aynı metadata
+  filtresini kullanan soruları tek `collection.query(query_embeddings=[...])`
+  çağrısında arar (`Runtime.retrieve_batch`),
+- Grafiği `BATCH_WORKERS` thread'lik bir havuzda çalıştırır; hazır retrieval
+  sonuçları grafiğe ön getirme olarak verilir (`BatchPrefetcher`), LLM
+  çağrıları yine `LLM_MAX_CONCURRENCY` sınırlayıcısından geçer,
+- Her soru için cevap, kaynak, bağlam chunk ID'leri ve aşama sürelerini girdi
+  sırasıyla JSON lines olarak yazar.
+
+Cevap önbelleği kullanılmaz; regresyon koşusu her soruyu yeniden üretir.
+
+Kullanım (GenAI Final Project klasöründen):
+    python -m haberbot.batch sorular.jsonl --out sonuclar.jsonl [--workers 4]
+
+Girdi her satırda bir soru içeren .txt veya "question" alanı olan .jsonl
+olabilir; .jsonl'deki diğer alanlar (id, beklenen etiket vb.) çıktıya aynen
+kopyalanır.
+"""
+import argparse
+import dataclasses
+import json
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.documents import Document
+
+from haberbot import config
+from haberbot.eval_classifier import load_questions
+from haberbot.graph import build_workflow
+from haberbot.limits import OverloadedError
+from haberbot.prefetch import Prefetcher
+from haberbot.runtime import CachedEmbeddings
+from haberbot.telemetry import log, trace
+
+INVOKE_CONFIG = {"recursion_limit": 5} # Sonsuz döngüleri engellemek için limit (Streamlit ile aynı)
+RETRY_SECONDS = 5 # OverloadedError sonrası ilk bekleme; her denemede artar
+RESULT_FIELDS = ("classification", "classification_method", "source", "answer", "context_ids", "error")
+
+
+class BatchPrefetcher(Prefetcher):
+    """Toplu aşamada hesaplanan retrieval sonuçlarını grafiğe tamamlanmış Future olarak verir.
+
+    Diğer türler (ör. "news") normal ön getirme gibi başlatılır. Sonucu olmayan
+    bir soru Resmi Gazete'ye yönlenirse RAG düğümü aramayı kendisi yapar.
+    """
+
+    def __init__(self, results: Dict[str, List[Document]], kinds=None):
+        kinds = set(kinds if kinds is not None else config.SPECULATIVE_PREFETCH)
+        super().__init__(kinds - {"retrieval"})
+        self.results = results
+
+    def start(self, question: str, rt) -> Dict[str, Future]:
+        futures = super().start(question, rt)
+        docs = self.results.get(question)
+        if docs is not None:
+            futures["retrieval"] = Future()
+            futures["retrieval"].set_result(docs)
+            with self._lock:
+                self.stats["started"] += 1
+        return futures
+
+
+def load_records(path: str) -> List[dict]:
+    """Soru kayıtlarını okur; .txt satırları {"question": ...} kaydına çevrilir."""
+    if not path.endswith(".jsonl"):
+        return [{"question": question} for question in load_questions(path)]
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def needs_retrieval(rt, question: str) -> bool:
+    """Ön sınıflandırıcı soruyu Resmi Gazete dışına yönlendirmiyorsa arama yapılır."""
+    if rt.classifier is None:
+        return True
+    prediction = rt.classifier.classify(question)
+    return prediction is None or prediction.label == "resmi_gazete"
+
+
+def prepare(rt, questions: List[str]) -> dict:
+    """Soruları toplu embed eder ve Resmi Gazete'ye gidecek olanları toplu arar.
+
+    Tekil soru -> retrieval sonucu sözlüğü ve aşama süreleri döndürür.
+    """
+    unique = list(dict.fromkeys(questions))
+    timings = {}
+
+    t0 = time.perf_counter()
+    vectors = rt.embeddings.embed_queries(unique)
+    timings["embed"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    selected = [i for i, question in enumerate(unique) if needs_retrieval(rt, question)]
+    timings["classify"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    results = {}
+    if selected and rt.retriever is not None:
+        found = rt.retrieve_batch([unique[i] for i in selected], [vectors[i] for i in selected])
+        results = {unique[i]: docs for i, docs in zip(selected, found)}
+    timings["retrieve"] = time.perf_counter() - t0
+    log.info(f"Toplu hazırlık: {len(unique)} soru embed edildi ({timings['embed']:.2f} s), "
+             f"{len(results)} soru için arama yapıldı ({timings['retrieve']:.2f} s)")
+    return {"unique": len(unique), "retrieved": len(results), "results": results, "timings": timings}
+
+
+def run_one(batch_rt, record: dict, started_at: float) -> dict:
+    """Tek soruyu grafikte çalıştırır; OverloadedError'da bekleyip yeniden dener.
+
+    `graph` ve `spans_ms` son denemeye aittir; önceki denemelerin süreleri
+    `attempts_ms`'te, aradaki beklemeler `retry_wait`'te ayrıca raporlanır.
+    """
+    question = record["question"]
+    queue_seconds = time.perf_counter() - started_at
+    state, spans, request_id = {}, defaultdict(float), None
+    attempts_ms, wait_seconds = [], 0.0
+    for attempt in range(config.BATCH_RETRIES + 1):
+        t0 = time.perf_counter()
+        try:
+            with trace(question) as current:
+                request_id = current.request_id
+                state = batch_rt.app.invoke({"question": question}, INVOKE_CONFIG)
+            break
+        except OverloadedError as e:
+            if attempt == config.BATCH_RETRIES:
+                state = {"error": f"overloaded: {e}"}
+            else:
+                attempts_ms.append(round((time.perf_counter() - t0) * 1000, 2))
+                log.warning(f"Sınırlayıcı kuyruğu dolu, {RETRY_SECONDS * (attempt + 1)} s sonra yeniden denenecek.")
+                time.sleep(RETRY_SECONDS * (attempt + 1))
+                wait_seconds += RETRY_SECONDS * (attempt + 1)
+        except Exception as e:
+            # Tek bir sorunun hatası koşuyu durdurmaz; satıra yazılır
+            log.error(f"Toplu değerlendirmede soru çalıştırılırken: {e}")
+            state = {"error": f"{type(e).__name__}: {e}"}
+            break
+    graph_ms = round((time.perf_counter() - t0) * 1000, 2)
+    for item in current.spans:
+        spans[item["name"]] += item["duration_ms"]
+    return {
+        **record,
+        "request_id": request_id,
+        **{key: state.get(key) for key in RESULT_FIELDS},
+        "timings_ms": {"queue": round(queue_seconds * 1000, 2), "graph": graph_ms,
+                       "retry_wait": round(wait_seconds * 1000, 2)},
+        "attempts_ms": attempts_ms + [graph_ms],
+        "spans_ms": {name: round(ms, 2) for name, ms in spans.items()},
+    }
+
+
+def batch_runtime(rt, questions: List[str]):
+    """Koşuya ait Runtime kopyası: ayrı soru embedding önbelleği, cevap önbelleği yok.
+
+    Önbellek tüm tekil soruları tutacak kadar büyüktür; paylaşımlı önbelleğin
+    boyutu ve içeriği (uygulama aynı süreçte çalışıyorsa) değişmez.
+    """
+    embeddings = rt.embeddings
+    if isinstance(embeddings, CachedEmbeddings):
+        embeddings = CachedEmbeddings(embeddings.base, max_size=max(embeddings.max_size, len(set(questions))))
+    batch_rt = dataclasses.replace(rt, embeddings=embeddings, prefetcher=None, answer_cache=None)
+    if rt.classifier is not None:
+        batch_rt.classifier = rt.classifier.with_runtime(batch_rt)
+    return batch_rt
+
+
+def run_batch(rt, records: List[dict], out_path: str, workers: int = None) -> dict:
+    """Kayıtları toplu hazırlık + thread havuzuyla çalıştırır, sonuçları `out_path`'e JSONL yazar."""
+    workers = workers or config.BATCH_WORKERS
+    questions = [record["question"] for record in records]
+
+    t_start = time.perf_counter()
+    batch_rt = batch_runtime(rt, questions)
+    prepared = prepare(batch_rt, questions)
+    batch_rt.prefetcher = BatchPrefetcher(prepared["results"])
+    batch_rt.app = build_workflow(batch_rt).compile()
+    # Toplu aşamaların süresi soru başına paylaştırılır (tek çağrı tüm sorulara hizmet eder);
+    # arama süresi sadece aranan sorulara düşer
+    timings = prepared["timings"]
+    shared_ms = {stage: round(timings[stage] * 1000 / max(len(questions), 1), 2) for stage in ("embed", "classify")}
+    retrieve_ms = round(timings["retrieve"] * 1000 / max(prepared["retrieved"], 1), 2)
+
+    sources, errors, graph_ms = Counter(), 0, []
+    started_at = time.perf_counter()
+    try:
+        with open(out_path, "w", encoding="utf-8") as f, \
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+            # `map` sonuçları girdi sırasıyla verir; havuz arkada sonraki soruları işlemeye devam eder
+            rows = pool.map(lambda record: run_one(batch_rt, record, started_at), records)
+            for index, row in enumerate(rows):
+                retrieved = row["question"] in prepared["results"]
+                row = {"index": index, **row,
+                       "timings_ms": {**shared_ms, "retrieve": retrieve_ms if retrieved else 0.0, **row["timings_ms"]}}
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                f.flush()
+                sources[row.get("source") or "Hata"] += 1
+                errors += row.get("error") is not None
+                graph_ms.append(row["timings_ms"]["graph"])
+    finally:
+        batch_rt.prefetcher.shutdown()
+
+    seconds = time.perf_counter() - t_start
+    summary = {
+        "questions": len(records),
+        "unique_questions": prepared["unique"],
+        "retrieved": prepared["retrieved"],
+        "workers": workers,
+        "seconds": seconds,
+        "questions_per_second": len(records) / seconds if seconds else 0.0,
+        "stage_seconds": prepared["timings"],
+        "graph_p50_ms": float(np.percentile(graph_ms, 50)) if graph_ms else None,
+        "graph_p95_ms": float(np.percentile(graph_ms, 95)) if graph_ms else None,
+        "sources": dict(sources),
+        "errors": errors,
+        "prefetch": dict(batch_rt.prefetcher.stats),
+    }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soru dosyasını toplu çalıştırır, sonuçları JSON lines olarak yazar.")
+    parser.add_argument("questions", help="Soru dosyası (.txt veya .jsonl)")
+    parser.add_argument("--out", default="batch_results.jsonl", help="Sonuçların yazılacağı .jsonl dosyası")
+    parser.add_argument("--workers", type=int, default=config.BATCH_WORKERS,
+                        help="Grafiği çalıştıran thread sayısı (LLM eşzamanlılığı LLM_MAX_CONCURRENCY ile sınırlı)")
+    args = parser.parse_args()
+
+    from haberbot.runtime import get_runtime
+    rt = get_runtime(auto_reload=False)
+    for warning in rt.warnings:
+        log.warning(warning)
+    records = load_records(args.questions)
+    summary = run_batch(rt, records, args.out, args.workers)
+
+    stages = summary["stage_seconds"]
+    print(f"\n{summary['questions']} soru {summary['seconds']:.1f} saniyede çalıştırıldı "
+          f"({summary['questions_per_second']:.2f} soru/s, {summary['workers']} thread) -> {args.out}")
+    print(f"   embed: {summary['unique_questions']} soru tek çağrıda, {stages['embed']:.2f} s")
+    print(f"   retrieve: {summary['retrieved']} soru toplu arandı, {stages['retrieve']:.2f} s")
+    if summary["graph_p50_ms"] is not None:
+        print(f"   graph: p50 {summary['graph_p50_ms']:.0f} ms | p95 {summary['graph_p95_ms']:.0f} ms")
+    print(f"   Kaynaklar: {', '.join(f'{k}: {v}' for k, v in summary['sources'].items())} | Hata: {summary['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""Ollama, ChromaDB klasörü ve NewsData.io anahtarı olmadan çalışan benchmark.
+
+Üretimdeki `StateGraph` (`build_runtime` ile, aynı sınırlayıcı ve önbellek
+sarmalayıcılarıyla) deterministik yedeklerle kurulur:
+- `FakeChatOllama`: ayarlanabilir ilk token gecikmesi ve token hızıyla
+  `<think>` bölümlü cevap akıtır; sınıflandırma prompt'una beklenen etiketi
+  bilmeden, sabit bir etiketle biten serbest metinle cevap verir,
+- `FakeEmbeddings`: token hash'lerinden deterministik vektör,
+- Geçici klasörde sentetik Resmi Gazete belgelerinden kurulan Chroma
+  koleksiyonu ve BM25 indeksi,
+- `NewsStubServer` + gerçek `NewsClient` (HTTP yolu da ölçülür).
+
+Soru korpusu `app.invoke` ile farklı eşzamanlılık seviyelerinde tekrar
+oynatılır; uçtan uca ve düğüm başına p50/p95/p99 gecikme, verim (istek/sn),
+yönlendirme doğruluğu ve prompt/bağlam boyutları JSON'a yazılır. Varsayılan
+korpus ön sınıflandırıcının örneklerinden (`LABELLED_EXAMPLES`) ayrı
+tutulmuş sorulardır; yönlendirme doğruluğu sınıflandırma yöntemine göre de
+raporlanır (sahte LLM'in payı "llm" satırında sabit etiketin isabetidir).
+`--compare` ile önceki bir sonuca göre gerileme varsa çıkış kodu 1 olur.
+
+Kullanım (GenAI Final Project klasöründen):
+    python -m haberbot.bench --concurrency 1,4,8 --out bench.json
+    python -m haberbot.bench --compare bench.json --tolerance 0.2
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from haberbot import config
+from haberbot.eval_classifier import load_questions
+from haberbot.lexical import tokenize
+from haberbot.telemetry import log
+
+# Deterministik cevap metni için kelime havuzu
+_WORDS = ("Resmi", "Gazete'de", "yayımlanan", "karar", "uyarınca", "ilgili", "kurum", "tarafından",
+          "düzenleme", "yürürlüğe", "girmiştir", "ve", "madde", "kapsamında", "belirtilmiştir.")
+
+# Korpus verilmezse kullanılan etiketli sorular. Ön sınıflandırıcının merkezlerini kuran
+# `classifier.LABELLED_EXAMPLES` ile kesişmez; aksi halde doğruluk ezberi ölçer
+DEFAULT_CORPUS = [
+    {"question": "7524 sayılı Kanun ile hangi değişiklikler yapıldı?", "label": "resmi_gazete"},
+    {"question": "2024/123 sayılı Cumhurbaşkanı Kararı neyi düzenliyor?", "label": "resmi_gazete"},
+    {"question": "Enerji Piyasası Düzenleme Kurumu yönetmeliği ne zaman yayımlandı?", "label": "resmi_gazete"},
+    {"question": "Sermaye Piyasası Kurulu'nun yeni tebliği neyi değiştiriyor?", "label": "resmi_gazete"},
+    {"question": "Milli Eğitim Bakanlığı hangi okullar için kiralama ihalesi açtı?", "label": "resmi_gazete"},
+    {"question": "Sağlık Bakanlığı yönetmeliğinde hasta hakları maddesi değişti mi?", "label": "resmi_gazete"},
+    {"question": "Bu ay hangi valiler görevden alındı ve yerlerine kim atandı?", "label": "resmi_gazete"},
+    {"question": "Orman arazilerinin satışıyla ilgili ilan var mı?", "label": "resmi_gazete"},
+    {"question": "Gelir vergisi genel tebliğinde istisna tutarları ne oldu?", "label": "resmi_gazete"},
+    {"question": "Bu hafta hangi filmler vizyona girdi?", "label": "general"},
+    {"question": "Euro bugün ne kadar?", "label": "general"},
+    {"question": "İstanbul'da trafik neden bu kadar yoğun?", "label": "general"},
+    {"question": "Fenerbahçe'nin yeni teknik direktörü kim oldu?", "label": "general"},
+    {"question": "Kuantum bilgisayar nasıl çalışır?", "label": "general"},
+    {"question": "Seçim sonuçları ne zaman açıklanacak?", "label": "general"},
+    {"question": "Ankara'da bu akşam yağmur yağacak mı?", "label": "general"},
+    {"question": "qwerty zxcv", "label": "irrelevant"},
+    {"question": "bulut neden mor düşünür", "label": "irrelevant"},
+    {"question": "peki", "label": "irrelevant"},
+    {"question": "masa bana ne dedi?", "label": "irrelevant"},
+]
+
+_INSTITUTIONS = ("Enerji Piyasası Düzenleme Kurumu", "Hazine ve Maliye Bakanlığı", "Milli Eğitim Bakanlığı",
+                 "Sağlık Bakanlığı", "Karayolları Genel Müdürlüğü", "Gümrük ve Ticaret Bakanlığı",
+                 "Yükseköğretim Kurulu", "Sermaye Piyasası Kurulu")
+_KINDS = ("Yönetmelik", "Tebliğ", "Cumhurbaşkanı Kararı", "Genelge", "İlan")
+_TOPICS = ("ihale", "kiralama", "atama", "kamulaştırma", "vergi", "gümrük", "lisans", "bütçe", "öğretim üyesi alımı")
+
+
+class FakeChatOllama(BaseChatModel):
+    """Ollama'nın yerine geçen deterministik sohbet modeli.
+
+    Sınıflandırma prompt'unda beklenen etiketi bilmez: diğer kategorileri de
+    anan ve `classify_label` ile biten serbest bir analiz yazar; etiket
+    `llm_classify`'ın ayrıştırmasıyla çıkarılır. Diğer prompt'larda
+    `answer_tokens` kelimelik, başında `<think>` bölümü olan bir cevapla yanıt
+    verir. Gecikme: `first_token_latency` + token başına 1/`tokens_per_second`.
+    """
+    first_token_latency: float = 0.2
+    tokens_per_second: float = 50.0
+    answer_tokens: int = 60
+    think_tokens: int = 10
+    classify_label: str = "general"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-ollama"
+
+    def _tokens(self, prompt: str) -> List[str]:
+        if "Analiz ve Kategori:" in prompt:
+            others = [label for label in ("resmi_gazete", "general", "irrelevant") if label != self.classify_label]
+            return ["Soru ", f"{others[0]} ", "veya ", f"{others[1]} ", "gibi ", "görünmüyor; ", "kategori: ",
+                    f"**{self.classify_label.upper()}**."]
+        rng = random.Random(hashlib.md5(prompt.encode("utf-8")).hexdigest())
+        think = ["<think>"] + [rng.choice(_WORDS) + " " for _ in range(self.think_tokens)] + ["</think>\n\n"]
+        return think + [rng.choice(_WORDS) + " " for _ in range(self.answer_tokens)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        tokens = self._tokens(messages[-1].content)
+        time.sleep(self.first_token_latency + len(tokens) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency)
+        for token in self._tokens(messages[-1].content):
+            time.sleep(1.0 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class FakeEmbeddings(Embeddings):
+    """Token hash'lerinden deterministik, birim uzunlukta vektör üretir (sözcüksel benzerlik ~ kosinüs)."""
+
+    def __init__(self, dim: int = 256, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in tokenize(text) or [text]:
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            vec[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        # Toplu çağrı: gecikme istek başına bir kez
+        return self.embed_documents(texts)
+
+
+def synthetic_documents(count: int, seed: int = 0) -> Dict[str, str]:
+    """Resmi Gazete'ye benzeyen (kurum, tür, sayı, tarih, maddeler) sentetik belgeler üretir."""
+    rng = random.Random(seed)
+    documents = {}
+    for i in range(count):
+        institution, kind, topic = rng.choice(_INSTITUTIONS), rng.choice(_KINDS), rng.choice(_TOPICS)
+        date = f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(2020, 2024)}"
+        law_no = rng.randint(7000, 7600)
+        articles = []
+        for madde in range(1, rng.randint(4, 9)):
+            sentence = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(25, 60)))
+            articles.append(f"MADDE {madde} – (1) {institution} {topic} işlemleri {law_no} sayılı Kanun uyarınca "
+                            f"yürütülür. {sentence}")
+        documents[f"rg_{i:04d}.txt"] = (f"T.C. Resmî Gazete\nTarih: {date} Sayı: {32000 + i}\n{kind.upper()}\n"
+                                        f"{institution}\n{topic.capitalize()} Hakkında {kind}\n\n" + "\n\n".join(articles))
+    return documents
+
+
+def build_collection(chroma_path: str, embeddings: Embeddings, documents: Dict[str, str]) -> int:
+    """Belgeleri ingest ile aynı şekilde böler, Chroma'ya yazar ve BM25 indeksini kurar; chunk sayısını döndürür."""
+    import chromadb
+    from haberbot import lexical
+    from haberbot.ingest import make_splitter, split_file
+
+    data_dir = os.path.join(chroma_path, "_data")
+    os.makedirs(data_dir, exist_ok=True)
+    splitter = make_splitter()
+    client = chromadb.PersistentClient(path=chroma_path)
+    collection = client.get_or_create_collection(name=config.CHROMA_COLLECTION_NAME)
+    total = 0
+    for name, text in documents.items():
+        path = os.path.join(data_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        chunks = split_file(path, splitter, name)
+        ids, texts, metadatas = zip(*chunks)
+        collection.upsert(ids=list(ids), documents=list(texts), metadatas=list(metadatas),
+                          embeddings=embeddings.embed_documents(list(texts)))
+        total += len(chunks)
+    lexical.build_from_collection(collection, chroma_path)
+    return total
+
+
+class NodeTimer(BaseCallbackHandler):
+    """LangGraph düğüm çalışmalarının sürelerini ve LLM'e giden prompt boyutlarını toplar."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = {}
+        self.durations = defaultdict(list)  # düğüm -> [saniye]
+        self.prompt_chars = defaultdict(list)  # düğüm -> [karakter]
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        # Düğümün kendi çalışması (içindeki alt zincirler değil)
+        if node and kwargs.get("name") == node:
+            with self._lock:
+                self._started[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        with self._lock:
+            item = self._started.pop(run_id, None)
+            if item is not None:
+                self.durations[item[0]].append(time.perf_counter() - item[1])
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.on_chain_end(None, run_id=run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node", "?")
+        with self._lock:
+            self.prompt_chars[node].append(sum(len(m.content) for batch in messages for m in batch))
+
+
+def summarize(values: List[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    arr = np.asarray(values) * 1000
+    return {"count": len(values), "mean_ms": float(arr.mean()), "p50_ms": float(np.percentile(arr, 50)),
+            "p95_ms": float(np.percentile(arr, 95)), "p99_ms": float(np.percentile(arr, 99))}
+
+
+def accuracy_by_method(routed) -> dict:
+    """Etiketli soruların yönlendirme doğruluğu, sınıflandırma yöntemine (rules/embedding/llm) göre."""
+    by_method = defaultdict(list)
+    for item, state in routed:
+        by_method[state.get("classification_method")].append(state.get("classification") == item["label"])
+    return {str(method): sum(hits) / len(hits) for method, hits in sorted(by_method.items(), key=str)}
+
+
+def run_level(rt, corpus: List[dict], concurrency: int, repeat: int) -> dict:
+    """Korpusu `concurrency` thread ile `repeat` kez oynatır."""
+    timer = NodeTimer()
+    requests = [item for _ in range(repeat) for item in corpus]
+    results = []
+    lock = threading.Lock()
+
+    def one(item):
+        t0 = time.perf_counter()
+        try:
+            state = rt.app.invoke({"question": item["question"]}, {"recursion_limit": 5, "callbacks": [timer]})
+            error = state.get("error")
+        except Exception as e:
+            state, error = {}, str(e)
+        elapsed = time.perf_counter() - t0
+        with lock:
+            results.append((item, state, elapsed, error))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, requests))
+    wall = time.perf_counter() - started
+
+    routed = [(item, state) for item, state, _, _ in results if item.get("label")]
+    contexts = [state["context"] for _, state, _, _ in results if state.get("context")]
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "errors": sum(1 for *_, error in results if error),
+        "wall_seconds": wall,
+        "throughput_rps": len(results) / wall if wall else 0.0,
+        "end_to_end": summarize([elapsed for _, _, elapsed, _ in results]),
+        "nodes": {node: summarize(values) for node, values in sorted(timer.durations.items())},
+        "routing": {
+            "accuracy": (sum(1 for item, state in routed if state.get("classification") == item["label"]) / len(routed)
+                         if routed else None),
+            "by_method": dict(Counter(state.get("classification_method") for _, state, _, _ in results)),
+            "accuracy_by_method": accuracy_by_method(routed),
+            "mismatches": sorted({f"{item['question']} ({item['label']}->{state.get('classification')})"
+                                  for item, state in routed if state.get("classification") != item["label"]}),
+        },
+        "retrieval": {
+            "avg_passages": float(np.mean([len(c) for c in contexts])) if contexts else 0.0,
+            "avg_context_chars": float(np.mean([sum(map(len, c)) for c in contexts])) if contexts else 0.0,
+        },
+        "prompt_chars": {node: float(np.mean(values)) for node, values in sorted(timer.prompt_chars.items())},
+    }
+
+
+def build_bench_runtime(args, workdir: str, stub_url: str):
+    """Sahte modellerle, üretimdekiyle aynı `build_runtime` yolundan Runtime kurar."""
+    from haberbot.runtime import build_runtime
+
+    embeddings = FakeEmbeddings(latency=args.embed_latency)
+    chunks = build_collection(workdir, embeddings, synthetic_documents(args.docs, args.seed))
+
+    config.CHROMA_DB_PATH = workdir
+    config.VECTOR_BACKEND = args.vector_backend
+    if args.vector_backend == "mmap":
+        import chromadb
+        from haberbot import vectors
+        collection = chromadb.PersistentClient(path=workdir).get_collection(name=config.CHROMA_COLLECTION_NAME)
+        vectors.export_collection(collection, workdir, args.vector_dtype)
+    config.NEWSDATA_API_KEY = "bench"
+    config.NEWSDATA_BASE_URL = stub_url
+    config.ANSWER_CACHE_ENABLED = args.with_cache
+    config.ANSWER_CACHE_PATH = os.path.join(workdir, "answer_cache.sqlite3")
+    config.LLM_MAX_CONCURRENCY = args.llm_slots
+    config.LLM_MAX_QUEUE = max(args.levels) * 2 # Benchmark reddedilen isteği değil gecikmeyi ölçer
+    config.EMBED_MAX_QUEUE = max(args.levels) * 4
+    config.TRACE_PATH = os.path.join(workdir, "traces.jsonl")
+    config.PRECLASSIFIER_EMBED_MARGIN = getattr(args, "embed_margin", config.PRECLASSIFIER_EMBED_MARGIN)
+
+    llm = FakeChatOllama(first_token_latency=args.llm_latency, tokens_per_second=args.tokens_per_second,
+                         answer_tokens=args.answer_tokens)
+    return build_runtime(embeddings=embeddings, llm=llm), chunks
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float = 10.0) -> List[str]:
+    """Önceki sonuca göre gerilemeleri listeler (gecikme/prompt artışı, yönlendirme düşüşü).
+
+    `min_delta_ms`'den küçük gecikme farkları (ör. 4 ms -> 7 ms) gürültü sayılır.
+    """
+    regressions = []
+
+    def check(name, new, old, higher_is_worse=True, min_delta=0.0):
+        if new is None or old is None or old == 0 or abs(new - old) < min_delta:
+            return
+        change = (new - old) / old
+        if (change > tolerance) if higher_is_worse else (change < -tolerance):
+            regressions.append(f"{name}: {old:.1f} -> {new:.1f} ({change:+.0%})")
+
+    old_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    for level in current["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if old is None:
+            continue
+        prefix = f"c={level['concurrency']}"
+        for key in ("p50_ms", "p95_ms"):
+            check(f"{prefix} uçtan uca {key}", level["end_to_end"].get(key), old["end_to_end"].get(key),
+                  min_delta=min_delta_ms)
+        for node, stats in level["nodes"].items():
+            check(f"{prefix} {node} p95_ms", stats.get("p95_ms"), old["nodes"].get(node, {}).get("p95_ms"),
+                  min_delta=min_delta_ms)
+        check(f"{prefix} verim (istek/sn)", level["throughput_rps"], old["throughput_rps"], higher_is_worse=False)
+        for node, chars in level["prompt_chars"].items():
+            check(f"{prefix} {node} prompt karakteri", chars, old["prompt_chars"].get(node))
+        new_acc, old_acc = level["routing"]["accuracy"], old["routing"]["accuracy"]
+        if new_acc is not None and old_acc is not None and new_acc < old_acc:
+            regressions.append(f"{prefix} yönlendirme doğruluğu: {old_acc:.2%} -> {new_acc:.2%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sahte modellerle çevrimdışı HaberBot benchmark'ı")
+    parser.add_argument("--questions", help="Soru korpusu (.txt veya 'question'/'label' alanlı .jsonl); varsayılan yerleşik korpus")
+    parser.add_argument("--concurrency", default="1,4,8", help="Virgülle ayrılmış eşzamanlılık seviyeleri")
+    parser.add_argument("--repeat", type=int, default=1, help="Korpusun her seviyede kaç kez oynatılacağı")
+    parser.add_argument("--docs", type=int, default=200, help="Sentetik Resmi Gazete belgesi sayısı")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="LLM ilk token gecikmesi (sn)")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--llm-slots", type=int, default=config.LLM_MAX_CONCURRENCY,
+                        help="Aynı anda çalışabilecek LLM çağrısı (Ollama OLLAMA_NUM_PARALLEL karşılığı)")
+    parser.add_argument("--embed-latency", type=float, default=0.01, help="Embedding çağrısı gecikmesi (sn)")
+    parser.add_argument("--embed-margin", type=float, default=0.25,
+                        help="Ön sınıflandırıcı embedding marjı; hash tabanlı sahte embedding'lerde ilgisiz "
+                             "sorular bile ~0.2 fark üretir, bu yüzden üretimdekinden yüksek tutulur")
+    parser.add_argument("--news-latency", type=float, default=0.1, help="Sahte NewsData.io yanıt gecikmesi (sn)")
+    parser.add_argument("--vector-backend", choices=["chroma", "mmap"], default="chroma",
+                        help="Vektör araması: Chroma veya dışa aktarılmış mmap indeksi (bkz. haberbot.vectors)")
+    parser.add_argument("--vector-dtype", choices=["float16", "int8"], default=config.VECTOR_DTYPE)
+    parser.add_argument("--with-cache", action="store_true", help="Cevap önbelleğini açık bırak (varsayılan kapalı)")
+    parser.add_argument("--out", help="Sonuçların yazılacağı JSON dosyası")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki sonuç JSON'u")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Gerileme sayılacak göreli değişim")
+    parser.add_argument("--min-delta-ms", type=float, default=10.0, help="Bundan küçük gecikme farkları yok sayılır")
+    parser.add_argument("--verbose", action="store_true", help="Düğümlerin konsol çıktısını gizleme")
+    args = parser.parse_args()
+
+    if args.questions:
+        if args.questions.endswith(".jsonl"):
+            with open(args.questions, "r", encoding="utf-8") as f:
+                corpus = [json.loads(line) for line in f if line.strip()]
+        else:
+            corpus = [{"question": q} for q in load_questions(args.questions)]
+    else:
+        corpus = DEFAULT_CORPUS
+    args.levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    from haberbot.news_stub import NewsStubServer
+
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    if not args.verbose:
+        log.setLevel("WARNING") # Düğüm logları da stderr'e yazılır
+    with tempfile.TemporaryDirectory(prefix="haberbot-bench-") as workdir, \
+            NewsStubServer(latency=args.news_latency) as stub_url:
+        with quiet:
+            rt, chunks = build_bench_runtime(args, workdir, stub_url)
+            rt.app.invoke({"question": corpus[0]["question"]}, {"recursion_limit": 5}) # Isınma (merkezler, bağlantılar)
+        levels = []
+        for concurrency in args.levels:
+            with quiet:
+                level = run_level(rt, corpus, concurrency, args.repeat)
+            levels.append(level)
+            e2e = level["end_to_end"]
+            print(f"c={concurrency:<3} {level['requests']} istek | {level['throughput_rps']:.2f} istek/sn | "
+                  f"p50 {e2e['p50_ms']:.0f} ms | p95 {e2e['p95_ms']:.0f} ms | p99 {e2e['p99_ms']:.0f} ms | "
+                  f"hata {level['errors']}")
+            for node, stats in level["nodes"].items():
+                print(f"      {node:<20} p50 {stats['p50_ms']:.0f} ms | p95 {stats['p95_ms']:.0f} ms")
+        if rt.prefetcher is not None:
+            rt.prefetcher.shutdown()
+
+    result = {
+        "settings": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "verbose")},
+        "corpus": {"questions": len(corpus), "labelled": sum(1 for item in corpus if item.get("label")),
+                   "documents": args.docs, "chunks": chunks},
+        "levels": levels,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Sonuçlar yazıldı: {args.out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("GERİLEME:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"Önceki sonuca göre gerileme yok (tolerans {args.tolerance:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
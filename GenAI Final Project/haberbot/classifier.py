@@ -0,0 +1,164 @@
+"""Supervisor'ın önündeki hızlı, LLM kullanmayan ön sınıflandırıcı.
+
+İki kademe çalışır:
+1. Anahtar kelime / regex kuralları (Resmi Gazete terminolojisi, anlamsız girdi).
+2. bge-m3 soru embedding'inin etiketli örnek soruların merkezlerine (centroid)
+   kosinüs benzerliği.
+
+Hiçbir kademe yeterince emin değilse `None` döner ve `classify_question_node`
+LLM ile sınıflandırmaya düşer.
+"""
+import copy
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, NamedTuple, Optional
+
+import numpy as np
+
+from haberbot import config
+from haberbot.telemetry import log
+
+if TYPE_CHECKING:
+    from haberbot.runtime import Runtime
+
+
+class Prediction(NamedTuple):
+    label: str          # "resmi_gazete", "general" veya "irrelevant"
+    confidence: float   # [0, 1]; kurallar için eşleşen güçlü terim sayısından, embedding için benzerlik farkı (margin)
+    method: str         # "rules" veya "embedding"
+
+
+# Bu terimlerden biri tek başına yeterli. "ihale", "atama", "karar" gibi terimler haber sorularında da sık
+# geçtiği için ("satış ilanı", "bakanlık kararı") kurala alınmaz; bu sorular embedding merkezlerine bırakılır.
+_STRONG_PATTERNS = [
+    r"resm[iî] gazete",
+    r"\bkanun",
+    r"\byönetmeli",
+    r"\btebli[ğg]",
+    r"\bkhk\b",
+    r"kanun hükmünde kararname",
+    r"\bkararname",
+    r"cumhurbaşkanı(?:lığı)? karar",
+    r"\bgenelge",
+    r"\byönerge",
+    r"\bmevzuat",
+    r"\d+\s*sayılı",
+    r"anayasa mahkemesi karar",
+    r"esas (?:no|sayı)",
+]
+_STRONG_RE = [re.compile(p) for p in _STRONG_PATTERNS]
+_WORD_RE = re.compile(r"[a-zçğıöşü]{2,}")
+
+# Embedding merkezlerini oluşturmak için etiketli örnek sorular
+LABELLED_EXAMPLES: Dict[str, list] = {
+    "resmi_gazete": [
+        "2024 yılı bütçe kanunu ne zaman yayınlandı?",
+        "Son çıkan yönetmelik değişikliği neleri kapsıyor?",
+        "Hangi kurumlara yeni atama yapıldı?",
+        "Karayolları ihale ilanları nelerdir?",
+        "Gümrük tebliğinde hangi değişiklikler yapıldı?",
+        "Cumhurbaşkanı kararı ile hangi bölgeler acele kamulaştırma kapsamına alındı?",
+        "Hazine taşınmazlarının kiralama ilanları hangi illerde?",
+        "Üniversitelere öğretim üyesi alım ilanı yayımlandı mı?",
+    ],
+    "general": [
+        "Türkiye'nin başkenti neresi?",
+        "Bugün borsada neler oldu?",
+        "Dolar kuru bugün kaç lira?",
+        "Yarın hava nasıl olacak?",
+        "Dünya kupasını kim kazandı?",
+        "Yapay zeka nedir?",
+        "Son deprem nerede oldu?",
+        "Galatasaray maçı kaç kaç bitti?",
+    ],
+    "irrelevant": [
+        "mavi uyur mu?",
+        "asdfgh",
+        "kedi masa neden uçar",
+        "hmm",
+        "bana bir şey söyle",
+        "sandalye mutlu mu?",
+    ],
+}
+
+
+def normalize(text: str) -> str:
+    """Türkçe büyük/küçük harf dönüşümüyle küçük harfe çevirir (İ->i, I->ı)."""
+    return text.replace("İ", "i").replace("I", "ı").lower().strip()
+
+
+def rule_classify(question: str) -> Optional[Prediction]:
+    """Kurallarla sınıflandırır; karar verilemiyorsa None döner."""
+    text = normalize(question)
+    if len(_WORD_RE.findall(text)) == 0:
+        # Harf içermeyen veya tek karakterlik girdiler
+        return Prediction("irrelevant", 1.0, "rules")
+
+    hits = sum(1 for rx in _STRONG_RE if rx.search(text))
+    if hits < config.PRECLASSIFIER_RULE_THRESHOLD:
+        return None
+    # Güven [0, 1) aralığında: tek terim 0.5, her ek terim kalan payın yarısını ekler
+    return Prediction("resmi_gazete", 1.0 - 0.5 ** hits, "rules")
+
+
+class PreClassifier:
+    """Kural + embedding merkezli ön sınıflandırıcı.
+
+    Merkezler ilk kullanımda bir kez hesaplanır ve süreç boyunca saklanır.
+    """
+
+    def __init__(self, rt: "Runtime", examples: Dict[str, list] = None):
+        self.rt = rt
+        self.examples = examples or LABELLED_EXAMPLES
+        self._labels = None
+        self._centroids = None  # (sınıf sayısı, boyut), satırlar birim uzunlukta
+        self._lock = threading.Lock()
+
+    def _ensure_centroids(self):
+        if self._centroids is not None:
+            return
+        with self._lock:
+            if self._centroids is not None:
+                return
+            labels, rows = [], []
+            for label, questions in self.examples.items():
+                # Sorular `embed_query` ile embed edildiği için örnekler de aynı yoldan (aynı önekle) geçer
+                vecs = np.asarray([self.rt.embed_query(q) for q in questions], dtype=np.float32)
+                vecs /= np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12
+                centroid = vecs.mean(axis=0)
+                rows.append(centroid / (np.linalg.norm(centroid) + 1e-12))
+                labels.append(label)
+            self._labels = labels
+            self._centroids = np.vstack(rows)
+            log.info(f"Ön sınıflandırıcı merkezleri hazırlandı: {', '.join(labels)}")
+
+    def with_runtime(self, rt: "Runtime") -> "PreClassifier":
+        """Merkezleri paylaşan, soru embedding'lerini `rt` üzerinden alan bir kopya (toplu değerlendirme için)."""
+        self._ensure_centroids()
+        other = copy.copy(self)
+        other.rt = rt
+        return other
+
+    def embedding_classify(self, question: str) -> Optional[Prediction]:
+        """Soru embedding'ini merkezlerle karşılaştırır; fark (margin) düşükse None döner."""
+        self._ensure_centroids()
+        q = np.asarray(self.rt.embed_query(question), dtype=np.float32)
+        q /= np.linalg.norm(q) + 1e-12
+        sims = self._centroids @ q
+        order = np.argsort(sims)[::-1]
+        margin = float(sims[order[0]] - sims[order[1]])
+        if margin >= config.PRECLASSIFIER_EMBED_MARGIN:
+            return Prediction(self._labels[order[0]], margin, "embedding")
+        return None
+
+    def classify(self, question: str) -> Optional[Prediction]:
+        """Önce kuralları, sonra embedding benzerliğini dener. Emin değilse None."""
+        prediction = rule_classify(question)
+        if prediction is not None:
+            return prediction
+        try:
+            return self.embedding_classify(question)
+        except Exception as e:
+            # Embedding servisi erişilemezse LLM'e düşmek güvenli tercih
+            log.warning(f"Ön sınıflandırıcı embedding hatası, LLM kullanılacak: {e}")
+            return None
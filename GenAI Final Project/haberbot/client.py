@@ -0,0 +1,98 @@
+"""Streamlit arayüzünün kullandığı arka uç istemcileri.
+
+`HABERBOT_API_URL` ayarlıysa arayüz ince bir istemcidir: soruları HTTP API'ye
+(`haberbot.api`) gönderir ve NDJSON olay akışını okur. Ayarlı değilse grafik
+eskisi gibi Streamlit süreci içinde çalışır. İki istemci de aynı arayüzü
+sunar: `stream(soru)` -> ("status"|"token"|"final", veri), `context(chunk_id'leri)`,
+`stats()`, `reload()`.
+"""
+import json
+from typing import Iterator, List, Tuple
+
+import requests
+
+from haberbot import config
+from haberbot.limits import OverloadedError
+
+
+class LocalClient:
+    """Grafiği bu süreçte çalıştırır (API olmadan tek başına Streamlit)."""
+
+    def __init__(self):
+        # API modunda Chroma/LangChain yüklenmesin diye burada içe aktarılır
+        from haberbot.runtime import get_runtime
+        self.rt = get_runtime() # Hata durumunda RuntimeError; arayüz bunu gösterir
+
+    def stream(self, question: str, invoke_config: dict = None) -> Iterator[Tuple[str, object]]:
+        from haberbot.streaming import stream_answer
+        return stream_answer(self.rt, question, invoke_config)
+
+    def context(self, ids: List[str]) -> List[str]:
+        return self.rt.fetch_context(ids)
+
+    def stats(self) -> dict:
+        return self.rt.stats()
+
+    def reload(self) -> dict:
+        from haberbot.runtime import reload_runtime
+        self.rt = reload_runtime()
+        return self.stats()
+
+
+class ApiClient:
+    """HTTP API istemcisi; bağlantı havuzu süreç boyunca paylaşılır."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        try:
+            response = self.session.request(method, self.base_url + path, **kwargs)
+        except requests.RequestException as e:
+            raise RuntimeError(f"Haberbot API'ye ulaşılamadı ({self.base_url}): {e}") from e
+        if response.status_code == 503:
+            raise OverloadedError(response.json().get("detail", "Sunucu kapasitesi dolu."))
+        if response.status_code >= 400:
+            raise RuntimeError(f"Haberbot API hatası (HTTP {response.status_code}): {response.text}")
+        return response
+
+    def stream(self, question: str, invoke_config: dict = None) -> Iterator[Tuple[str, object]]:
+        # invoke_config sunucu tarafında belirlenir; LocalClient ile aynı imza için kabul edilir
+        response = self._request("POST", "/stream", json={"question": question}, stream=True,
+                                 timeout=(5, config.API_CLIENT_TIMEOUT))
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "error":
+                    error = event["data"]
+                    if error.get("error") == "overloaded":
+                        raise OverloadedError(error.get("detail"))
+                    raise RuntimeError(error.get("detail"))
+                yield event["type"], event["data"]
+
+    def context(self, ids: List[str]) -> List[str]:
+        return self._request("POST", "/context", json={"ids": ids}, timeout=30).json()["passages"]
+
+    def stats(self) -> dict:
+        return self._request("GET", "/stats", timeout=5).json()
+
+    def reload(self) -> dict:
+        self._request("POST", "/reload", timeout=config.API_CLIENT_TIMEOUT)
+        return self.stats()
+
+
+_client = None
+
+
+def get_client():
+    """Ayarlara göre paylaşımlı istemciyi döndürür."""
+    global _client
+    if config.HABERBOT_API_URL:
+        if _client is None:
+            _client = ApiClient(config.HABERBOT_API_URL)
+        return _client
+    # Yerel çalışmada Runtime zaten süreç başına paylaşılıyor; indeks değişimini de get_runtime algılar
+    return LocalClient()
@@ -0,0 +1,157 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+# --- Ayarlar ---
+NEWSDATA_API_KEY = os.environ.get("NEWSDATA_API_KEY")
+CHROMA_DB_PATH = os.environ.get("CHROMA_DB_PATH", "./chroma_db")
+CHROMA_COLLECTION_NAME = "resmi_gazete_bge_m3"
+OLLAMA_EMBED_MODEL = "bge-m3:latest"
+OLLAMA_LLM = "deepseek-r1:14b" # 'ollama list' ile kontrol ettim, model ismi bu şekilde olmalı
+RETRIEVER_K = 3 # Resmi Gazete RAG için getirilecek chunk sayısı
+# Hibrit arama: Chroma vektör araması + BM25 (chroma_db/bm25), reciprocal rank fusion ile birleştirilir.
+# BM25 indeksi yoksa sadece vektör araması kullanılır.
+HYBRID_RETRIEVAL = os.environ.get("HYBRID_RETRIEVAL", "true").lower() == "true"
+BM25_DIR_NAME = "bm25"
+HYBRID_FETCH_K = 20 # Birleştirmeden önce her iki aramadan alınacak aday sayısı
+# Metadata filtreleri (bkz. haberbot.metadata): ingest'te chunk'lara yayım tarihi, gazete sayısı ve belge türü yazılır;
+# sorudaki tarih/sayı/tür kısıtları aramada Chroma `where` filtresine çevrilir.
+METADATA_FILTERS = os.environ.get("METADATA_FILTERS", "true").lower() == "true"
+METADATA_FILTER_MIN_HITS = RETRIEVER_K # Filtreli arama bundan az chunk bulursa filtre adım adım gevşetilir
+METADATA_VERSION = 1 # Çıkarım kuralları değişince artırılır; ingest eski chunk'ların metadata'sını embed etmeden günceller
+# Bağlam birleştirme: komşu chunk'lar birleştirilip örtüşmeler atılır, sonuç bu bütçeye sığdırılır (bkz. haberbot.context)
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_CHARS_PER_TOKEN = 3.5 # Türkçe metin için kaba token tahmini (tokenizer yüklemeden)
+CONTEXT_SEPARATOR = "\n\n---\n\n" # Prompt'ta parçalar arasına konan ayraç
+# Sıkıştırılmış vektör indeksi (chroma_db/vectors, bkz. haberbot.vectors): bge-m3 vektörleri mmap ile açılan
+# float16/int8 matris. VECTOR_BACKEND="mmap" ve indeks varsa Chroma hiç açılmaz; indeks yoksa Chroma'ya düşülür.
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "chroma").lower() # "chroma" veya "mmap"
+VECTOR_DIR_NAME = "vectors"
+VECTOR_DTYPE = os.environ.get("VECTOR_DTYPE", "float16") # "float16" veya "int8" (satır başına ölçekli; float32'nin 1/4'ü, NumPy'da float16'dan da hızlı)
+VECTOR_IVF_MIN_DOCS = 20000 # Bu sayıdan büyük korpuslarda IVF bölümleme; altında tam (exact) arama
+VECTOR_IVF_NPROBE = int(os.environ.get("VECTOR_IVF_NPROBE", "8")) # IVF'de sorgu başına taranan bölüm sayısı
+
+# --- Ingestion (Veri Yükleme) Ayarları ---
+# Notebook'taki (embedding.ipynb) değerlerle aynı; indeks bu ayarlarla üretildi.
+ST_EMBED_MODEL = "BAAI/bge-m3" # sentence-transformers ile embedding için (GPU'lu makinelerde)
+# Notebook chunk'ları önek eklemeden embed edip birim uzunluğa normalize etti; ingest iki altyapıda da aynısını yapar
+INGEST_EMBED_BACKEND = "ollama" # Manifestte kayıt yoksa kullanılan altyapı ("ollama" veya "sentence-transformers")
+INGEST_EMBED_NORMALIZE = True
+CHUNK_SIZE = 1000 # Her bir parçanın karakter sayısı
+CHUNK_OVERLAP = 150 # Parçalar arası karakter örtüşmesi
+INGEST_BATCH_SIZE = 64 # Tek seferde embed edilip Chroma'ya yazılan chunk sayısı (checkpoint aralığı)
+INGEST_MANIFEST_NAME = "ingest_manifest.json" # Chroma klasöründe tutulan dosya hash manifesti
+INGEST_SPLIT_WORKERS = os.cpu_count() or 1 # Metin bölme için süreç havuzu boyutu
+INGEST_QUEUE_SIZE = 4 # Aşamalar arası kuyruklarda bekleyebilecek en fazla batch (backpressure)
+# Tekilleştirme (bkz. haberbot.dedup): birebir ve yakın kopya chunk'lar embed edilmeden atılır, kanonik eşleme saklanır
+DEDUP_ENABLED = os.environ.get("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_DB_NAME = "dedup.sqlite3" # Chroma klasöründe tutulan hash/MinHash/kanonik eşleme veritabanı
+DEDUP_SHINGLE_WORDS = 3 # MinHash shingle'ı: ardışık kelime sayısı
+DEDUP_NUM_PERM = 64 # MinHash imza uzunluğu
+DEDUP_LSH_BANDS = 16 # 16 bant x 4 satır: Jaccard ~0.5 üstü çiftler aday olur, sonra eşikle doğrulanır
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.85")) # Tahmini Jaccard bu değeri geçerse yakın kopya
+
+# --- Ön Sınıflandırıcı (LLM'siz supervisor kademesi) ---
+# Kapalıysa her soru doğrudan LLM ile sınıflandırılır.
+PRECLASSIFIER_ENABLED = os.environ.get("PRECLASSIFIER_ENABLED", "true").lower() == "true"
+PRECLASSIFIER_RULE_THRESHOLD = 1 # En az bu kadar güçlü Resmi Gazete terimi eşleşirse 'resmi_gazete' kabul edilir
+PRECLASSIFIER_EMBED_MARGIN = float(os.environ.get("PRECLASSIFIER_EMBED_MARGIN", "0.08")) # En iyi iki merkez benzerliği arasındaki minimum fark
+QUERY_EMBED_CACHE_SIZE = 256 # Aynı sorunun embedding'inin tekrar hesaplanmaması için LRU boyutu
+
+# --- Spekülatif Ön Getirme ---
+# Supervisor sınıflandırırken önceden başlatılacak aramalar: "retrieval" (Chroma), "news" (NewsData.io kotası harcar)
+# Örn: SPECULATIVE_PREFETCH="retrieval,news"; boş bırakılırsa kapalıdır.
+SPECULATIVE_PREFETCH = [k.strip() for k in os.environ.get("SPECULATIVE_PREFETCH", "retrieval").split(",") if k.strip()]
+PREFETCH_WORKERS = 4
+
+# --- Anlamsal Cevap Önbelleği ---
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_PATH = os.environ.get("ANSWER_CACHE_PATH", "./answer_cache.sqlite3")
+ANSWER_CACHE_THRESHOLD = float(os.environ.get("ANSWER_CACHE_THRESHOLD", "0.95")) # Kosinüs benzerliği eşiği
+ANSWER_CACHE_MAX_ENTRIES = 2000 # Aşılırsa en uzun süredir kullanılmayan kayıtlar silinir (LRU)
+# Kaynağa göre yaşam süresi (saniye). Listede olmayan kaynaklar (Hata, Yanıt Yok vb.) önbelleğe alınmaz.
+ANSWER_CACHE_TTL = {
+    "Resmi Gazete": 7 * 24 * 3600,
+    "Genel Bilgi (NewsData.io)": 15 * 60, # Haberler hızlı eskidiği için kısa tutulur
+    "Genel Bilgi (LLM)": 24 * 3600,
+}
+
+# --- NewsData.io İstemcisi ---
+NEWSDATA_BASE_URL = os.environ.get("NEWSDATA_BASE_URL", "https://newsdata.io/api/1/") # Testlerde yerel stub sunucusu verilebilir
+NEWS_CONNECT_TIMEOUT = 3.0 # Saniye
+NEWS_READ_TIMEOUT = float(os.environ.get("NEWS_READ_TIMEOUT", "8")) # Saniye; aşılırsa LLM-only cevaba düşülür
+NEWS_POOL_SIZE = 8 # Paylaşımlı HTTP bağlantı havuzu boyutu
+NEWS_CACHE_TTL = 10 * 60 # Aynı (normalize) sorgu için sonucun saklanma süresi (saniye)
+NEWS_CACHE_SIZE = 512
+NEWS_BREAKER_FAILURES = 3 # Art arda bu kadar hatadan sonra devre kesici açılır
+NEWS_BREAKER_COOLDOWN = 60.0 # Devre açıkken API'nin atlanacağı süre (saniye)
+
+# --- HTTP API (haberbot.api) ve Ollama Eşzamanlılık Sınırları ---
+# Ayarlıysa Streamlit arayüzü grafiği kendisi çalıştırmaz, bu servisin istemcisi olur (örn. http://localhost:8000)
+HABERBOT_API_URL = os.environ.get("HABERBOT_API_URL")
+API_HOST = os.environ.get("API_HOST", "0.0.0.0")
+API_PORT = int(os.environ.get("API_PORT", "8000"))
+API_CLIENT_TIMEOUT = 300.0 # Streamlit istemcisinin tek bir cevap için bekleyeceği en uzun süre (saniye)
+# Yeniden yüklemede eski Runtime'ın kaynakları (thread havuzu, SQLite, HTTP oturumu) bu kadar sonra kapatılır;
+# üzerinde süren istekler bu sürede biter (daha uzun süren istemci zaten zaman aşımına uğramıştır)
+RUNTIME_CLOSE_GRACE = API_CLIENT_TIMEOUT
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "1")) # Ollama'daki OLLAMA_NUM_PARALLEL ile uyumlu tutulmalı
+LLM_MAX_QUEUE = int(os.environ.get("LLM_MAX_QUEUE", "8")) # Sıra bekleyebilecek LLM çağrısı; aşılırsa 503 döner
+EMBED_MAX_CONCURRENCY = int(os.environ.get("EMBED_MAX_CONCURRENCY", "4"))
+EMBED_MAX_QUEUE = 32
+OLLAMA_QUEUE_TIMEOUT = float(os.environ.get("OLLAMA_QUEUE_TIMEOUT", "120")) # Kuyrukta en fazla bekleme (saniye)
+API_MAX_INFLIGHT = LLM_MAX_CONCURRENCY + LLM_MAX_QUEUE # API'nin aynı anda kabul ettiği istek sayısı
+
+# --- Toplu Değerlendirme (bkz. haberbot.batch) ---
+# Grafiği çalıştıran thread sayısı. LLM çağrıları yine LLM_MAX_CONCURRENCY ile sınırlıdır; fazladan
+# thread'ler bir soru üretim yaparken diğerinin haber araması/sınıflandırmasının örtüşmesini sağlar.
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", str(min(LLM_MAX_CONCURRENCY * 2, API_MAX_INFLIGHT))))
+BATCH_RETRIES = 3 # Sınırlayıcı kuyruğu dolduğunda (OverloadedError) soru başına yeniden deneme
+
+# --- Streamlit Sohbet Geçmişi (bkz. haberbot.history) ---
+CHAT_HISTORY_MAX_MESSAGES = int(os.environ.get("CHAT_HISTORY_MAX_MESSAGES", "200")) # Oturum başına; aşılırsa en eskiler atılır
+CHAT_HISTORY_PAGE_SIZE = 20 # Her rerun'da çizilen son mesaj sayısı; daha eskileri "Daha eski mesajlar" ile açılır
+CONTEXT_FETCH_CACHE_SIZE = 128 # ID'lerden getirilen bağlamlar için süreç genelinde önbellek (kayıt sayısı)
+
+# --- İzleme (Tracing), Metrikler ve Loglama (bkz. haberbot.telemetry) ---
+TRACE_PATH = os.environ.get("TRACE_PATH", "") # İstek başına bir satır JSON (ör. ./traces.jsonl); varsayılan kapalı
+TRACE_MAX_BYTES = int(os.environ.get("TRACE_MAX_BYTES", str(50 * 1024 * 1024))) # Aşılınca dosya döndürülür (traces.jsonl.1, ...)
+TRACE_BACKUP_COUNT = int(os.environ.get("TRACE_BACKUP_COUNT", "3")) # Saklanan eski iz dosyası sayısı
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+
+# --- Ollama Model Profilleri, Isınma ve Keep-Alive (bkz. haberbot.models) ---
+# Sınıflandırma gibi hafif işler için küçük model (örn. "qwen2.5:3b"); ayarlanmazsa ana model kullanılır
+OLLAMA_SMALL_LLM = os.environ.get("OLLAMA_SMALL_LLM", OLLAMA_LLM)
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m") # Son istekten sonra modelin bellekte kalma süresi ("-1": süresiz)
+OLLAMA_WARMUP = os.environ.get("OLLAMA_WARMUP", "true").lower() == "true" # Açılışta modelleri arka planda yükle
+# Düğüm başına model ve üretim sınırları; listede olmayan düğümler "default" profilini kullanır.
+# deepseek-r1 cevaptan önce <think> bölümü ürettiği için num_predict düşünme token'larını da kapsamalı.
+LLM_PROFILES = {
+    "default": {"model": OLLAMA_LLM, "num_predict": 2048, "stop": None},
+    # Prompt'taki örnek formatı tekrar etmeye başlarsa (yeni "Soru:") üretim kesilir
+    "supervisor": {"model": OLLAMA_SMALL_LLM, "num_predict": 768, "stop": ["\nSoru:", "\nKullanıcı Sorusu:"]},
+    "resmi_gazete_agent": {"model": OLLAMA_LLM, "num_predict": 2048, "stop": ["\nKullanıcı Sorusu:"]},
+    "general_agent": {"model": OLLAMA_LLM, "num_predict": 2048, "stop": ["\nKullanıcı Sorusu:"]},
+}
+
+# --- Ollama Erişimi İçin Host Ayarı (Docker ve Lokal Çalıştırma İçin) ---
+# Docker içinden host makinedeki Ollama'ya erişim için kullanılır.
+# Docker run komutunda -e OLLAMA_HOST="http://<YOUR_HOST_IP>:11434" veya
+# Mac/Win için -e OLLAMA_HOST="http://host.docker.internal:11434" şeklinde ayarlanabilir.
+# Ortam değişkeni yoksa localhost varsayılır (lokal çalıştırma için).
+DEFAULT_OLLAMA_HOST = "http://localhost:11434"
+# Docker'da çalışıp çalışmadığını anlamak için bir ortam değişkeni kontrolü
+# Dockerfile'da 'ENV RUNNING_IN_DOCKER=true' olarak ayarlanıyor.
+IS_RUNNING_IN_DOCKER = os.environ.get("RUNNING_IN_DOCKER", "false").lower() == "true"
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_HOST")
+# Adresin nereden geldiği; import sırasında yazdırılmaz, runtime kurulurken loglanır
+OLLAMA_HOST_NOTE = "OLLAMA_HOST ortam değişkeninden"
+
+if IS_RUNNING_IN_DOCKER and not OLLAMA_BASE_URL:
+    # Docker'da çalışıyor ama host belirtilmemişse Mac/Win için varsayılanı dene
+    OLLAMA_BASE_URL = "http://host.docker.internal:11434"
+    OLLAMA_HOST_NOTE = "Docker içinde çalışılıyor, Ollama host belirtilmedi; host.docker.internal deneniyor"
+elif not OLLAMA_BASE_URL:
+    # Docker'da değil ve host belirtilmemişse localhost kullan
+    OLLAMA_BASE_URL = DEFAULT_OLLAMA_HOST
+    OLLAMA_HOST_NOTE = "Ollama host belirtilmedi, varsayılan kullanılıyor"
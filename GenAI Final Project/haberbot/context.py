@@ -0,0 +1,153 @@
+"""RAG prompt'u için bağlam birleştirme: örtüşme temizliği ve token bütçesi.
+
+Chunk'lar 1000 karakterlik ve 150 karakter örtüşmeli üretildiği için aynı
+dosyadan gelen komşu chunk'lar prompt'ta aynı metni tekrarlar. Büyük bir
+modelde (deepseek-r1:14b) süreyi çoğunlukla prompt'un işlenmesi (prefill)
+belirler; bu yüzden prompt'a girmeden önce:
+- Aynı `source`'tan gelen chunk'lar `start_index` (yoksa `chunk_index` ve
+  metin örtüşmesi) ile sıralanıp komşu olanlar tek parçada birleştirilir,
+  örtüşen kısım bir kez yazılır,
+- Birebir aynı metinler atılır,
+- Parçalar retrieval sırasıyla `CONTEXT_TOKEN_BUDGET`'a sığacak şekilde
+  paketlenir; sığmayan son parça kırpılır.
+"""
+from typing import List, NamedTuple
+
+from haberbot import config
+
+MIN_TEXT_OVERLAP = 20 # Metin örtüşmesi tahmininde kabul edilen en kısa ortak kısım (karakter)
+MIN_TRUNCATED_TOKENS = 64 # Bütçenin sonunda bundan kısa bir parça eklemeye değmez
+
+
+class Passage(NamedTuple):
+    text: str
+    rank: int            # Parçadaki en iyi chunk'ın retrieval sırası
+    chunks: int          # Parçada birleştirilen chunk sayısı
+
+
+class AssembledContext(NamedTuple):
+    passages: List[str]
+    chunks_in: int
+    tokens_in: int       # Chunk'lar olduğu gibi birleştirilseydi tahmini token sayısı
+    tokens_out: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+
+def chunk_id_of(doc) -> str:
+    """Chunk'ın Chroma ID'si; retriever ID döndürmediyse ingest'teki '<dosya>_chunk_<i>' şeması."""
+    return doc.id or f"{doc.metadata.get('source')}_chunk_{doc.metadata.get('chunk_index')}"
+
+
+def estimate_tokens(text: str) -> int:
+    """Karakter sayısından token tahmini (tokenizer yüklemeden, bütçe için yeterli)."""
+    return int(len(text) / config.CONTEXT_CHARS_PER_TOKEN + 0.5)
+
+
+def text_overlap(left: str, right: str, max_overlap: int = None) -> int:
+    """`left`'in sonu ile `right`'ın başı arasındaki en uzun ortak kısmın uzunluğu."""
+    max_overlap = min(len(left), len(right), max_overlap or 2 * config.CHUNK_OVERLAP)
+    for size in range(max_overlap, MIN_TEXT_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _position(metadata: dict):
+    start = metadata.get("start_index")
+    if start is not None and start >= 0:
+        return start
+    return None
+
+
+def _merge_by_offsets(items) -> List[Passage]:
+    """`start_index` bilinen chunk'ları dosyadaki konumlarına göre birleştirir."""
+    passages = []
+    text, end, rank, chunks = None, 0, 0, 0
+    for item_rank, doc in sorted(items, key=lambda item: _position(item[1].metadata)):
+        start, content = _position(doc.metadata), doc.page_content
+        if text is not None and start <= end:
+            # Komşu veya örtüşen chunk: sadece yeni kısmı ekle
+            text += content[end - start:]
+            end = max(end, start + len(content))
+            rank, chunks = min(rank, item_rank), chunks + 1
+            continue
+        if text is not None:
+            passages.append(Passage(text, rank, chunks))
+        text, end, rank, chunks = content, start + len(content), item_rank, 1
+    passages.append(Passage(text, rank, chunks))
+    return passages
+
+
+def _merge_by_text(items) -> List[Passage]:
+    """Konumu bilinmeyen chunk'ları (ör. notebook ile üretilmiş indeks) metin örtüşmesiyle birleştirir.
+
+    `chunk_index` varsa sadece ardışık chunk'lar birleştirilir.
+    """
+    # [metin, sıra, chunk sayısı, ilk chunk_index, son chunk_index]
+    parts = [[doc.page_content, rank, 1, doc.metadata.get("chunk_index"), doc.metadata.get("chunk_index")]
+             for rank, doc in items]
+    merged = True
+    while merged and len(parts) > 1:
+        merged = False
+        for left in parts:
+            for right in parts:
+                if left is right:
+                    continue
+                if left[4] is not None and right[3] is not None and right[3] != left[4] + 1:
+                    continue
+                overlap = text_overlap(left[0], right[0])
+                if overlap:
+                    left[0] += right[0][overlap:]
+                    left[1], left[2], left[4] = min(left[1], right[1]), left[2] + right[2], right[4]
+                    parts.remove(right)
+                    merged = True
+                    break
+            if merged:
+                break
+    return [Passage(text, rank, chunks) for text, rank, chunks, _, _ in parts]
+
+
+def _merge_group(items) -> List[Passage]:
+    """Aynı kaynaktan gelen (rank, doc) çiftlerini birleştirir."""
+    if all(_position(doc.metadata) is not None for _, doc in items):
+        return _merge_by_offsets(items)
+    return _merge_by_text(items)
+
+
+def merge_adjacent(docs) -> List[Passage]:
+    """Chunk'ları kaynak dosyaya göre gruplayıp birleştirir; retrieval sırasını korur."""
+    groups, seen = {}, set()
+    for rank, doc in enumerate(docs):
+        if doc.page_content in seen:
+            continue # Aynı metin iki kez (ör. iki dosyada aynı ilan) gelmişse bir kez yeter
+        seen.add(doc.page_content)
+        source = doc.metadata.get("source") or f"__doc_{rank}"
+        groups.setdefault(source, []).append((rank, doc))
+    passages = [p for items in groups.values() for p in _merge_group(items)]
+    return sorted(passages, key=lambda p: p.rank)
+
+
+def assemble_context(docs, token_budget: int = None) -> AssembledContext:
+    """Chunk'ları birleştirir ve token bütçesine sığacak parçaların listesini döndürür."""
+    token_budget = token_budget or config.CONTEXT_TOKEN_BUDGET
+    separator_tokens = estimate_tokens(config.CONTEXT_SEPARATOR)
+    tokens_in = sum(estimate_tokens(doc.page_content) for doc in docs) + separator_tokens * max(len(docs) - 1, 0)
+
+    packed, used = [], 0
+    for passage in merge_adjacent(docs):
+        cost = estimate_tokens(passage.text) + (separator_tokens if packed else 0)
+        if used + cost <= token_budget:
+            packed.append(passage.text)
+            used += cost
+            continue
+        remaining = token_budget - used - (separator_tokens if packed else 0)
+        if remaining >= MIN_TRUNCATED_TOKENS or not packed:
+            # Sığmayan parçayı kırp; en azından ilk (en alakalı) parça her zaman girer
+            cut = passage.text[:int(remaining * config.CONTEXT_CHARS_PER_TOKEN)]
+            packed.append(cut.rsplit(" ", 1)[0] if " " in cut else cut)
+            used += estimate_tokens(packed[-1]) + (separator_tokens if len(packed) > 1 else 0)
+        break
+    return AssembledContext(packed, len(docs), tokens_in, used)
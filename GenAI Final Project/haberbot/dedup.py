@@ -0,0 +1,337 @@
+"""Resmi Gazete chunk'larında birebir ve yakın kopyaların ayıklanması (normalize hash + MinHash/LSH).
+
+Gazete sayıları aynı kalıp metinleri tekrar tekrar içerir: künye, içindekiler
+parçaları, her gün yayımlanan ilan şablonları. Notebook (ve ilk ingest)
+bunların hepsini embed ediyordu; bu hem embedding süresini ve indeks
+boyutunu büyütüyor hem de `k=3` arama sonuçlarını aynı metnin kopyalarıyla
+dolduruyordu. Bu modül ingest hattında, embedding'den önce:
+- Metni Türkçe küçük harfe çevirip noktalama/boşlukları atarak hash'ler;
+  aynı hash'e sahip chunk birebir kopyadır,
+- Kelime üçlülerinin MinHash imzasını çıkarır, LSH bantlarıyla aday bulur ve
+  tahmini Jaccard benzerliği `DEDUP_THRESHOLD` üstündeyse yakın kopya sayar,
+- Atılan her chunk için kanonik chunk'ı kaydeder (kaynak bilgisi kaybolmaz),
+- Sadece filtrelenebilir metadata'sı (yayım tarihi, sayı, belge türü; bkz.
+  `haberbot.metadata.FILTER_FIELDS`) aynı olan chunk'ları kopya sayar. Farklı
+  bir gün/sayıda tekrar eden metin tutulur; atılsaydı o tarihle filtrelenen
+  aramalar onu bulamazdı.
+
+Durum `chroma_db/dedup.sqlite3`'te tutulur; artımlı ingest yeni dosyaları
+önceki çalıştırmaların kanonik chunk'larıyla karşılaştırır. Kanonik chunk'ı
+silinen/değişen dosyaların kopyaları yetim kalacağından, o kopyaları içeren
+dosyalar yeniden yüklenir (`release`).
+
+Mevcut (tekilleştirilmemiş) bir koleksiyonu küçültmek ve eşlemeye bakmak için:
+    python -m haberbot.dedup collection [--dry-run]
+    python -m haberbot.dedup show <chunk_id>
+    python -m haberbot.dedup stats
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import defaultdict
+from typing import Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from haberbot import config
+from haberbot.classifier import normalize
+from haberbot.metadata import FILTER_FIELDS
+from haberbot.telemetry import log
+
+_WORD_RE = re.compile(r"\w+")
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_PRIME = np.uint64((1 << 61) - 1)
+
+
+def words_of(text: str) -> List[str]:
+    return _WORD_RE.findall(normalize(text))
+
+
+def text_hash(words: List[str], scope: str = "") -> str:
+    """Büyük/küçük harf, noktalama ve boşluk farklarından bağımsız içerik hash'i (`scope` içinde)."""
+    return hashlib.sha1((scope + "\x00" + " ".join(words)).encode("utf-8")).hexdigest()
+
+
+def filter_scope(metadata: dict) -> str:
+    """Filtrelenebilir metadata değerleri; sadece aynı kapsamdaki chunk'lar birbirinin kopyası sayılır."""
+    return "|".join(str(metadata.get(field, "")) for field in FILTER_FIELDS)
+
+
+def _hash32(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+class MinHasher:
+    """Kelime shingle'ları üzerinde `num_perm` permütasyonlu MinHash imzası.
+
+    Permütasyonlar (a * h + b) mod p ailesidir; a, b < 2^32 olduğundan uint64
+    çarpımı taşmaz.
+    """
+
+    def __init__(self, num_perm: int = None, shingle_words: int = None, seed: int = 1):
+        self.num_perm = num_perm or config.DEDUP_NUM_PERM
+        self.shingle_words = shingle_words or config.DEDUP_SHINGLE_WORDS
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 32, self.num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, self.num_perm, dtype=np.uint64)
+
+    def signature(self, words: List[str]) -> np.ndarray:
+        k = self.shingle_words
+        shingles = {" ".join(words[i:i + k]) for i in range(max(len(words) - k + 1, 1))}
+        hashes = np.fromiter((_hash32(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((hashes[:, None] * self.a + self.b) % _PRIME & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """İki MinHash imzasından tahmini Jaccard benzerliği."""
+    return float(np.mean(sig_a == sig_b))
+
+
+class DedupIndex:
+    """Chunk ID -> (hash, MinHash imzası, kanonik chunk) kayıtları ve LSH bantları (SQLite).
+
+    `assign` sadece ingest'in ana thread'inden çağrılır; her dosyadan sonra commit edilir.
+    """
+
+    def __init__(self, path: str, threshold: float = None, bands: int = None):
+        self.path = path
+        self.threshold = threshold or config.DEDUP_THRESHOLD
+        self.hasher = MinHasher()
+        self.bands = bands or config.DEDUP_LSH_BANDS
+        if self.hasher.num_perm % self.bands:
+            raise ValueError(f"DEDUP_NUM_PERM ({self.hasher.num_perm}) DEDUP_LSH_BANDS'e ({self.bands}) tam bölünmeli.")
+        self.rows = self.hasher.num_perm // self.bands
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY, source TEXT NOT NULL, hash TEXT NOT NULL, chars INTEGER NOT NULL,
+                kind TEXT NOT NULL, canonical TEXT, similarity REAL, signature BLOB);
+            CREATE INDEX IF NOT EXISTS chunks_source ON chunks(source);
+            CREATE INDEX IF NOT EXISTS chunks_hash ON chunks(hash) WHERE canonical IS NULL;
+            CREATE INDEX IF NOT EXISTS chunks_canonical ON chunks(canonical);
+            CREATE TABLE IF NOT EXISTS lsh (band INTEGER NOT NULL, key INTEGER NOT NULL, id TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS lsh_key ON lsh(band, key);
+            CREATE INDEX IF NOT EXISTS lsh_id ON lsh(id);
+        """)
+
+    @classmethod
+    def open(cls, chroma_path: str = None) -> "DedupIndex":
+        return cls(os.path.join(chroma_path or config.CHROMA_DB_PATH, config.DEDUP_DB_NAME))
+
+    def close(self):
+        self.conn.close()
+
+    def _band_keys(self, signature: np.ndarray, scope: str = "") -> List[int]:
+        # Kapsam anahtara katılır; farklı tarih/sayı/türdeki chunk'lar aynı LSH kovasına düşmez
+        prefix = scope.encode("utf-8") + b"\x00"
+        return [int.from_bytes(hashlib.blake2b(prefix + signature[band * self.rows:(band + 1) * self.rows].tobytes(),
+                                               digest_size=8).digest(), "little", signed=True)
+                for band in range(self.bands)]
+
+    def _near_duplicate(self, chunk_id: str, signature: np.ndarray, keys: List[int]) -> Tuple[Optional[str], float]:
+        """LSH bantlarında aynı kovaya düşen kanonik chunk'lar arasından en benzerini döndürür."""
+        candidates = set()
+        for band, key in enumerate(keys):
+            candidates.update(row[0] for row in self.conn.execute(
+                "SELECT id FROM lsh WHERE band = ? AND key = ?", (band, key)))
+        candidates.discard(chunk_id)
+        best, best_sim = None, 0.0
+        for candidate in candidates:
+            row = self.conn.execute("SELECT signature FROM chunks WHERE id = ?", (candidate,)).fetchone()
+            sim = similarity(signature, np.frombuffer(row[0], dtype=np.uint32))
+            if sim > best_sim:
+                best, best_sim = candidate, sim
+        return (best, best_sim) if best_sim >= self.threshold else (None, best_sim)
+
+    def assign(self, chunks) -> List[Tuple[Optional[str], str]]:
+        """(id, metin, metadata) chunk'ları için (kanonik ID veya None, tür) listesi döndürür.
+
+        Tür "unique" (tutulur), "exact" veya "near" (atılır) olur. Kanonik
+        chunk'la filtre kapsamı (`filter_scope`) aynı olmayan chunk kopya
+        sayılmaz. Daha önce karar verilmiş bir chunk (yarıda kalan ingest'e
+        devam) aynı kararı alır.
+        """
+        decisions = []
+        for chunk_id, text, metadata in chunks:
+            words = words_of(text)
+            scope = filter_scope(metadata)
+            digest = text_hash(words, scope)
+            known = self.conn.execute("SELECT canonical, kind FROM chunks WHERE id = ? AND hash = ?",
+                                      (chunk_id, digest)).fetchone()
+            if known is not None:
+                decisions.append((known[0], known[1]))
+                continue
+            source = metadata.get("source", "")
+            exact = self.conn.execute("SELECT id FROM chunks WHERE hash = ? AND canonical IS NULL AND id != ? LIMIT 1",
+                                      (digest, chunk_id)).fetchone()
+            if exact is not None:
+                self.conn.execute("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, 'exact', ?, 1.0, NULL)",
+                                  (chunk_id, source, digest, len(text), exact[0]))
+                decisions.append((exact[0], "exact"))
+                continue
+            signature = self.hasher.signature(words)
+            keys = self._band_keys(signature, scope)
+            canonical, sim = self._near_duplicate(chunk_id, signature, keys)
+            if canonical is not None:
+                self.conn.execute("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, 'near', ?, ?, NULL)",
+                                  (chunk_id, source, digest, len(text), canonical, sim))
+                decisions.append((canonical, "near"))
+                continue
+            self.conn.execute("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, 'unique', NULL, NULL, ?)",
+                              (chunk_id, source, digest, len(text), signature.tobytes()))
+            self.conn.execute("DELETE FROM lsh WHERE id = ?", (chunk_id,))
+            self.conn.executemany("INSERT INTO lsh VALUES (?, ?, ?)",
+                                  [(band, key, chunk_id) for band, key in enumerate(keys)])
+            decisions.append((None, "unique"))
+        self.conn.commit()
+        return decisions
+
+    def release(self, sources: Iterable[str]) -> Set[str]:
+        """Dosyaların kayıtlarını siler; kanonik chunk'ı silinen kopyaların dosyalarını döndürür.
+
+        Dönen dosyalardaki kopyalar hiç embed edilmediği için bu dosyalar
+        baştan yüklenmelidir; onların kayıtları da silinir ve zincirleme
+        etkilenen dosyalar da sonuca eklenir.
+        """
+        pending, released, orphans = set(sources), set(), set()
+        while pending:
+            source = pending.pop()
+            released.add(source)
+            for (orphan,) in self.conn.execute(
+                    "SELECT DISTINCT d.source FROM chunks d JOIN chunks c ON d.canonical = c.id "
+                    "WHERE c.source = ? AND d.source != ?", (source, source)):
+                if orphan not in released:
+                    orphans.add(orphan)
+                    pending.add(orphan)
+            self.conn.execute("DELETE FROM lsh WHERE id IN (SELECT id FROM chunks WHERE source = ?)", (source,))
+            self.conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+        self.conn.commit()
+        return orphans
+
+    def sources(self) -> Set[str]:
+        return {row[0] for row in self.conn.execute("SELECT DISTINCT source FROM chunks")}
+
+    def canonical_of(self, chunk_id: str) -> Optional[dict]:
+        row = self.conn.execute("SELECT canonical, kind, similarity FROM chunks WHERE id = ?", (chunk_id,)).fetchone()
+        if row is None:
+            return None
+        return {"canonical": row[0] or chunk_id, "kind": row[1], "similarity": row[2]}
+
+    def duplicates_of(self, chunk_id: str) -> List[dict]:
+        return [{"id": i, "kind": kind, "similarity": sim} for i, kind, sim in self.conn.execute(
+            "SELECT id, kind, similarity FROM chunks WHERE canonical = ? ORDER BY id", (chunk_id,))]
+
+    def stats(self) -> dict:
+        counts = {kind: (n, chars) for kind, n, chars in self.conn.execute(
+            "SELECT kind, COUNT(*), SUM(chars) FROM chunks GROUP BY kind")}
+        total = sum(n for n, _ in counts.values())
+        total_chars = sum(chars for _, chars in counts.values())
+        dropped = sum(counts.get(kind, (0, 0))[0] for kind in ("exact", "near"))
+        dropped_chars = sum(counts.get(kind, (0, 0))[1] for kind in ("exact", "near"))
+        return {"chunks": total, "unique": counts.get("unique", (0, 0))[0], "exact": counts.get("exact", (0, 0))[0],
+                "near": counts.get("near", (0, 0))[0], "dropped": dropped,
+                "dropped_chars_ratio": dropped_chars / total_chars if total_chars else 0.0}
+
+
+class RunStats:
+    """Bir ingest çalıştırmasında tekilleştirmenin kazancı (rapor için)."""
+
+    def __init__(self):
+        self.counts = defaultdict(int)  # tür -> chunk
+        self.chars = defaultdict(int)  # tür -> karakter
+
+    def add(self, chunk, kind: str):
+        self.counts[kind] += 1
+        self.chars[kind] += len(chunk[1])
+
+    @property
+    def dropped(self) -> int:
+        return self.counts["exact"] + self.counts["near"]
+
+    def report(self, embed_seconds_per_chunk: float = None) -> dict:
+        total = sum(self.counts.values())
+        total_chars = sum(self.chars.values())
+        dropped_chars = self.chars["exact"] + self.chars["near"]
+        result = {"chunks": total, "exact": self.counts["exact"], "near": self.counts["near"],
+                  "dropped_ratio": self.dropped / total if total else 0.0,
+                  "dropped_chars_ratio": dropped_chars / total_chars if total_chars else 0.0}
+        if embed_seconds_per_chunk is not None:
+            result["embed_seconds_saved"] = self.dropped * embed_seconds_per_chunk
+        return result
+
+
+def dedup_collection(collection, chroma_path: str = None, dry_run: bool = False, page_size: int = 1000) -> dict:
+    """Tekilleştirme olmadan kurulmuş bir koleksiyondaki kopyaları siler ve eşlemeyi kaydeder.
+
+    Chunk'lar (kaynak, chunk sırası) düzeninde işlenir; her grubun ilk
+    örneği kanonik kalır. `dry_run` ile sadece sayılar raporlanır.
+    """
+    t0 = time.perf_counter()
+    keys, offset = [], 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            break
+        keys += [((m or {}).get("source", ""), (m or {}).get("chunk_index", 0), i)
+                 for i, m in zip(page["ids"], page["metadatas"])]
+        offset += len(page["ids"])
+    keys.sort()
+
+    index = DedupIndex(":memory:") if dry_run else DedupIndex.open(chroma_path)
+    run = RunStats()
+    try:
+        for start in range(0, len(keys), page_size):
+            ids = [chunk_id for _, _, chunk_id in keys[start:start + page_size]]
+            got = collection.get(ids=ids, include=["documents", "metadatas"])
+            found = {i: (i, d, m or {}) for i, d, m in zip(got["ids"], got["documents"], got["metadatas"])}
+            chunks = [found[i] for i in ids if i in found]
+            decisions = index.assign(chunks)
+            for chunk, (_, kind) in zip(chunks, decisions):
+                run.add(chunk, kind)
+            dropped = [chunk[0] for chunk, (canonical, _) in zip(chunks, decisions) if canonical is not None]
+            if dropped and not dry_run:
+                collection.delete(ids=dropped)
+    finally:
+        index.close()
+    report = {**run.report(), "seconds": time.perf_counter() - t0, "dry_run": dry_run}
+    log.info(f"Tekilleştirme: {report['chunks']} chunk, {report['exact']} birebir + {report['near']} yakın kopya "
+             f"{'bulundu' if dry_run else 'silindi'} (chunk %{100 * report['dropped_ratio']:.1f}, "
+             f"metin %{100 * report['dropped_chars_ratio']:.1f} küçüldü, {report['seconds']:.1f} s)")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resmi Gazete chunk tekilleştirme")
+    parser.add_argument("command", choices=["collection", "show", "stats"])
+    parser.add_argument("chunk_id", nargs="?", help="show: kopyaları/kanoniği gösterilecek chunk")
+    parser.add_argument("--chroma-path", default=config.CHROMA_DB_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="collection: silmeden sadece say")
+    args = parser.parse_args()
+
+    if args.command == "collection":
+        import chromadb
+        from haberbot import lexical, vectors
+        from haberbot.ingest import wants_vector_export
+        collection = chromadb.PersistentClient(path=args.chroma_path).get_collection(name=config.CHROMA_COLLECTION_NAME)
+        report = dedup_collection(collection, args.chroma_path, args.dry_run)
+        if not args.dry_run and report["exact"] + report["near"]:
+            lexical.build_from_collection(collection, args.chroma_path)
+            if wants_vector_export(args.chroma_path):
+                vectors.export_collection(collection, args.chroma_path)
+        return
+
+    index = DedupIndex.open(args.chroma_path)
+    if args.command == "stats":
+        print(json.dumps(index.stats(), ensure_ascii=False, indent=2))
+    else:
+        print(json.dumps({"chunk": index.canonical_of(args.chunk_id), "duplicates": index.duplicates_of(args.chunk_id)},
+                         ensure_ascii=False, indent=2))
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
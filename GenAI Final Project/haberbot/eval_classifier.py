@@ -0,0 +1,110 @@
+"""Ön sınıflandırıcıyı LLM sınıflandırmasına karşı çevrimdışı değerlendirir.
+
+Her soru hem ön sınıflandırıcıdan hem de LLM'den geçirilir; ön
+sınıflandırıcının karar verdiği soruların oranı (kapsama), bu sorularda LLM
+ile uyum ve kazanılan süre raporlanır.
+
+Kullanım (GenAI Final Project klasöründen):
+    python -m haberbot.eval_classifier sorular.txt [--json rapor.json]
+
+Girdi dosyası her satırda bir soru içeren .txt veya "question" alanı olan
+.jsonl olabilir.
+"""
+import argparse
+import json
+import statistics
+import time
+from collections import Counter
+
+from haberbot.classifier import PreClassifier
+from haberbot.graph import llm_classify
+from haberbot.models import make_chat_model, make_embeddings, profile_for
+from haberbot.runtime import Runtime
+
+
+def load_questions(path):
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                questions.append(json.loads(line)["question"])
+            else:
+                questions.append(line)
+    return questions
+
+
+def evaluate(questions, rt):
+    """Her soru için iki yolu da çalıştırır ve özet istatistikleri döndürür."""
+    classifier = PreClassifier(rt)
+    classifier._ensure_centroids() # Merkez hesaplaması ilk sorunun süresine eklenmesin
+
+    rows = []
+    for question in questions:
+        t0 = time.perf_counter()
+        prediction = classifier.classify(question)
+        pre_seconds = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        llm_label, _ = llm_classify(question, rt)
+        llm_seconds = time.perf_counter() - t0
+
+        rows.append({
+            "question": question,
+            "pre_label": prediction.label if prediction else None,
+            "pre_method": prediction.method if prediction else None,
+            "llm_label": llm_label,
+            "pre_seconds": pre_seconds,
+            "llm_seconds": llm_seconds,
+        })
+
+    decided = [r for r in rows if r["pre_label"] is not None]
+    agreed = [r for r in decided if r["pre_label"] == r["llm_label"]]
+    # Karar verilen sorularda LLM çağrısı atlanır; belirsiz sorularda ön sınıflandırıcı süresi ek maliyettir
+    saved = sum(r["llm_seconds"] - r["pre_seconds"] for r in decided)
+    overhead = sum(r["pre_seconds"] for r in rows if r["pre_label"] is None)
+    return {
+        "total": len(rows),
+        "decided": len(decided),
+        "coverage": len(decided) / len(rows) if rows else 0.0,
+        "agreement": len(agreed) / len(decided) if decided else 0.0,
+        "by_method": dict(Counter(r["pre_method"] for r in decided)),
+        "disagreements": dict(Counter(f"{r['pre_label']}->{r['llm_label']}" for r in decided if r["pre_label"] != r["llm_label"])),
+        "pre_median_ms": statistics.median(r["pre_seconds"] for r in rows) * 1000 if rows else 0.0,
+        "llm_median_ms": statistics.median(r["llm_seconds"] for r in rows) * 1000 if rows else 0.0,
+        "saved_seconds": saved - overhead,
+        "rows": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ön sınıflandırıcı ile LLM sınıflandırmasının uyumunu ölçer.")
+    parser.add_argument("questions", help="Soru dosyası (.txt veya .jsonl)")
+    parser.add_argument("--json", dest="json_path", help="Detaylı sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    rt = Runtime(
+        embeddings=make_embeddings(),
+        llm=make_chat_model(profile_for("supervisor")), # Üretimde supervisor'ın kullandığı model ve sınırlar
+    )
+    report = evaluate(questions, rt)
+
+    print(f"\nToplam soru: {report['total']}")
+    print(f"Ön sınıflandırıcının karar verdiği: {report['decided']} (kapsama: %{report['coverage'] * 100:.1f}) {report['by_method']}")
+    print(f"LLM ile uyum (karar verilenlerde): %{report['agreement'] * 100:.1f}")
+    if report["disagreements"]:
+        print(f"Uyuşmazlıklar (ön->llm): {report['disagreements']}")
+    print(f"Medyan süre: ön sınıflandırıcı {report['pre_median_ms']:.1f} ms | LLM {report['llm_median_ms']:.1f} ms")
+    print(f"Toplam kazanılan süre: {report['saved_seconds']:.1f} s")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Detaylı sonuçlar '{args.json_path}' dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,405 @@
+"""LangGraph durum tanımı, düğümler ve yönlendirme mantığı.
+
+Düğümler modellere ve retriever'a modül seviyesindeki global değişkenler yerine
+`Runtime` üzerinden erişir; böylece grafik süreç başına bir kez kurulup
+Streamlit oturumları arasında paylaşılabilir (bkz. `haberbot.runtime`).
+"""
+from functools import partial
+from typing import TYPE_CHECKING, List, TypedDict
+from langgraph.graph import StateGraph, END
+
+from haberbot import config
+from haberbot.context import assemble_context, chunk_id_of
+from haberbot.limits import OverloadedError
+from haberbot.news import CircuitOpenError
+from haberbot.prefetch import MISSING
+from haberbot.streaming import strip_think
+from haberbot.telemetry import annotate, log, metrics, span, traced
+
+if TYPE_CHECKING:
+    from haberbot.runtime import Runtime
+
+
+# --- LangGraph Durum (State) Tanımı ---
+class AgentState(TypedDict):
+    question: str                 # Kullanıcının orijinal sorusu
+    classification: str | None    # Sorunun sınıfı: "resmi_gazete", "general", "irrelevant"
+    classification_method: str | None  # Sınıflandırmayı yapan kademe: "rules", "embedding", "llm"
+    context: List[str] | None     # RAG için ChromaDB'den alınan içerikler
+    context_ids: List[str] | None # Bağlamı oluşturan chunk ID'leri (arayüz metni bunlardan sonradan getirir)
+    answer: str | None            # Üretilen nihai cevap
+    source: str | None            # Cevabın kaynağı ("Resmi Gazete", "Genel Bilgi", "Yanıt Yok")
+    error: str | None             # İşlem sırasında oluşan hata mesajı
+    prefetch: dict | None         # Sınıflandırma sırasında başlatılan ön getirmeler (tür -> Future)
+
+
+# --- Yardımcılar ---
+def emit(event: dict):
+    """Grafik `stream_mode="custom"` ile akıtılıyorsa arayüze ara olay gönderir.
+
+    `invoke` ile çalışırken veya eski LangGraph sürümlerinde sessizce atlanır.
+    """
+    try:
+        from langgraph.config import get_stream_writer
+        get_stream_writer()(event)
+    except Exception:
+        pass
+
+
+def generate_answer(llm, prompt: str) -> str:
+    """Cevabı `llm.stream` ile üretir ve `<think>` bölümleri ayıklanmış metni döndürür.
+
+    Token'lar LangGraph'ın "messages" akış moduna buradan düşer; `invoke`
+    kullanıldığında da sonuç aynıdır.
+    """
+    emit({"event": "generating"})
+    return strip_think("".join(chunk.content for chunk in llm.stream(prompt)))
+
+
+# --- LangGraph Düğümleri (Nodes) ---
+
+# 1. Supervisor: Soruyu Sınıflandırma Düğümü (GÜNCELLENDİ)
+def llm_classify(question: str, rt: "Runtime"):
+    """Soruyu LLM kullanarak sınıflandırır ve cevaptan anahtar kelimeyi çıkarır.
+
+    (sınıflandırma, hata) ikilisi döndürür; hata yoksa ikinci eleman None'dır.
+    """
+    # Prompt'u biraz değiştirerek sınıflandırma kelimesini sonda belirtmesini teşvik edelim
+    prompt = f"""Aşağıdaki kullanıcı sorusunu analiz et ve hangi kategoriye girdiğini belirle. Analizini kısaca yaptıktan sonra cevabının SONUNDA mutlaka şu kelimelerden birini KULLAN: 'resmi_gazete', 'general' veya 'irrelevant'.
+
+    Kategoriler:
+    - 'resmi_gazete': Türkiye Cumhuriyeti Resmi Gazetesi (kanun, yönetmelik, ihale, kiralama, satış, KHK, kararname, tebliğ, atama, ilan vb.) ile ilgili sorular.
+    - 'general': Güncel olaylar, genel kültür, tanımlar, kişiler, yerler veya Resmi Gazete dışındaki diğer konular.
+    - 'irrelevant': Anlamsız, saldırgan, tamamlanmamış veya cevaplanması mümkün olmayan sorular.
+
+    Örnek Cevap Formatı:
+    Soru: "2024 yılı bütçe kanunu ne zaman yayınlandı?"
+    Analiz ve Kategori: Bu soru bir kanunla ilgili ve Resmi Gazete'de yayınlanır. resmi_gazete
+
+    Soru: "Türkiye'nin başkenti neresi?"
+    Analiz ve Kategori: Bu genel kültür sorusudur. general
+
+    Soru: "mavi uyur mu?"
+    Analiz ve Kategori: Bu soru anlamsızdır. irrelevant
+
+    Kullanıcı Sorusu: "{question}"
+
+    Analiz ve Kategori:"""
+
+    try:
+        response = rt.llm_for("supervisor").invoke(prompt)
+        response_text = response.content.strip().lower() # Yanıtı al ve küçük harfe çevir
+        log.debug(f"LLM Ham Yanıtı (Sınıflandırma): {response_text}")
+
+        valid_classifications = ["resmi_gazete", "general", "irrelevant"]
+        found_classification = None
+        # Yanıtın sonundan başlayarak anahtar kelimeleri ara (en son bulunanı al)
+        # Bunu yapmak için her kelimenin *son* geçtiği indeksi bulup en büyüğünü seçeceğiz
+        max_index = -1
+
+        for keyword in valid_classifications:
+            index = response_text.rfind(keyword) # Kelimenin *son* bulunduğu indeksi verir
+            if index > max_index: # Eğer bu keyword daha sonra (daha büyük indexte) bulunduysa
+                max_index = index
+                found_classification = keyword
+
+        if found_classification:
+            log.info(f"Çıkarılan Sınıflandırma (Son bulunan): {found_classification}")
+            classification = found_classification
+        else:
+            # Eğer hiçbir anahtar kelime bulunamazsa, varsayılan olarak 'general' kullan
+            # ve bir uyarı logla. Bu durum, LLM'in prompt'a hiç uymadığını gösterir.
+            log.warning(f"LLM yanıtında geçerli sınıflandırma kelimesi ('resmi_gazete', 'general', 'irrelevant') bulunamadı. Yanıt: '{response_text}'. 'general' olarak kabul ediliyor.")
+            classification = "general" # Güvenli varsayılan
+
+        return classification, None
+
+    except OverloadedError:
+        raise # Ollama kuyruğu dolu: varsayılan sınıfa düşmek yerine istek reddedilir (API 503 döner)
+    except Exception as e:
+        log.error(f"Soru sınıflandırma sırasında: {e}")
+        # Hata durumunda da güvenli bir varsayılan belirle
+        return "general", f"Sınıflandırma sırasında LLM hatası: {e}"
+
+
+def classify_question_node(state: AgentState, rt: "Runtime"):
+    """Soruyu önce hızlı ön sınıflandırıcıyla, emin olunamazsa LLM ile sınıflandırır."""
+    log.debug("--- Supervisor: Soruyu Sınıflandırıyor ---")
+    question = state["question"]
+
+    # Retrieval/haber araması sınıflandırmaya bağlı değil; açıksa şimdiden başlat
+    prefetch = rt.prefetcher.start(question, rt) if rt.prefetcher is not None else None
+
+    try:
+        if rt.classifier is not None:
+            prediction = rt.classifier.classify(question)
+            if prediction is not None:
+                log.info(f"Ön sınıflandırıcı kararı: {prediction.label} ({prediction.method}, güven: {prediction.confidence:.3f})")
+                return classified(prediction.label, prediction.method, prefetch)
+            log.info("Ön sınıflandırıcı emin değil, LLM ile sınıflandırılıyor...")
+
+        classification, error = llm_classify(question, rt)
+    except Exception:
+        # İstek reddedildiyse (ör. OverloadedError -> 503) başlamamış ön getirmeler iptal edilir;
+        # sistem yoğunken haber API kotası ve retrieval boşa harcanmaz
+        if prefetch is not None:
+            rt.prefetcher.claim(prefetch, None)
+        raise
+    return classified(classification, "llm", prefetch, error)
+
+
+def classified(classification: str, method: str, prefetch, error: str = None) -> dict:
+    """Supervisor güncellemesini oluşturur ve yönlendirmeyi izlere/metriklere yazar."""
+    annotate(route=classification, classification_method=method)
+    metrics.inc("haberbot_route_total", route=classification, method=method)
+    return {"classification": classification, "classification_method": method, "prefetch": prefetch, "error": error}
+
+
+def claim_prefetch(state: AgentState, rt: "Runtime", kind: str = None):
+    """Düğümün ihtiyaç duyduğu ön getirme sonucunu alır, diğerlerini bırakır.
+
+    Ön getirme yoksa `MISSING` döner; düğüm işi kendisi yapar.
+    """
+    if rt.prefetcher is None:
+        return MISSING
+    return rt.prefetcher.claim(state.get("prefetch"), kind)
+
+
+# 2. Resmi Gazete RAG Agent Düğümü
+def resmi_gazete_rag_node(state: AgentState, rt: "Runtime"):
+    """ChromaDB'den ilgili belgeleri alır ve LLM ile cevap üretir."""
+    log.debug("--- Agent: Resmi Gazete RAG ---")
+    question = state["question"]
+    try:
+        log.info("ChromaDB'den dokümanlar alınıyor...")
+        # Sınıflandırma sırasında başlatılmış arama varsa onu kullan, yoksa aramayı şimdi yap.
+        # Sorudaki tarih/sayı/tür kısıtları metadata filtresine çevrilir (bkz. haberbot.metadata)
+        docs = claim_prefetch(state, rt, "retrieval")
+        if docs is MISSING:
+            docs = traced("retrieval", rt.retrieve)(question)
+        log.info(f"{len(docs)} doküman bulundu.")
+        emit({"event": "retrieved", "count": len(docs)})
+        metrics.inc("haberbot_retrieved_chunks_total", len(docs))
+        context_ids = [chunk_id_of(doc) for doc in docs]
+        annotate(chunks=context_ids, scores=[doc.metadata.get("score") for doc in docs])
+        # Komşu chunk'ları birleştir, örtüşmeleri at ve token bütçesine sığdır
+        assembled = assemble_context(docs)
+        context_list = assembled.passages
+        context_str = config.CONTEXT_SEPARATOR.join(context_list) # String formatında context
+        if docs:
+            log.info(f"Bağlam: {assembled.chunks_in} chunk -> {len(context_list)} parça, "
+                     f"~{assembled.tokens_in} -> ~{assembled.tokens_out} token ({assembled.tokens_saved} token tasarruf)")
+            annotate(context_tokens=assembled.tokens_out, context_tokens_saved=assembled.tokens_saved)
+
+        if not docs:
+            log.info("Resmi Gazete için ilgili doküman bulunamadı.")
+            context_str = "Resmi Gazete arşivinde bu konuyla doğrudan ilgili bir belge bulunamadı. Bu bilgiye dayanarak cevap ver."
+
+        # Prompt'u biraz daha netleştirelim
+        prompt = f"""Sen Türkiye Cumhuriyeti Resmi Gazetesi içerikleri konusunda uzman bir yapay zeka asistanısın.
+        Aşağıda sana sağlanan Bağlam (Context) bölümündeki Resmi Gazete alıntılarını ve Kullanıcı Sorusu'nu dikkatlice incele.
+        SADECE sağlanan Bağlam'daki bilgileri kullanarak Kullanıcı Sorusu'nu DOĞRUDAN ve NET bir şekilde cevapla.
+        Eğer Bağlam soruyu cevaplamak için yeterli bilgi içermiyorsa, "Sağlanan Resmi Gazete belgelerinde bu soruya doğrudan cevap verecek bilgi bulunmamaktadır." şeklinde belirt.
+        Kesinlikle Bağlam dışı bilgi kullanma veya yorum yapma.
+
+        Bağlam (Context):
+        ---
+        {context_str}
+        ---
+
+        Kullanıcı Sorusu: {question}
+
+        Cevap (Sadece Bağlama Göre):"""
+
+        log.info("LLM ile cevap üretiliyor...")
+        answer = generate_answer(rt.llm_for("resmi_gazete_agent"), prompt)
+
+        # Cevabı state'e eklerken context'i de liste olarak ekle
+        return {"context": context_list, "context_ids": context_ids, "answer": answer, "source": "Resmi Gazete",
+                "error": None}
+
+    except OverloadedError:
+        raise
+    except Exception as e:
+        log.error(f"Resmi Gazete RAG sırasında: {e}")
+        return {"answer": "Resmi Gazete verilerine erişirken veya cevap oluştururken teknik bir sorun oluştu.", "source": "Hata", "error": str(e)}
+
+
+# 3. Genel Bilgi Agent Düğümü
+def general_knowledge_node(state: AgentState, rt: "Runtime"):
+    """
+    Kullanıcının sorusuyla ilgili NewsData.io'dan güncel haberleri arar,
+    bulunan haberleri bağlam olarak kullanarak LLM ile cevap üretir.
+    API anahtarı yoksa veya hata alınırsa sadece LLM kullanılır (fallback).
+    """
+    log.debug("--- Agent: Genel Bilgi (NewsData.io ile) ---")
+    question = state["question"]
+    news_context_str = "Güncel haberler aranmadı veya bulunamadı." # Başlangıç değeri
+    source = "Genel Bilgi (LLM)" # Başlangıç kaynağı
+
+    if rt.news is None:
+        claim_prefetch(state, rt) # Kullanılmayacak ön getirmeleri bırak
+        log.warning("NewsData.io API anahtarı ayarlanmamış. Sadece LLM kullanılacak.")
+        # API anahtarı yoksa doğrudan LLM'e git (fallback)
+    else:
+        try:
+            log.info(f"NewsData.io API'si ile '{question}' sorgusu yapılıyor...")
+            # Paylaşımlı istemci: bağlantı havuzu, sonuç önbelleği, zaman aşımı ve devre kesici içerir
+            # Türkçe haberleri ara, en fazla 5 sonuç getir
+            response = claim_prefetch(state, rt, "news") # Sınıflandırma sırasında başlatıldıysa
+            if response is MISSING:
+                response = rt.news.search(question, size=5) # size değerini ayarlayabilirsin
+
+            if response.get("status") == "success":
+                articles = response.get("results", [])
+                total_results = response.get("totalResults", 0)
+                log.info(f"NewsData.io API'den {len(articles)}/{total_results} makale bulundu.")
+                emit({"event": "news", "count": len(articles)})
+
+                if articles:
+                    # Bulunan makalelerden bir bağlam oluştur
+                    context_parts = []
+                    for i, article in enumerate(articles):
+                        title = article.get('title', 'Başlık Yok')
+                        description = article.get('description', 'Açıklama Yok')
+                        pubDate = article.get('pubDate', 'Tarih Yok')
+                        link = article.get('link', '#')
+                        source_id = article.get('source_id', 'Kaynak Yok')
+                        context_parts.append(f"Haber {i+1} ({source_id} - {pubDate}):\nBaşlık: {title}\nAçıklama: {description}\nLink: {link}")
+
+                    news_context_str = "\n\n---\n\n".join(context_parts)
+                    source = "Genel Bilgi (NewsData.io)" # Kaynağı güncelle
+                    log.info("Haber içerikleri LLM için hazırlandı.")
+                else:
+                    news_context_str = "Bu konuyla ilgili güncel haber bulunamadı."
+                    log.info("NewsData.io'da ilgili haber bulunamadı.")
+            else:
+                # API hatası durumunda logla ve LLM fallback yap
+                error_msg = response.get("results", {}).get("message", "Bilinmeyen API hatası")
+                log.error(f"NewsData.io API hatası: {error_msg}")
+                news_context_str = f"Güncel haberler aranırken bir API hatası oluştu: {error_msg}"
+                source = "Genel Bilgi (LLM - Haber API Hatası)"
+
+        except CircuitOpenError as e:
+            # API art arda hata verdi veya rate limit'e takıldı; beklemeden LLM'e düş
+            log.warning(str(e))
+            news_context_str = "Haber servisi geçici olarak devre dışı olduğu için güncel haber aranamadı."
+            source = "Genel Bilgi (LLM - Haber API Devre Dışı)"
+
+        except Exception as e:
+            # Genel API veya kütüphane hatası (zaman aşımı dahil)
+            log.error(f"NewsData.io API çağrısı sırasında beklenmedik hata: {e}")
+            news_context_str = f"Güncel haberler aranırken bir sistem hatası oluştu: {e}"
+            source = "Genel Bilgi (LLM - Haber Sistemi Hatası)"
+
+    # --- LLM ile Cevap Üretme ---
+    log.info(f"Kaynak: {source}. LLM ile cevap üretiliyor...")
+    # LLM'e verilecek prompt'u haber bağlamına göre ayarla
+    prompt = f"""Sen güncel olaylar ve genel konularda bilgi veren bir asistansın.
+Aşağıda kullanıcı sorusuyla ilgili olabilecek güncel haber özetleri bulunmaktadır (eğer varsa).
+Bu haber özetlerini ve kendi genel bilgini kullanarak kullanıcı sorusunu cevapla.
+Eğer haberler soruyu doğrudan yanıtlamıyorsa veya haber bulunamadıysa, bunu belirt ve soruyu genel bilginle cevaplamaya çalış.
+
+Güncel Haber Özeti Bağlamı:
+---
+{news_context_str}
+---
+
+Kullanıcı Sorusu: {question}
+
+Cevap:"""
+
+    try:
+        answer = generate_answer(rt.llm_for("general_agent"), prompt)
+        # Genel bilgi node'u için context'i None yapalım, çünkü bu RAG context'i değil
+        return {"context": None, "answer": answer, "source": source, "error": None}
+    except OverloadedError:
+        raise
+    except Exception as e:
+        log.error(f"Genel bilgi LLM çağrısı sırasında: {e}")
+        # LLM hatasında bile bir cevap döndürmeye çalışalım
+        fallback_answer = "Sorunuzu yanıtlarken bir sorunla karşılaştım. Lütfen daha sonra tekrar deneyin."
+        if "API hatası" in news_context_str or "sistem hatası" in news_context_str:
+            # Eğer API hatası varsa, bunu yanıta ekleyebiliriz
+             fallback_answer = f"Güncel haberleri alırken bir sorun oluştuğu için sorunuzu yanıtlayamıyorum: {news_context_str}"
+
+        return {"context": None, "answer": fallback_answer, "source": "Hata", "error": str(e)}
+
+
+# 4. Fallback Agent Düğümü
+def fallback_node(state: AgentState, rt: "Runtime"):
+    """Uygun olmayan veya cevaplanamayan sorular için standart yanıt verir."""
+    log.debug("--- Agent: Fallback ---")
+    claim_prefetch(state, rt) # Ön getirmelerin hiçbiri kullanılmayacak
+    answer = "Üzgünüm, bu soruya şu an için yanıt veremiyorum. Sorunuz anlaşılamamış veya bilgi alanımın dışında olabilir."
+    # Fallback'te context olmaz
+    return {"context": None, "answer": answer, "source": "Yanıt Yok", "error": None}
+
+
+# --- LangGraph Yönlendirme Mantığı (Conditional Edges) ---
+def route_question(state: AgentState):
+    """Sınıflandırmaya göre bir sonraki düğümü belirler."""
+    classification = state.get("classification")
+    log.info(f"Yönlendirme Kararı: '{classification}' sınıflandırmasına göre yapılıyor.")
+
+    if classification == "resmi_gazete":
+        return "resmi_gazete_agent"
+    elif classification == "general":
+        return "general_agent"
+    elif classification == "irrelevant":
+        return "fallback_agent"
+    else:
+        # Bu durumun aslında classify_question_node'daki varsayılan atama ile
+        # engellenmesi lazım ama yine de bir güvenlik önlemi olarak kalsın.
+        log.warning(f"Geçersiz veya eksik sınıflandırma '{classification}'. Fallback'e yönlendiriliyor.")
+        return "fallback_agent"
+
+
+# --- LangGraph Grafiğini Oluşturma ---
+TRACED_FIELDS = ("classification", "classification_method", "source", "error")
+
+
+def traced_node(name: str, node):
+    """Düğümü bir span içinde çalıştırır; sınıf/kaynak/hata alanlarını span'e ve isteğin izine yazar."""
+    def run(state: AgentState):
+        with span(name) as attrs:
+            update = node(state)
+            if update:
+                attrs.update({key: update[key] for key in TRACED_FIELDS if update.get(key) is not None})
+                if update.get("source"):
+                    annotate(source=update["source"])
+            return update
+    return run
+
+
+def build_workflow(rt: "Runtime") -> StateGraph:
+    """Düğümleri verilen Runtime kaynaklarına bağlayarak StateGraph'ı kurar (derlemeden döndürür)."""
+    workflow = StateGraph(AgentState)
+
+    # Düğümleri ekle (her biri izlenir, bkz. haberbot.telemetry)
+    workflow.add_node("supervisor", traced_node("supervisor", partial(classify_question_node, rt=rt)))
+    workflow.add_node("resmi_gazete_agent", traced_node("resmi_gazete_agent", partial(resmi_gazete_rag_node, rt=rt)))
+    workflow.add_node("general_agent", traced_node("general_agent", partial(general_knowledge_node, rt=rt)))
+    workflow.add_node("fallback_agent", traced_node("fallback_agent", partial(fallback_node, rt=rt)))
+
+    # Giriş noktasını belirle
+    workflow.set_entry_point("supervisor")
+
+    # Koşullu kenarları ekle (Supervisor'dan sonra nereye gidilecek?)
+    workflow.add_conditional_edges(
+        "supervisor",
+        route_question,
+        {
+            # Hedef düğüm isimleri add_node ile tanımlananlarla eşleşmeli
+            "resmi_gazete_agent": "resmi_gazete_agent",
+            "general_agent": "general_agent",
+            "fallback_agent": "fallback_agent",
+        }
+    )
+
+    # Agent düğümlerinden sonra bitişe git (END)
+    workflow.add_edge("resmi_gazete_agent", END)
+    workflow.add_edge("general_agent", END)
+    workflow.add_edge("fallback_agent", END)
+
+    return workflow
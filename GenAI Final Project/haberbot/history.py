@@ -0,0 +1,53 @@
+"""Streamlit oturumu için sınırlı sohbet geçmişi.
+
+Streamlit her mesajda betiği baştan çalıştırır ve geçmişteki her mesajı
+yeniden çizer. Geçmiş sınırsız büyür ve her Resmi Gazete cevabının bağlam
+metnini tutarsa, uzun oturumlar hem her soruda yavaşlar hem de kullanıcı
+başına sunucu belleğinde bütün bağlamı saklar. Bu sınıf:
+- En fazla `CHAT_HISTORY_MAX_MESSAGES` mesaj tutar, en eskileri atar,
+- Bağlamı metin yerine chunk ID'leri olarak saklar; metin, arayüzde
+  bağlam açıldığında ID'lerden getirilir (bkz. `Runtime.fetch_context`),
+- Her mesaja sabit bir numara verir (widget anahtarları için) ve
+  sayfalama için son `n` mesajı döndürür.
+"""
+from collections import deque
+from typing import List, Optional, Tuple
+
+from haberbot import config
+
+
+class ChatHistory:
+    def __init__(self, max_messages: int = None):
+        self.messages = deque(maxlen=max_messages or config.CHAT_HISTORY_MAX_MESSAGES)
+        self.dropped = 0 # Sınır yüzünden atılan mesaj sayısı
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def _append(self, message: dict) -> dict:
+        if len(self.messages) == self.messages.maxlen:
+            self.dropped += 1
+        message["id"] = self._next_id
+        self._next_id += 1
+        self.messages.append(message)
+        return message
+
+    def add_user(self, content: str) -> dict:
+        return self._append({"role": "user", "content": content})
+
+    def add_assistant(self, content: str, source: str = None, context_ids: Optional[List[str]] = None,
+                      context: Optional[List[str]] = None) -> dict:
+        """Asistan cevabını ekler; bağlam ID'leri varsa metin saklanmaz.
+
+        ID'si olmayan bağlam (ör. eski önbellek kayıtları) olduğu gibi tutulur.
+        """
+        message = {"role": "assistant", "content": content, "source": source, "context_ids": context_ids}
+        if context_ids is None and context:
+            message["context"] = context
+        return self._append(message)
+
+    def window(self, visible: int) -> Tuple[int, List[dict]]:
+        """Son `visible` mesajı ve onlardan önce gizli kalan mesaj sayısını döndürür."""
+        hidden = max(len(self.messages) - visible, 0)
+        return hidden, [self.messages[i] for i in range(hidden, len(self.messages))]
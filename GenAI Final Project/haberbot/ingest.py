@@ -0,0 +1,478 @@
+"""Resmi Gazete .txt dosyalarını ChromaDB'ye artımlı ve kaldığı yerden devam edebilir şekilde yükler.
+
+Kaggle notebook'u (embedding.ipynb) her çalıştırmada tüm korpusu baştan embed
+ediyordu ve aynı klasörde tekrar çalıştırıldığında ID çakışmasıyla hata
+veriyordu. Bu araç:
+- Chroma klasöründe dosya içerik hash'lerinden oluşan bir manifest tutar,
+- Sadece yeni veya değişmiş dosyaları embed edip `upsert` eder,
+- Silinmiş dosyaların chunk'larını koleksiyondan kaldırır,
+- Birebir ve yakın kopya chunk'ları embed etmeden atar, her birinin
+  kanonik chunk'ını kaydeder (bkz. `haberbot.dedup`),
+- Her chunk'a yayım tarihi, gazete sayısı ve belge türünü metadata olarak
+  yazar (bkz. `haberbot.metadata`); kuralları eski bir sürümle yüklenmiş
+  dosyaların sadece metadata'sı güncellenir, yeniden embed edilmez,
+- Sınırlı boyutlu batch'lerle yazar ve her batch'ten sonra manifesti
+  günceller; yarıda kesilen bir çalıştırma kaldığı batch'ten devam eder.
+
+Dosyalar akış halinde işlenir: bölme süreç havuzunda, embedding ve yazma ayrı
+thread'lerde yapılır ve aşamalar sınırlı kuyruklarla bağlanır. Bellekte aynı
+anda sadece birkaç dosyanın chunk'ları bulunur; tepe bellek korpus boyutuyla
+büyümez. Çalıştırma sonunda aşama başına chunk/s raporlanır.
+
+Koleksiyon adı, embedding modeli ve chunk ayarları `haberbot.config` ile
+uygulamayla ortaktır. Chunk'lar notebook'taki gibi öneksiz embed edilir ve
+normalize edilir; kullanılan altyapı manifeste yazılır ve farklı bir
+altyapıyla aynı koleksiyona yükleme reddedilir (vektörler karışmasın diye).
+
+Kullanım (GenAI Final Project klasöründen):
+    python -m haberbot.ingest /yol/gazete-txt [--backend ollama|sentence-transformers]
+"""
+import argparse
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource # Sadece Unix; Windows'ta tepe bellek raporlanmaz
+except ImportError:
+    resource = None
+
+import chromadb
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from haberbot import config, dedup, lexical, metadata, vectors
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_id(source: str, index: int) -> str:
+    """Notebook'taki ID şemasıyla aynı: '<dosya>_chunk_<i>'."""
+    return f"{source}_chunk_{index}"
+
+
+class Manifest:
+    """Dosya adı -> {sha256, status, chunks, metadata} eşlemesini JSON olarak saklar.
+
+    status "done" ise dosya tamamen yüklenmiştir; "partial" ise ilk `chunks`
+    kadar parça yazılmıştır ve aynı hash ile devam edilebilir. `metadata`,
+    chunk metadata'sını üreten kuralların sürümüdür (`METADATA_VERSION`).
+    `embedder`, koleksiyondaki vektörleri üreten altyapıdır (`embedder_info`).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files = {}
+        self.embedder = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.files = data.get("files", {})
+            self.embedder = data.get("embedder")
+
+    def save(self):
+        # Yarıda kesilmede bozuk manifest kalmasın diye önce geçici dosyaya yaz
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"embedder": self.embedder, "files": self.files}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+def embedder_info(backend: str) -> dict:
+    """Manifeste yazılan embedding ayarları; aynı koleksiyona farklı ayarla yükleme yapılamaz."""
+    model = config.ST_EMBED_MODEL if backend == "sentence-transformers" else config.OLLAMA_EMBED_MODEL
+    return {"backend": backend, "model": model, "prefix": "", "normalized": config.INGEST_EMBED_NORMALIZE}
+
+
+def check_embedder(manifest: Manifest, backend: str):
+    """Koleksiyon başka bir altyapı/normalizasyonla üretildiyse RuntimeError verir."""
+    info = embedder_info(backend)
+    if manifest.embedder is None:
+        if manifest.files:
+            print(f"UYARI: Manifestte embedding altyapısı kayıtlı değil, {backend} olarak kaydediliyor.")
+        manifest.embedder = info
+        manifest.save()
+        return
+    if manifest.embedder != info:
+        raise RuntimeError(f"HATA: Koleksiyon farklı bir embedding ayarıyla oluşturulmuş ({manifest.embedder}); "
+                           f"{info} ile yükleme yapılamaz. Aynı --backend ile çalıştırın veya koleksiyonu "
+                           f"yeniden oluşturun.")
+
+
+def _normalize(vectors) -> list:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return (matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)).tolist()
+
+
+def make_embedder(backend: str):
+    """Metin listesini embedding listesine çeviren bir fonksiyon döndürür.
+
+    İki altyapı da notebook'la aynı vektörü üretir: önek yok, birim uzunluk.
+    """
+    if backend == "sentence-transformers":
+        from sentence_transformers import SentenceTransformer
+        import torch
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        print(f"Embedding modeli yükleniyor: {config.ST_EMBED_MODEL} ({device})")
+        model = SentenceTransformer(config.ST_EMBED_MODEL, device=device)
+        return lambda texts: model.encode(texts, batch_size=32,
+                                          normalize_embeddings=config.INGEST_EMBED_NORMALIZE).tolist()
+
+    from haberbot.models import make_embeddings
+    print(f"Ollama embedding modeli kullanılıyor: {config.OLLAMA_EMBED_MODEL} ({config.OLLAMA_BASE_URL})")
+    # `/api/embed`: batch tek istekte, öneksiz; Ollama zaten normalize döndürür, normalizasyon güvence içindir
+    embeddings = make_embeddings()
+    if not config.INGEST_EMBED_NORMALIZE:
+        return embeddings.embed_documents
+    return lambda texts: _normalize(embeddings.embed_documents(texts))
+
+
+def make_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=config.CHUNK_SIZE,
+        chunk_overlap=config.CHUNK_OVERLAP,
+        length_function=len,
+        add_start_index=True, # Her parçanın başlangıç indeksini metadata'ya ekler
+    )
+
+
+def split_file(path: str, splitter: RecursiveCharacterTextSplitter, source: str):
+    """Dosyayı chunk'lara böler; (id, metin, metadata) listesi döndürür.
+
+    Tarih ve sayı dosya başlığından, belge türü chunk'tan önceki son bölüm
+    başlığından alınır (bkz. `haberbot.metadata`).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    file_meta = metadata.file_metadata(content)
+    markers = metadata.type_markers(content)
+    chunks = []
+    for i, doc in enumerate(splitter.create_documents([content])):
+        start = doc.metadata.get("start_index", -1)
+        chunk_meta = {"source": source, "chunk_index": i, "start_index": start, **file_meta}
+        doc_type = metadata.chunk_doc_type(markers, start, len(doc.page_content))
+        if doc_type is not None:
+            chunk_meta["doc_type"] = doc_type
+        chunks.append((chunk_id(source, i), doc.page_content, chunk_meta))
+    return chunks
+
+
+def retag_files(collection, manifest: Manifest, data_folder: str, names) -> int:
+    """Değişmemiş dosyaların chunk metadata'sını güncel çıkarım kurallarıyla yeniden yazar (embedding'e dokunmaz)."""
+    splitter = make_splitter()
+    for name in names:
+        chunks = split_file(os.path.join(data_folder, name), splitter, name)
+        # Kopya olduğu için hiç yazılmamış chunk'lar atlanır
+        stored = set(collection.get(ids=[c[0] for c in chunks], include=[])["ids"]) if chunks else set()
+        chunks = [c for c in chunks if c[0] in stored]
+        if chunks:
+            collection.update(ids=[c[0] for c in chunks], metadatas=[c[2] for c in chunks])
+        manifest.files[name]["metadata"] = config.METADATA_VERSION
+    if names:
+        manifest.save()
+        print(f"{len(names)} dosyanın metadata'sı güncellendi (yeniden embed edilmedi).")
+    return len(names)
+
+
+_worker_splitter = None
+
+
+def _split_in_worker(path: str, source: str):
+    """Süreç havuzunda çalışır; splitter her işçi süreçte bir kez oluşturulur."""
+    global _worker_splitter
+    if _worker_splitter is None:
+        _worker_splitter = make_splitter()
+    t0 = time.perf_counter()
+    chunks = split_file(path, _worker_splitter, source)
+    return chunks, time.perf_counter() - t0
+
+
+def iter_split_files(jobs, data_folder: str, workers: int):
+    """Dosyaları süreç havuzunda böler, sonuçları gönderim sırasıyla üretir.
+
+    Aynı anda en fazla `2 * workers` dosya işlenmede tutulur; böylece bellekte
+    korpusun tamamı değil, sadece birkaç dosyanın chunk'ları bulunur.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for job in jobs:
+            in_flight.append((job, pool.submit(_split_in_worker, os.path.join(data_folder, job[0]), job[0])))
+            if len(in_flight) >= 2 * workers:
+                job_done, future = in_flight.popleft()
+                yield (job_done, *future.result())
+        while in_flight:
+            job_done, future = in_flight.popleft()
+            yield (job_done, *future.result())
+
+
+class PipelineStats:
+    """Aşama başına işlenen chunk sayısı ve meşgul süre (throughput raporu için)."""
+
+    def __init__(self):
+        self.chunks = {"split": 0, "embed": 0, "write": 0}
+        self.seconds = {"split": 0.0, "embed": 0.0, "write": 0.0}
+
+    def add(self, stage: str, chunks: int, seconds: float):
+        self.chunks[stage] += chunks
+        self.seconds[stage] += seconds
+
+    def throughput(self, stage: str) -> float:
+        return self.chunks[stage] / self.seconds[stage] if self.seconds[stage] else 0.0
+
+
+_DONE = object() # Kuyruklar için bitiş işareti
+
+
+def _put(q: queue.Queue, item, failed: threading.Event):
+    """Kuyruk doluysa bekler (backpressure); sonraki aşama hata verdiyse vazgeçer."""
+    while not failed.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+    raise RuntimeError("Ingestion hattında bir aşama hata verdi, durduruluyor.")
+
+
+def _get(q: queue.Queue, failed: threading.Event):
+    """Kuyruktan bir öğe alır; hattın başka bir yerinde hata olduysa bitiş işareti döndürür."""
+    while not failed.is_set():
+        try:
+            return q.get(timeout=0.5)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def wants_vector_export(chroma_path: str) -> bool:
+    """mmap vektör indeksi kullanılıyor veya daha önce dışa aktarılmışsa ingest sonunda yenilenir."""
+    return config.VECTOR_BACKEND == "mmap" or os.path.isdir(vectors.index_dir(chroma_path))
+
+
+def ingest(data_folder: str, chroma_path: str = None, backend: str = None, batch_size: int = None,
+           workers: int = None, queue_size: int = None, deduplicate: bool = None):
+    """Yeni/değişmiş dosyaları böl -> tekilleştir -> embed et -> yaz hattından geçirir.
+
+    Aşamalar sınırlı kuyruklarla bağlıdır: bölme süreç havuzunda, embedding
+    ve Chroma'ya yazma ayrı thread'lerde çalışır. Kuyruklar dolunca önceki
+    aşama bekler, böylece bellek kullanımı korpus boyutundan bağımsız kalır.
+    Tekilleştirme ana thread'de, bölünmüş dosyalar embedding kuyruğuna
+    girmeden yapılır; atılan chunk'lar embed edilmez ve yazılmaz.
+    """
+    chroma_path = chroma_path or config.CHROMA_DB_PATH
+    batch_size = batch_size or config.INGEST_BATCH_SIZE
+    workers = workers or config.INGEST_SPLIT_WORKERS
+    queue_size = queue_size or config.INGEST_QUEUE_SIZE
+    deduplicate = config.DEDUP_ENABLED if deduplicate is None else deduplicate
+    if not os.path.isdir(data_folder):
+        raise FileNotFoundError(f"HATA: Belirtilen veri klasörü bulunamadı: {data_folder}")
+
+    os.makedirs(chroma_path, exist_ok=True)
+    manifest = Manifest(os.path.join(chroma_path, config.INGEST_MANIFEST_NAME))
+    # Altyapı verilmezse koleksiyonu üreten altyapıyla devam edilir
+    backend = backend or (manifest.embedder or {}).get("backend") or config.INGEST_EMBED_BACKEND
+    check_embedder(manifest, backend)
+    client = chromadb.PersistentClient(path=chroma_path)
+    collection = client.get_or_create_collection(name=config.CHROMA_COLLECTION_NAME)
+    dedup_index = dedup.DedupIndex.open(chroma_path) if deduplicate else None
+
+    txt_files = sorted(f for f in os.listdir(data_folder) if f.endswith(".txt"))
+    print(f"{len(txt_files)} adet .txt dosyası bulundu, manifestte {len(manifest.files)} kayıt var.")
+
+    # 1. Silinmiş dosyaların chunk'larını kaldır
+    removed = [name for name in manifest.files if name not in set(txt_files)]
+    for name in removed:
+        collection.delete(where={"source": name})
+        del manifest.files[name]
+        print(f" - Silindi: {name}")
+    if removed:
+        manifest.save()
+
+    # 2. Yeni/değişmiş dosyaları belirle; yarım kalanlar için başlangıç noktasını bul
+    jobs, stale, changed, digests = [], [], [], {}
+    for name in txt_files:
+        digest = digests[name] = file_sha256(os.path.join(data_folder, name))
+        entry = manifest.files.get(name)
+        if entry and entry["sha256"] == digest:
+            if entry["status"] == "done":
+                if entry.get("metadata") != config.METADATA_VERSION:
+                    stale.append(name)
+                continue
+            jobs.append((name, digest, entry["chunks"])) # Yarıda kalan çalıştırmadan devam et
+        else:
+            if entry:
+                # İçerik değişmiş: eski chunk'ları (sayıları farklı olabilir) temizle
+                collection.delete(where={"source": name})
+                changed.append(name)
+            jobs.append((name, digest, 0))
+    if dedup_index is not None:
+        # Kanonik chunk'ı silinen kopyalar hiç embed edilmediği için içerdikleri dosyalar baştan yüklenir.
+        # Manifeste girmeden silinmiş dosyalar (yarıda kesilen çalıştırma) da bırakılır.
+        gone = dedup_index.sources() - set(txt_files)
+        queued = {job[0] for job in jobs}
+        orphans = sorted(dedup_index.release(set(removed) | set(changed) | gone) - queued - gone - set(removed))
+        for name in orphans:
+            collection.delete(where={"source": name})
+            manifest.files.pop(name, None)
+            jobs.append((name, digests[name], 0))
+            stale = [s for s in stale if s != name]
+            print(f" - Kanonik chunk'ı silinen kopyalar için yeniden yüklenecek: {name}")
+        if orphans:
+            manifest.save()
+    print(f"{len(jobs)} dosya embed edilecek, {len(txt_files) - len(jobs)} dosya değişmemiş.")
+    retagged = retag_files(collection, manifest, data_folder, stale)
+    if not jobs:
+        if removed or lexical.LexicalIndex.open(chroma_path) is None:
+            lexical.build_from_collection(collection, chroma_path)
+        # mmap indeksindeki filtre sütunları da metadata'yla birlikte yenilenir
+        if wants_vector_export(chroma_path) and (removed or retagged or vectors.VectorIndex.open(chroma_path) is None):
+            vectors.export_collection(collection, chroma_path)
+        if dedup_index is not None:
+            dedup_index.close()
+        return {"files": 0, "chunks": 0, "removed": len(removed), "retagged": retagged, "seconds": 0.0}
+
+    embed = make_embedder(backend)
+    stats = PipelineStats()
+    dedup_stats = dedup.RunStats()
+    embed_queue = queue.Queue(maxsize=queue_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    failed = threading.Event()
+    errors = []
+
+    def embed_stage():
+        try:
+            while (item := _get(embed_queue, failed)) is not _DONE:
+                if item["chunks"]:
+                    t0 = time.perf_counter()
+                    item["embeddings"] = embed([c[1] for c in item["chunks"]])
+                    stats.add("embed", len(item["chunks"]), time.perf_counter() - t0)
+                _put(write_queue, item, failed)
+            _put(write_queue, _DONE, failed)
+        except BaseException as e:
+            errors.append(e)
+            failed.set()
+
+    def write_stage():
+        try:
+            while (item := _get(write_queue, failed)) is not _DONE:
+                name, batch = item["name"], item["chunks"]
+                t0 = time.perf_counter()
+                if batch:
+                    collection.upsert(
+                        ids=[c[0] for c in batch],
+                        documents=[c[1] for c in batch],
+                        metadatas=[c[2] for c in batch],
+                        embeddings=item["embeddings"],
+                    )
+                written = item["offset"] + item["count"] # Atılan kopyalar da işlenmiş sayılır
+                status = "done" if written >= item["total"] else "partial"
+                manifest.files[name] = {"sha256": item["digest"], "status": status, "chunks": written,
+                                        "metadata": config.METADATA_VERSION}
+                manifest.save() # Checkpoint
+                stats.add("write", len(batch), time.perf_counter() - t0)
+                if status == "done":
+                    print(f" - Yüklendi: {name} ({item['total']} chunk)")
+        except BaseException as e:
+            errors.append(e)
+            failed.set()
+
+    threads = [threading.Thread(target=embed_stage, daemon=True), threading.Thread(target=write_stage, daemon=True)]
+    for t in threads:
+        t.start()
+
+    started = time.time()
+    try:
+        for (name, digest, start), chunks, split_seconds in iter_split_files(jobs, data_folder, workers):
+            stats.add("split", len(chunks), split_seconds)
+            if start:
+                print(f" - Devam ediliyor: {name} ({start}/{len(chunks)} chunk yazılmıştı)")
+            decisions = dedup_index.assign(chunks) if dedup_index is not None else [(None, "unique")] * len(chunks)
+            for chunk, (_, kind) in zip(chunks[start:], decisions[start:]):
+                dedup_stats.add(chunk, kind)
+            # Boş dosyalar da tek bir boş batch ile "done" olarak işaretlenir
+            for i in range(start, max(len(chunks), start + 1), batch_size):
+                window = range(i, min(i + batch_size, len(chunks)))
+                batch = {"name": name, "digest": digest, "offset": i, "total": len(chunks), "count": len(window),
+                         "chunks": [chunks[j] for j in window if decisions[j][0] is None]}
+                _put(embed_queue, batch, failed)
+            del chunks, decisions
+        _put(embed_queue, _DONE, failed)
+    except BaseException:
+        failed.set() # Diğer aşamaları durdur
+        if not errors:
+            raise
+    finally:
+        for t in threads:
+            t.join()
+        if dedup_index is not None:
+            dedup_index.close()
+    if errors:
+        raise errors[0]
+
+    seconds = time.time() - started
+    # BM25 indeksi aynı chunk ID'leri üzerinden yeniden kurulur (tokenizasyon embedding'e göre çok ucuz)
+    lexical.build_from_collection(collection, chroma_path)
+    if wants_vector_export(chroma_path):
+        # Eski bir mmap indeksi bırakılırsa uygulama yeni chunk'ları görmez
+        vectors.export_collection(collection, chroma_path)
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+    print(f"\nToplam {stats.chunks['write']} chunk {seconds:.1f} saniyede yazıldı "
+          f"({stats.chunks['write'] / seconds if seconds else 0:.1f} chunk/s). "
+          f"Koleksiyondaki toplam öğe sayısı: {collection.count()}")
+    for stage in ("split", "embed", "write"):
+        print(f"   {stage:>5}: {stats.chunks[stage]} chunk, {stats.seconds[stage]:.1f} s meşgul, "
+              f"{stats.throughput(stage):.1f} chunk/s")
+    embed_per_chunk = stats.seconds["embed"] / stats.chunks["embed"] if stats.chunks["embed"] else None
+    dedup_report = dedup_stats.report(embed_per_chunk)
+    if dedup_index is not None:
+        saved = dedup_report.get("embed_seconds_saved")
+        print(f"   Tekilleştirme: {dedup_report['chunks']} chunk'tan {dedup_report['exact']} birebir + "
+              f"{dedup_report['near']} yakın kopya atıldı (chunk %{100 * dedup_report['dropped_ratio']:.1f}, "
+              f"metin %{100 * dedup_report['dropped_chars_ratio']:.1f} küçüldü"
+              + (f", tahmini embedding tasarrufu {saved:.1f} s)" if saved is not None else ")"))
+    if peak_rss_mb is not None:
+        print(f"   Tepe bellek (RSS): {peak_rss_mb:.0f} MB")
+    return {
+        "files": len(jobs),
+        "chunks": stats.chunks["write"],
+        "removed": len(removed),
+        "retagged": retagged,
+        "dedup": dedup_report if dedup_index is not None else None,
+        "seconds": seconds,
+        "throughput": {stage: stats.throughput(stage) for stage in ("split", "embed", "write")},
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resmi Gazete .txt dosyalarını ChromaDB'ye artımlı olarak yükler.")
+    parser.add_argument("data_folder", help=".txt dosyalarının bulunduğu klasör")
+    parser.add_argument("--chroma-path", default=config.CHROMA_DB_PATH, help="ChromaDB klasörü (varsayılan: %(default)s)")
+    parser.add_argument("--backend", choices=["ollama", "sentence-transformers"], default=None,
+                        help="Embedding altyapısı (varsayılan: manifestteki altyapı, yoksa "
+                             f"{config.INGEST_EMBED_BACKEND})")
+    parser.add_argument("--batch-size", type=int, default=config.INGEST_BATCH_SIZE,
+                        help="Batch başına chunk sayısı (varsayılan: %(default)s)")
+    parser.add_argument("--workers", type=int, default=config.INGEST_SPLIT_WORKERS,
+                        help="Metin bölme için süreç sayısı (varsayılan: %(default)s)")
+    parser.add_argument("--queue-size", type=int, default=config.INGEST_QUEUE_SIZE,
+                        help="Aşamalar arası kuyruk kapasitesi, batch cinsinden (varsayılan: %(default)s)")
+    parser.add_argument("--no-dedup", action="store_true", help="Kopya chunk'ları ayıklamadan hepsini embed et")
+    args = parser.parse_args()
+    ingest(args.data_folder, args.chroma_path, args.backend, args.batch_size, args.workers, args.queue_size,
+           deduplicate=False if args.no_dedup else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,389 @@
+"""Resmi Gazete chunk'ları için diskte tutulan BM25 ters indeksi ve hibrit retriever.
+
+Gazete soruları çoğu zaman sözcükseldir: kanun numaraları ("7524 sayılı
+Kanun"), karar sayıları, kurum adları, tarihler. bge-m3 yoğun araması bunları
+iyi ayırt edemez. Bu modül:
+- Chroma'daki chunk ID'leri üzerinde Türkçe'ye uygun tokenizasyonla (Türkçe
+  küçük harf, 5 karakterlik önek kök bulma, sayı/tarih token'ları) BM25
+  indeksi kurar ve `chroma_db/bm25/` altına NumPy dizileri olarak yazar,
+- İndeksi `mmap` ile açar (yükleme süresi ve bellek neredeyse sıfır); terim
+  sözlüğü ve chunk ID'leri de bayt dosyası + ofset dizisi olarak tutulur,
+  terim araması sıralı sözlükte ikili aramadır,
+- Vektör ve BM25 sonuçlarını reciprocal rank fusion (RRF) ile birleştirir,
+- Kanun/karar numarası gibi kimlik içeren sorularda, numara indekste varsa
+  ve en iyi BM25 sonucunda geçiyorsa embedding hesaplamadan doğrudan
+  sözcüksel sonucu döndürür; aksi halde hibrit aramaya düşer.
+
+İndeks ingestion sonunda otomatik yeniden kurulur; mevcut bir chroma_db için:
+    python -m haberbot.lexical build [--chroma-path ./chroma_db]
+"""
+import argparse
+import json
+import mmap
+import os
+import re
+import shutil
+import time
+from collections import Counter, defaultdict
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from haberbot import config
+from haberbot.classifier import normalize
+from haberbot.metadata import metadata_column, where_mask
+from haberbot.telemetry import log
+
+_TOKEN_RE = re.compile(r"\d+(?:[./-]\d+)*|[a-zçğıöşüâîû]+")
+LEXICAL_FILTER_FACTOR = 5 # Filtreli aramada BM25'ten alınan aday sayısı çarpanı (süzmeden önce)
+STEM_LENGTH = 5 # Türkçe için yaygın "ilk 5 karakter" önek kök bulma
+STOPWORDS = {
+    "ve", "veya", "ile", "bir", "bu", "şu", "da", "de", "için", "mi", "mı", "mu", "mü", "ne", "neler",
+    "nedir", "hangi", "nasıl", "olan", "olarak", "gibi", "kadar", "daha", "çok", "en", "ki", "ya",
+    "hakkında", "ilgili", "var", "yok", "midir", "ise",
+}
+
+# Embedding'e gerek kalmadan sözcüksel indeksle cevaplanabilecek kimlik kalıpları
+_IDENTIFIER_RE = re.compile(
+    r"\b\d{3,5}\s*sayılı"                 # 7524 sayılı Kanun / 32456 sayılı Resmi Gazete
+    r"|\b(?:karar|esas)\s*(?:sayısı|no)\b"  # Karar Sayısı: 2024/123
+    r"|\b\d{4}/\d+\b"                     # 2024/123
+    r"|\b\d{1,2}[./]\d{1,2}[./]\d{4}\b"   # 12.03.2024
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Türkçe küçük harfe çevirir, durak kelimeleri atar, kelimeleri 5 karakterlik öneke indirger."""
+    tokens = []
+    for tok in _TOKEN_RE.findall(normalize(text)):
+        if tok in STOPWORDS:
+            continue
+        if not tok[0].isdigit():
+            if len(tok) < 2:
+                continue
+            tok = tok[:STEM_LENGTH]
+        tokens.append(tok)
+    return tokens
+
+
+def is_identifier_query(question: str) -> bool:
+    """Soru kanun/karar numarası veya tarih gibi kesin bir kimlik içeriyor mu?"""
+    return bool(_IDENTIFIER_RE.search(normalize(question)))
+
+
+def identifier_terms(question: str) -> List[str]:
+    """Kimlik kalıplarındaki sayısal terimler ("7524", "2024/123", "12.03.2024")."""
+    terms = []
+    for match in _IDENTIFIER_RE.finditer(normalize(question)):
+        terms.extend(tok for tok in tokenize(match.group()) if tok[0].isdigit() and tok not in terms)
+    return terms
+
+
+def index_dir(chroma_path: str = None) -> str:
+    return os.path.join(chroma_path or config.CHROMA_DB_PATH, config.BM25_DIR_NAME)
+
+
+def _write_strings(out_dir: str, name: str, strings: List[str]) -> None:
+    """Metinleri `<name>.bin` dosyasına art arda, sınırlarını `<name>_offsets.npy`'ye yazar."""
+    encoded = [s.encode("utf-8") for s in strings]
+    with open(os.path.join(out_dir, f"{name}.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(out_dir, f"{name}_offsets.npy"),
+            np.concatenate([[0], np.cumsum([len(e) for e in encoded])]).astype(np.int64))
+
+
+def build_index(documents, out_dir: str, k1: float = 1.5, b: float = 0.75) -> dict:
+    """(chunk_id, metin) çiftlerinden BM25 indeksini kurup `out_dir`'e yazar.
+
+    Önce geçici klasöre yazılır, sonra eski indeksin yerine taşınır; böylece
+    çalışan uygulama hiçbir zaman yarım bir indeks okumaz.
+    """
+    postings = defaultdict(list) # terim -> [(doc_no, tf), ...]
+    doc_ids, doc_lengths = [], []
+    for doc_no, (chunk_id, text) in enumerate(documents):
+        counts = Counter(tokenize(text or ""))
+        doc_ids.append(chunk_id)
+        doc_lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings[term].append((doc_no, tf))
+
+    vocab = sorted(postings)
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    for i, term in enumerate(vocab):
+        offsets[i + 1] = offsets[i] + len(postings[term])
+    post_docs = np.empty(offsets[-1], dtype=np.int32)
+    post_tfs = np.empty(offsets[-1], dtype=np.float32)
+    for i, term in enumerate(vocab):
+        items = postings[term]
+        post_docs[offsets[i]:offsets[i + 1]] = [d for d, _ in items]
+        post_tfs[offsets[i]:offsets[i + 1]] = [tf for _, tf in items]
+    del postings
+
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp_dir, "post_docs.npy"), post_docs)
+    np.save(os.path.join(tmp_dir, "post_tfs.npy"), post_tfs)
+    np.save(os.path.join(tmp_dir, "doc_lengths.npy"), np.asarray(doc_lengths, dtype=np.int32))
+    # Terimler sıralı yazılır (UTF-8 bayt sırası kod noktası sırasıyla aynı); arama ikili aramadır
+    _write_strings(tmp_dir, "terms", vocab)
+    _write_strings(tmp_dir, "ids", doc_ids)
+    del vocab, doc_ids
+    meta = {"documents": len(doc_lengths), "terms": len(offsets) - 1, "k1": k1, "b": b,
+            "avgdl": float(np.mean(doc_lengths)) if doc_lengths else 0.0}
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return meta
+
+
+def iter_collection(collection, page_size: int = 1000):
+    """Chroma koleksiyonundaki (id, metin) çiftlerini sayfa sayfa üretir."""
+    offset = 0
+    while True:
+        page = collection.get(include=["documents"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            return
+        yield from zip(page["ids"], page["documents"])
+        offset += len(page["ids"])
+
+
+def build_from_collection(collection, chroma_path: str = None) -> dict:
+    t0 = time.perf_counter()
+    meta = build_index(iter_collection(collection), index_dir(chroma_path))
+    print(f"BM25 indeksi kuruldu: {meta['documents']} chunk, {meta['terms']} terim "
+          f"({time.perf_counter() - t0:.1f} s)")
+    return meta
+
+
+class LexicalIndex:
+    """Diskteki BM25 indeksini mmap ile açar ve sorgular.
+
+    Terim sözlüğü ve chunk ID'leri Python sözlüğü/listesi olarak belleğe
+    yüklenmez; worker'lar işletim sisteminin sayfa önbelleğini paylaşır.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.term_offsets = load("terms_offsets.npy")
+        self.id_offsets = load("ids_offsets.npy")
+        self._terms_file = open(os.path.join(path, "terms.bin"), "rb")
+        self._terms = mmap.mmap(self._terms_file.fileno(), 0, access=mmap.ACCESS_READ) if self.meta["terms"] else b""
+        self._ids_file = open(os.path.join(path, "ids.bin"), "rb")
+        self._ids = mmap.mmap(self._ids_file.fileno(), 0, access=mmap.ACCESS_READ) if self.meta["documents"] else b""
+        self.offsets = load("offsets.npy")
+        self.post_docs = load("post_docs.npy")
+        self.post_tfs = load("post_tfs.npy")
+        self.doc_lengths = load("doc_lengths.npy")
+
+    @classmethod
+    def open(cls, chroma_path: str = None):
+        """İndeks varsa açar, yoksa None döndürür."""
+        path = index_dir(chroma_path)
+        # terms.bin olmayan eski biçimli (vocab.json) indeks yok sayılır; ingest/build yeniden yazar
+        if not os.path.exists(os.path.join(path, "meta.json")) or not os.path.exists(os.path.join(path, "terms.bin")):
+            return None
+        return cls(path)
+
+    def _term_bytes(self, term_id: int) -> bytes:
+        return self._terms[int(self.term_offsets[term_id]):int(self.term_offsets[term_id + 1])]
+
+    def term_id(self, term: str):
+        """Terimin sözlükteki sırası (yoksa None); sıralı terimler üzerinde ikili arama."""
+        key, lo, hi = term.encode("utf-8"), 0, self.meta["terms"]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term_bytes(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.meta["terms"] and self._term_bytes(lo) == key:
+            return lo
+        return None
+
+    def chunk_id(self, doc_no: int) -> str:
+        return self._ids[int(self.id_offsets[doc_no]):int(self.id_offsets[doc_no + 1])].decode("utf-8")
+
+    def _postings(self, term_id: int) -> np.ndarray:
+        return np.asarray(self.post_docs[int(self.offsets[term_id]):int(self.offsets[term_id + 1])])
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """BM25 skoruna göre en iyi `k` (chunk_id, skor) çiftini döndürür.
+
+        Posting skorları yoğun bir float32 dizisinde `np.add.at` ile toplanır,
+        en iyi `k` aday `argpartition` ile seçilir (Python döngüsü yok).
+        """
+        return [(self.chunk_id(doc_no), score) for doc_no, score in self._search_rows(query, k)]
+
+    def identifier_search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Sorgudaki kimlik numarası indekste varsa ve en iyi sonuçta geçiyorsa BM25 sonuçları, yoksa [].
+
+        "9999 sayılı Kanun" gibi indekste olmayan bir numara için BM25 sadece
+        "sayılı"/"kanun" terimleriyle ilgisiz chunk'lar bulur; bu sonuçlar
+        kimlik eşleşmesi sayılmaz.
+        """
+        term_ids = [t for t in map(self.term_id, identifier_terms(query)) if t is not None]
+        if not term_ids:
+            return []
+        rows = self._search_rows(query, k)
+        if not rows or not np.isin(rows[0][0], np.concatenate([self._postings(t) for t in term_ids])):
+            return []
+        return [(self.chunk_id(doc_no), score) for doc_no, score in rows]
+
+    def _search_rows(self, query: str, k: int) -> List[Tuple[int, float]]:
+        n_docs = self.meta["documents"]
+        if n_docs == 0:
+            return []
+        k1, b, avgdl = self.meta["k1"], self.meta["b"], self.meta["avgdl"] or 1.0
+        all_docs, all_scores = [], []
+        for term in set(tokenize(query)):
+            term_id = self.term_id(term)
+            if term_id is None:
+                continue
+            docs = self._postings(term_id)
+            tfs = np.asarray(self.post_tfs[int(self.offsets[term_id]):int(self.offsets[term_id + 1])],
+                             dtype=np.float32)
+            idf = np.log(1.0 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = k1 * (1.0 - b + b * np.asarray(self.doc_lengths[docs], dtype=np.float32) / avgdl)
+            all_docs.append(docs)
+            all_scores.append((idf * tfs * (k1 + 1.0) / (tfs + norm)).astype(np.float32))
+        if not all_docs:
+            return []
+        scores = np.zeros(n_docs, dtype=np.float32)
+        np.add.at(scores, np.concatenate(all_docs), np.concatenate(all_scores))
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        best = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(doc_no, float(scores[doc_no])) for doc_no in best.tolist()]
+
+
+def reciprocal_rank_fusion(rankings, k: int, rrf_k: int = 60) -> List[Tuple[str, float]]:
+    """Birden çok sıralı ID listesini RRF ile birleştirir: skor = Σ 1 / (rrf_k + sıra)."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (rrf_k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+class HybridRetriever(BaseRetriever):
+    """Chroma vektör araması + BM25, RRF ile birleştirilmiş retriever.
+
+    `vectorstore.as_retriever` ile aynı arayüzü (`invoke(soru) -> List[Document]`) sunar;
+    `invoke(soru, filter=where)` ile iki arama da Chroma `where` filtresiyle sınırlanır.
+    Toplu değerlendirme için `search_batch` aynı filtreli birden çok soruyu tek Chroma sorgusuyla arar.
+    """
+    collection: object
+    embeddings: object
+    lexical: object
+    k: int = 3
+    fetch_k: int = 20
+
+    def _fetch(self, ids: List[str]) -> dict:
+        if not ids:
+            return {}
+        got = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        return {i: Document(page_content=d, metadata=m or {}, id=i)
+                for i, d, m in zip(got["ids"], got["documents"], got["metadatas"])}
+
+    @staticmethod
+    def _scored(docs: dict, ranked) -> List[Document]:
+        """Sıralı (id, skor) listesindeki belgeleri, skoru metadata'ya ekleyerek döndürür (izleme için)."""
+        return [Document(page_content=docs[i].page_content, metadata={**docs[i].metadata, "score": score}, id=i)
+                for i, score in ranked if i in docs]
+
+    def _allowed(self, hits, where: dict) -> List[Tuple[str, float]]:
+        """BM25 sonuçlarından `where` filtresini sağlayanları bırakır (BM25 indeksinde metadata yok)."""
+        if not hits:
+            return []
+        # Chroma'da get(ids, where) aralık filtrelerinde yavaş; adayların metadata'sı alınıp burada süzülür
+        got = self.collection.get(ids=[doc_id for doc_id, _ in hits], include=["metadatas"])
+        mask = where_mask(where, metadata_column(got["metadatas"]), len(got["ids"]))
+        allowed = {doc_id for doc_id, keep in zip(got["ids"], mask) if keep}
+        return [(doc_id, score) for doc_id, score in hits if doc_id in allowed][:self.fetch_k]
+
+    def _lexical_hits(self, query: str, filter: dict = None) -> List[Tuple[str, float]]:
+        if filter:
+            # Filtre adayların çoğunu eleyebilir; BM25'ten daha geniş aday alınıp süzülür
+            return self._allowed(self.lexical.search(query, self.fetch_k * LEXICAL_FILTER_FACTOR), filter)
+        return self.lexical.search(query, self.fetch_k)
+
+    def _fuse(self, vector_ids: List[str], vector_docs: dict, lexical_hits) -> List[Document]:
+        fused = reciprocal_rank_fusion([vector_ids, [doc_id for doc_id, _ in lexical_hits]], self.k)
+        docs = dict(vector_docs)
+        docs.update(self._fetch([i for i, _ in fused if i not in docs]))
+        return self._scored(docs, fused)
+
+    def _identifier_hits(self, query: str, filter: dict = None) -> List[Tuple[str, float]]:
+        """Kesin kimlik eşleşmesinde sadece BM25 ile cevaplanacak en iyi `k` sonuç, yoksa [].
+
+        Filtre varsa tarih/sayı zaten metadata'dan süzülür; filtreli vektör araması da yapılır.
+        """
+        if filter or not is_identifier_query(query):
+            return []
+        return self.lexical.identifier_search(query, self.k)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                filter: dict = None) -> List[Document]:
+        identifier_hits = self._identifier_hits(query, filter)
+        if identifier_hits:
+            # Kanun/karar numarası gibi kesin kimliklerde embedding hesaplamadan sözcüksel sonuç yeterli
+            log.info("Kimlik içeren sorgu: sadece BM25 indeksi kullanılıyor.")
+            return self._scored(self._fetch([doc_id for doc_id, _ in identifier_hits]), identifier_hits)
+
+        lexical_hits = self._lexical_hits(query, filter)
+        result = self.collection.query(query_embeddings=[self.embeddings.embed_query(query)],
+                                       n_results=self.fetch_k, where=filter, include=["documents", "metadatas"])
+        docs = {i: Document(page_content=d, metadata=m or {}, id=i)
+                for i, d, m in zip(result["ids"][0], result["documents"][0], result["metadatas"][0])}
+        return self._fuse(result["ids"][0], docs, lexical_hits)
+
+    def search_batch(self, queries: List[str], embeddings: List[List[float]], filter: dict = None) -> List[List[Document]]:
+        """Soruları önceden hesaplanmış embedding'lerle tek `collection.query` çağrısında arar.
+
+        Sonuçlar `invoke(soru, filter=filter)` ile aynıdır; kimlik numarası
+        indekste eşleşen filtresiz sorular yine sadece BM25 ile cevaplanır.
+        """
+        results = [None] * len(queries)
+        lexical, vector_rows = {}, []
+        for i, query in enumerate(queries):
+            identifier_hits = self._identifier_hits(query, filter)
+            if identifier_hits:
+                results[i] = self._scored(self._fetch([doc_id for doc_id, _ in identifier_hits]), identifier_hits)
+            else:
+                lexical[i] = self._lexical_hits(query, filter)
+                vector_rows.append(i)
+        if vector_rows:
+            result = self.collection.query(query_embeddings=[embeddings[i] for i in vector_rows],
+                                           n_results=self.fetch_k, where=filter, include=["documents", "metadatas"])
+            for row, i in enumerate(vector_rows):
+                docs = {doc_id: Document(page_content=d, metadata=m or {}, id=doc_id) for doc_id, d, m in
+                        zip(result["ids"][row], result["documents"][row], result["metadatas"][row])}
+                results[i] = self._fuse(result["ids"][row], docs, lexical[i])
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chroma koleksiyonundan BM25 indeksini kurar.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--chroma-path", default=config.CHROMA_DB_PATH)
+    args = parser.parse_args()
+
+    import chromadb
+    client = chromadb.PersistentClient(path=args.chroma_path)
+    collection = client.get_collection(name=config.CHROMA_COLLECTION_NAME)
+    build_from_collection(collection, args.chroma_path)
+
+
+if __name__ == "__main__":
+    main()
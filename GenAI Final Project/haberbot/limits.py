@@ -0,0 +1,139 @@
+"""Tek Ollama sunucusuna giden eşzamanlı çağrıları sınırlayan kuyruklu semafor.
+
+Streamlit tek kullanıcıyla çalışırken sorun olmayan eşzamanlılık, HTTP API
+(bkz. `haberbot.api`) birden çok istemciye açıldığında Ollama'yı boğar:
+aynı anda çalışan üretimler birbirini yavaşlatır ve bellek taşar. Bu modül
+`ChatOllama` ve embedding çağrılarının önüne birer sınırlayıcı koyar:
+- En fazla `max_concurrent` çağrı aynı anda Ollama'ya gider,
+- En fazla `max_queue` çağrı sıra bekler; kuyruk doluysa veya bekleme
+  `timeout`'u aşarsa `OverloadedError` fırlatılır (API bunu 503'e çevirir).
+
+Düğümler senkron çalıştığı (`ainvoke` altında da thread havuzunda) için
+sınırlayıcı `threading` tabanlıdır.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from haberbot.telemetry import metrics, record_llm_usage, span
+
+
+class OverloadedError(RuntimeError):
+    """Ollama kuyruğu dolu veya bekleme süresi aşıldı; istek daha sonra tekrar denenmeli."""
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.completed = 0
+        self.wait_seconds = 0.0 # Kuyrukta geçen toplam süre
+
+    @property
+    def saturated(self) -> bool:
+        """Yeni bir çağrı kuyruğa alınamayacak durumda mı?"""
+        return self.active >= self.max_concurrent and self.waiting >= self.max_queue
+
+    @contextmanager
+    def slot(self):
+        """Ollama'ya gitmek için yer ayırır ve kuyrukta beklenen süreyi verir; kuyruk doluysa `OverloadedError` fırlatır."""
+        t0 = time.monotonic()
+        with self._cond:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise OverloadedError(f"{self.name} kuyruğu dolu ({self.waiting} istek bekliyor).")
+                self.waiting += 1
+                try:
+                    if not self._cond.wait_for(lambda: self.active < self.max_concurrent, timeout=self.timeout):
+                        self.rejected += 1
+                        raise OverloadedError(f"{self.name} için {self.timeout:.0f} sn içinde sıra gelmedi.")
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            waited = time.monotonic() - t0
+            self.wait_seconds += waited
+        metrics.observe("haberbot_queue_wait_seconds", waited, limiter=self.name)
+        try:
+            yield waited
+        finally:
+            with self._cond:
+                self.active -= 1
+                self.completed += 1
+                self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"active": self.active, "waiting": self.waiting, "max_concurrent": self.max_concurrent,
+                    "max_queue": self.max_queue, "completed": self.completed, "rejected": self.rejected,
+                    "avg_wait_ms": 1000 * self.wait_seconds / max(self.completed, 1)}
+
+
+class LimitedChatModel:
+    """`ChatOllama`'yı saran ve her `invoke`/`stream` çağrısını sınırlayıcıdan geçiren vekil.
+
+    Her çağrı bir "llm" span'i olarak izlenir (kuyruk bekleme, ilk token
+    gecikmesi, Ollama'nın bildirdiği prompt/cevap token sayıları). Diğer
+    nitelikler (model adı vb.) olduğu gibi alttaki modele yönlendirilir.
+    """
+
+    def __init__(self, llm, limiter: ConcurrencyLimiter):
+        self.llm = llm
+        self.limiter = limiter
+        self.model_name = getattr(llm, "model", None) or type(llm).__name__
+
+    def invoke(self, *args, **kwargs):
+        with self.limiter.slot() as waited, span("llm", model=self.model_name, queue_ms=round(waited * 1000, 2)) as attrs:
+            response = self.llm.invoke(*args, **kwargs)
+            record_llm_usage(attrs, response)
+            return response
+
+    def stream(self, *args, **kwargs):
+        # Yer, üretim bitene (veya tüketici akışı bırakana) kadar tutulur
+        with self.limiter.slot() as waited, span("llm", model=self.model_name, queue_ms=round(waited * 1000, 2),
+                                                 stream=True) as attrs:
+            t0 = time.perf_counter()
+            first_token = True
+            for chunk in self.llm.stream(*args, **kwargs):
+                if first_token:
+                    first_token = False
+                    attrs["first_token_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+                    metrics.observe("haberbot_llm_first_token_seconds", time.perf_counter() - t0, model=self.model_name)
+                if chunk.response_metadata or getattr(chunk, "usage_metadata", None):
+                    record_llm_usage(attrs, chunk) # Ollama sayıları son parçada gönderir
+                yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+class LimitedEmbeddings(Embeddings):
+    """Embedding çağrılarını sınırlayıcıdan geçiren sarmalayıcı."""
+
+    def __init__(self, base: Embeddings, limiter: ConcurrencyLimiter):
+        self.base = base
+        self.limiter = limiter
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self.limiter.slot() as waited, span("embed", texts=len(texts), queue_ms=round(waited * 1000, 2)):
+            return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self.limiter.slot() as waited, span("embed", texts=1, queue_ms=round(waited * 1000, 2)):
+            return self.base.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Soruları tek sınırlayıcı yuvasında embed eder (bkz. `KeepAliveOllamaEmbeddings.embed_queries`)."""
+        with self.limiter.slot() as waited, span("embed", texts=len(texts), queue_ms=round(waited * 1000, 2)):
+            if hasattr(self.base, "embed_queries"):
+                return self.base.embed_queries(texts)
+            return [self.base.embed_query(text) for text in texts]
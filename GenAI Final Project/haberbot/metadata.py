@@ -0,0 +1,441 @@
+"""Resmi Gazete chunk metadata'sı (tarih, sayı, belge türü) ve soru kısıtlarıyla filtreli arama.
+
+Ingestion eskiden chunk'lara sadece `source` ve `chunk_index` yazıyordu; her
+soru tüm koleksiyonda aranıyordu. Oysa gazete soruları çoğu zaman yapı
+içerir: "12.03.2024 tarihli", "Mart 2024'te yayımlanan", "32456 sayılı Resmi
+Gazete", "... tebliği". Bu modül:
+- Ingest sırasında dosya başlığından yayım tarihini (`date`, YYYYMMDD int) ve
+  gazete sayısını (`issue`, int), bölüm/başlık satırlarından chunk'ın belge
+  türünü (`doc_type`: Yönetmelik, Tebliğ, İlan, Atama, Genelge) çıkarır,
+- Sorudaki tarih/ay/yıl, sayı ve tür kısıtlarını Chroma `where` filtresine
+  çevirir (`parse_query_filters`). Tek başına yıl ("2024 yılı bütçe kanunu",
+  "1982 Anayasası") konuyu anlatır; yıl ancak yayım ifadesiyle birlikteyse
+  ("2023 yılında yayımlanan", "2023 Resmi Gazetelerinde") filtre olur,
+- Filtreli arama `METADATA_FILTER_MIN_HITS`'ten az sonuç verirse filtreyi
+  adım adım gevşetir: önce tür atılır, sonra tarih aya/yıla genişletilir,
+  en sonda filtresiz aranır. Üst kademelerin sonuçları önde tutulur.
+
+Filtreli ve filtresiz aramayı sentetik korpusta karşılaştırmak için:
+    python -m haberbot.metadata bench [--docs 300] [--queries 200]
+"""
+import argparse
+import json
+import operator
+import random
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from haberbot import config
+from haberbot.classifier import normalize
+from haberbot.telemetry import annotate, log, metrics
+
+# Küçük harfli kök -> metadata'daki belge türü
+DOC_TYPES = {"yönetmeli": "Yönetmelik", "tebliğ": "Tebliğ", "ilan": "İlan", "atama": "Atama", "genelge": "Genelge"}
+MONTHS = ("ocak", "şubat", "mart", "nisan", "mayıs", "haziran", "temmuz", "ağustos", "eylül", "ekim", "kasım", "aralık")
+# Filtrelerde kullanılan metadata alanları ve tipleri (mmap indeksi bunları sütun olarak da yazar)
+FILTER_FIELDS = {"date": int, "issue": int, "doc_type": str}
+HEADER_CHARS = 600 # Tarih ve sayının aranacağı dosya başı (Resmi Gazete künyesi)
+
+_MONTH_RE = "|".join(MONTHS)
+_NUM_DATE_RE = re.compile(r"\b(\d{1,2})[./](\d{1,2})[./](\d{4})\b")
+_TEXT_DATE_RE = re.compile(rf"\b(\d{{1,2}})\s+({_MONTH_RE})\s+(\d{{4}})\b")
+_MONTH_YEAR_RE = re.compile(rf"\b({_MONTH_RE})\w*\s+((?:19|20)\d{{2}})\b")
+# Yıl sadece yayım ifadesiyle filtre olur: "2023 yılında yayımlanan", "2023'te çıkan", "2023 tarihli",
+# "resmi gazete'de 2023 yılında"; "2022 sayılı" ve "2024/123" gibi numaralar yıl sayılmaz
+_PUBLISHED = r"(?:yayı[mn]lan|çıkan|tarihli|resm[iî]\s+gazete)"
+_YEAR_RE = re.compile(
+    rf"\b((?:19|20)\d{{2}})(?:\s+yılı\w*|['’]?(?:te|ta|de|da)\b)?\s+{_PUBLISHED}"
+    r"|\bresm[iî]\s+gazete\S*\s+((?:19|20)\d{2})\b(?!\s*sayılı|/)"
+)
+_HEADER_ISSUE_RE = re.compile(r"\bsayı\s*:?\s*(\d{4,6})\b")
+_QUESTION_ISSUE_RES = (
+    re.compile(r"\b(\d{4,6})\s*sayılı\s+(?:resm[iî]\s+gazete|rg)\b"),
+    re.compile(r"\bresm[iî]\s+gazete\w*\s+(\d{4,6})\s*(?:sayılı|sayısı|numaralı)"),
+    re.compile(r"\bsayı\s*:?\s*(\d{4,6})\b"),
+)
+_TYPE_RE = re.compile(rf"\b({'|'.join(DOC_TYPES)})\w*")
+# "ilan edildi" gibi fiil kullanımları belge türü değildir
+_TYPE_QUESTION_RE = re.compile(rf"\b({'|'.join(DOC_TYPES)})\w*\b(?!\s+(?:edil|et))")
+# Başlık satırı: "... Hakkında Yönetmelik", "... Tebliğ (Sıra No: 5)"
+_TITLE_RE = re.compile(rf"\b({'|'.join(DOC_TYPES)})\w*(?:\s*\([^)]*\))?$")
+
+
+_COMPARE = {"$eq": operator.eq, "$ne": operator.ne, "$gt": operator.gt, "$gte": operator.ge,
+            "$lt": operator.lt, "$lte": operator.le}
+
+
+def _date(day: int, month: int, year: int) -> Optional[int]:
+    if 1 <= day <= 31 and 1 <= month <= 12 and 1900 <= year <= 2099:
+        return year * 10000 + month * 100 + day
+    return None
+
+
+def _find_date(text: str) -> Optional[int]:
+    """Küçük harfli metindeki ilk geçerli tarihi (12.03.2024 veya 12 mart 2024) YYYYMMDD olarak döndürür."""
+    for regex, month_of in ((_NUM_DATE_RE, int), (_TEXT_DATE_RE, lambda m: MONTHS.index(m) + 1)):
+        for day, month, year in regex.findall(text):
+            value = _date(int(day), month_of(month), int(year))
+            if value is not None:
+                return value
+    return None
+
+
+def type_markers(content: str) -> List[Tuple[int, str]]:
+    """Belge türü bildiren satırların (ofset, tür) listesi: BÜYÜK HARFLİ bölüm başlıkları ve başlık satırları."""
+    markers, offset = [], 0
+    for line in content.splitlines(keepends=True):
+        stripped = line.strip()
+        text = normalize(stripped)
+        match = None
+        if stripped.isupper():
+            match = _TYPE_RE.search(text)
+        elif 0 < len(stripped) < 200 and not stripped.endswith("."):
+            match = _TITLE_RE.search(text)
+        if match:
+            markers.append((offset, DOC_TYPES[match.group(1)]))
+        offset += len(line)
+    return markers
+
+
+def file_metadata(content: str) -> dict:
+    """Dosya başlığından yayım tarihi ve gazete sayısı; bulunamayan alan eklenmez (Chroma None kabul etmez)."""
+    header = normalize(content[:HEADER_CHARS])
+    metadata = {}
+    date = _find_date(header)
+    if date is not None:
+        metadata["date"] = date
+    issue = _HEADER_ISSUE_RE.search(header)
+    if issue:
+        metadata["issue"] = int(issue.group(1))
+    return metadata
+
+
+def chunk_doc_type(markers: List[Tuple[int, str]], start: int, length: int) -> Optional[str]:
+    """Chunk'ın belge türü: başlangıcından önceki son başlık, yoksa chunk içindeki ilk başlık."""
+    before = [kind for offset, kind in markers if offset <= start]
+    if before:
+        return before[-1]
+    inside = [kind for offset, kind in markers if start < offset < start + length]
+    return inside[0] if inside else None
+
+
+@dataclass
+class QueryFilters:
+    """Sorudan çıkarılan kısıtlar; tarih aralığı YYYYMMDD, her iki uç dahil."""
+    date_from: Optional[int] = None
+    date_to: Optional[int] = None
+    precision: Optional[str] = None # "day", "month" veya "year"
+    doc_type: Optional[str] = None
+    issue: Optional[int] = None
+
+    def __bool__(self) -> bool:
+        return any(v is not None for v in (self.date_from, self.doc_type, self.issue))
+
+    def describe(self) -> dict:
+        return {k: v for k, v in vars(self).items() if v is not None}
+
+    def widened(self) -> "QueryFilters":
+        """Tarihi bir üst birime (gün -> ay -> yıl) genişletir; yıl zaten en genişidir."""
+        if self.precision == "day":
+            return QueryFilters(self.date_from // 100 * 100 + 1, self.date_from // 100 * 100 + 31, "month",
+                                self.doc_type, self.issue)
+        if self.precision == "month":
+            return QueryFilters(self.date_from // 10000 * 10000 + 101, self.date_from // 10000 * 10000 + 1231,
+                                "year", self.doc_type, self.issue)
+        return self
+
+    def where(self, with_type: bool = True) -> Optional[dict]:
+        """Chroma `where` filtresi; kısıt yoksa None."""
+        conditions = []
+        if self.issue is not None:
+            conditions.append({"issue": self.issue})
+        if self.date_from is not None:
+            if self.date_from == self.date_to:
+                conditions.append({"date": self.date_from})
+            else:
+                conditions += [{"date": {"$gte": self.date_from}}, {"date": {"$lte": self.date_to}}]
+        if with_type and self.doc_type is not None:
+            conditions.append({"doc_type": self.doc_type})
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    def relaxation_levels(self) -> List[Optional[dict]]:
+        """Sırayla denenecek filtreler: tam kısıtlar, türsüz, genişletilmiş tarih, filtresiz (None)."""
+        levels = [self.where(), self.where(with_type=False)]
+        if self.precision in ("day", "month"):
+            levels.append(self.widened().where(with_type=False))
+        levels.append(None)
+        unique = []
+        for where in levels:
+            if where not in unique:
+                unique.append(where)
+        return unique
+
+
+def parse_query_filters(question: str) -> QueryFilters:
+    """Sorudaki tarih (gün/ay/yıl), Resmi Gazete sayısı ve belge türü kısıtlarını çıkarır."""
+    text = normalize(question)
+    filters = QueryFilters()
+    for regex in _QUESTION_ISSUE_RES:
+        match = regex.search(text)
+        if match:
+            filters.issue = int(match.group(1))
+            text = text.replace(match.group(0), " ") # Sayı, yıl olarak da okunmasın
+            break
+
+    date = _find_date(text)
+    month_year = _MONTH_YEAR_RE.search(text)
+    year = _YEAR_RE.search(text)
+    if date is not None:
+        filters.date_from = filters.date_to = date
+        filters.precision = "day"
+    elif month_year:
+        month, year_value = MONTHS.index(month_year.group(1)) + 1, int(month_year.group(2))
+        filters.date_from, filters.date_to = year_value * 10000 + month * 100 + 1, year_value * 10000 + month * 100 + 31
+        filters.precision = "month"
+    elif year:
+        year_value = int(year.group(1) or year.group(2))
+        filters.date_from, filters.date_to = year_value * 10000 + 101, year_value * 10000 + 1231
+        filters.precision = "year"
+
+    # Türkçe'de tür başlığın sonundadır ("Atama Hakkında Tebliğ"): son eşleşme alınır
+    doc_types = _TYPE_QUESTION_RE.findall(text)
+    if doc_types:
+        filters.doc_type = DOC_TYPES[doc_types[-1]]
+    return filters
+
+
+def _present(values: np.ndarray) -> np.ndarray:
+    if values.dtype == object:
+        return np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+    return ~np.isnan(values)
+
+
+def _compare(values: np.ndarray, op: str, operand) -> np.ndarray:
+    """Sütunu tek bir karşılaştırmayla maskeler; eksik değerler (NaN/None) hiçbir koşulu sağlamaz."""
+    if op in ("$in", "$nin"):
+        mask = np.zeros(len(values), dtype=bool)
+        for value in operand:
+            mask |= _compare(values, "$eq", value)
+        return mask if op == "$in" else ~mask & _present(values)
+    if op not in _COMPARE:
+        raise ValueError(f"Desteklenmeyen filtre operatörü: {op}")
+    compare = _COMPARE[op]
+    if values.dtype == object:
+        return np.fromiter((v is not None and compare(v, operand) for v in values), dtype=bool, count=len(values))
+    with np.errstate(invalid="ignore"):
+        mask = compare(values, operand)
+    return mask & _present(values) if op == "$ne" else mask
+
+
+def where_mask(where: dict, column: Callable[[str], np.ndarray], size: int) -> np.ndarray:
+    """Chroma `where` filtresini ($and, $or, $eq, $ne, $gt, $gte, $lt, $lte, $in, $nin) NumPy ile değerlendirir.
+
+    `column(alan)` satır başına değerleri döndürür (sayısal: float/NaN, diğer: object/None).
+    Chroma'nın `get(ids=..., where=...)` yolu aralık filtrelerinde yavaş olduğundan
+    az sayıda aday süzülürken ve mmap indeksinde bu kullanılır.
+    """
+    if "$and" in where:
+        return np.logical_and.reduce([where_mask(w, column, size) for w in where["$and"]])
+    if "$or" in where:
+        return np.logical_or.reduce([where_mask(w, column, size) for w in where["$or"]])
+    mask = np.ones(size, dtype=bool)
+    for field, condition in where.items():
+        values = column(field)
+        for op, operand in (condition if isinstance(condition, dict) else {"$eq": condition}).items():
+            mask &= _compare(values, op, operand)
+    return mask
+
+
+def metadata_column(metadatas: List[dict]) -> Callable[[str], np.ndarray]:
+    """Metadata sözlüklerinin listesi için `where_mask`'in beklediği sütun fonksiyonu."""
+    return lambda field: np.asarray([(m or {}).get(field) for m in metadatas], dtype=object)
+
+
+def filtered_search(retriever, question: str, k: int = None, min_hits: int = None):
+    """Sorudaki kısıtlarla `where` filtreli arar; yetersiz sonuçta filtreyi gevşetir.
+
+    Kısıt yoksa retriever doğrudan çağrılır. Her kademe retriever'ın `k`
+    sonucunu getirir; önceki kademelerde bulunmayanlar sona eklenir ve en
+    fazla `k` chunk döndürülür. Uygulanan kısıtlar ve kademe izde görünür.
+    """
+    k = k or config.RETRIEVER_K
+    min_hits = min_hits or config.METADATA_FILTER_MIN_HITS
+    filters = parse_query_filters(question)
+    if not filters:
+        return retriever.invoke(question)
+
+    docs, seen = [], set()
+    levels = filters.relaxation_levels()
+    for level, where in enumerate(levels):
+        hits = retriever.invoke(question, filter=where) if where else retriever.invoke(question)
+        _merge(docs, seen, hits)
+        if len(docs) >= min_hits:
+            break
+    annotate(filters=filters.describe(), filter_level=level, filter_levels=len(levels))
+    metrics.inc("haberbot_filtered_searches_total", relaxed=str(level > 0).lower())
+    return docs[:k]
+
+
+def _merge(docs: list, seen: set, hits):
+    """Önceki kademelerde bulunmayan belgeleri sona ekler."""
+    for doc in hits:
+        key = doc.id or (doc.metadata.get("source"), doc.metadata.get("chunk_index"))
+        if key not in seen:
+            seen.add(key)
+            docs.append(doc)
+
+
+def filtered_search_batch(search: Callable, questions: List[str], k: int = None, min_hits: int = None):
+    """`filtered_search`'ün toplu sürümü: her kademede aynı filtreyi kullanan sorular tek aramada sorgulanır.
+
+    `search(indeksler, where)` verilen sıradaki soruları `where` ile arar ve her
+    biri için belge listesi döndürür. Kademeler ve sonuçlar soru başına
+    `filtered_search` ile aynıdır; kısıtsız sorular tek grupta filtresiz aranır.
+    """
+    k = k or config.RETRIEVER_K
+    min_hits = min_hits or config.METADATA_FILTER_MIN_HITS
+    filters = [parse_query_filters(question) for question in questions]
+    levels = [f.relaxation_levels() if f else [None] for f in filters]
+    docs = [[] for _ in questions]
+    seen = [set() for _ in questions]
+    pending, depth = list(range(len(questions))), 0
+    while pending:
+        groups = {}
+        for i in pending:
+            where = levels[i][depth]
+            groups.setdefault(json.dumps(where, sort_keys=True), (where, []))[1].append(i)
+        for where, indices in groups.values():
+            for i, hits in zip(indices, search(indices, where)):
+                _merge(docs[i], seen[i], hits)
+        done = {i for i in pending if len(docs[i]) >= min_hits or depth + 1 == len(levels[i])}
+        for i in done:
+            if filters[i]:
+                metrics.inc("haberbot_filtered_searches_total", relaxed=str(depth > 0).lower())
+        pending = [i for i in pending if i not in done]
+        depth += 1
+    return [found[:k] for found in docs]
+
+
+def matches(metadata: dict, filters: QueryFilters) -> bool:
+    """Chunk metadata'sı kısıtların hepsini sağlıyor mu? (benchmark'ta isabet ölçümü için)"""
+    if filters.issue is not None and metadata.get("issue") != filters.issue:
+        return False
+    if filters.date_from is not None and not filters.date_from <= metadata.get("date", 0) <= filters.date_to:
+        return False
+    return filters.doc_type is None or metadata.get("doc_type") == filters.doc_type
+
+
+def synthetic_questions(documents: dict, count: int, seed: int = 0) -> List[dict]:
+    """Sentetik belgelerden tarih/ay/sayı/tür kısıtlı sorular üretir; doğru cevap belgenin kendisidir."""
+    rng = random.Random(seed)
+    names = sorted(documents)
+    questions = []
+    for _ in range(count):
+        name = rng.choice(names)
+        text = documents[name]
+        meta = file_metadata(text)
+        lines = text.splitlines()
+        title = lines[4] # Kurumdan sonraki başlık satırı ("Kiralama Hakkında Tebliğ")
+        date = str(meta["date"])
+        day, month, year = date[6:], int(date[4:6]), date[:4]
+        style = rng.choice(("day", "month", "issue"))
+        if style == "day":
+            question = f"{day}.{month:02d}.{year} tarihli Resmi Gazete'de yayımlanan {title} neyi düzenliyor?"
+        elif style == "month":
+            question = f"{MONTHS[month - 1].capitalize()} {year}'te yayımlanan {title} ne getiriyor?"
+        else:
+            question = f"{meta['issue']} sayılı Resmi Gazete'deki {title} hangi hükümleri içeriyor?"
+        questions.append({"question": question, "source": name})
+    return questions
+
+
+def run_bench(docs: int = 300, n_queries: int = 200, seed: int = 0) -> dict:
+    """Sentetik korpusta filtresiz ve filtreli aramayı karşılaştırır (Chroma, hibrit, mmap).
+
+    Ölçülenler: sorgu gecikmesi, kısıt isabeti (dönen chunk'ların sorudaki
+    kısıtları sağlama oranı) ve doğru belgenin ilk `k` içinde bulunma oranı.
+    """
+    import chromadb
+    from langchain_community.vectorstores import Chroma
+    from haberbot import vectors
+    from haberbot.bench import FakeEmbeddings, build_collection, synthetic_documents
+    from haberbot.lexical import HybridRetriever, LexicalIndex
+
+    documents = synthetic_documents(docs, seed)
+    questions = synthetic_questions(documents, n_queries, seed)
+    embeddings = FakeEmbeddings()
+    with tempfile.TemporaryDirectory(prefix="haberbot-filters-") as workdir:
+        chunks = build_collection(workdir, embeddings, documents)
+        store = Chroma(collection_name=config.CHROMA_COLLECTION_NAME, persist_directory=workdir,
+                       embedding_function=embeddings)
+        collection = chromadb.PersistentClient(path=workdir).get_collection(name=config.CHROMA_COLLECTION_NAME)
+        vectors.export_collection(collection, workdir)
+        index = vectors.VectorIndex.open(workdir)
+        retrievers = {
+            "chroma": store.as_retriever(search_kwargs={"k": config.RETRIEVER_K}),
+            "hybrid": HybridRetriever(collection=store._collection, embeddings=embeddings,
+                                      lexical=LexicalIndex.open(workdir), k=config.RETRIEVER_K,
+                                      fetch_k=config.HYBRID_FETCH_K),
+            "mmap": vectors.VectorRetriever(index=index, embeddings=embeddings, k=config.RETRIEVER_K),
+        }
+
+        def measure(search) -> dict:
+            latencies, precision, found = [], [], []
+            for item in questions:
+                filters = parse_query_filters(item["question"])
+                t0 = time.perf_counter()
+                hits = search(item["question"])
+                latencies.append(time.perf_counter() - t0)
+                precision.append(np.mean([matches(d.metadata, filters) for d in hits]) if hits else 0.0)
+                found.append(any(d.metadata.get("source") == item["source"] for d in hits))
+            return {"p50_ms": float(np.percentile(latencies, 50) * 1000),
+                    "p95_ms": float(np.percentile(latencies, 95) * 1000),
+                    "constraint_precision": float(np.mean(precision)), "source_recall": float(np.mean(found))}
+
+        report = {"documents": docs, "chunks": chunks, "queries": len(questions), "k": config.RETRIEVER_K,
+                  "parsed": sum(1 for item in questions if parse_query_filters(item["question"])) / len(questions)}
+        for name, retriever in retrievers.items():
+            retriever.invoke(questions[0]["question"]) # Isınma
+            report[name] = {"unfiltered": measure(retriever.invoke),
+                            "filtered": measure(lambda q: filtered_search(retriever, q))}
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resmi Gazete metadata filtreleri")
+    parser.add_argument("command", choices=["parse", "bench"])
+    parser.add_argument("question", nargs="?", help="parse: kısıtları gösterilecek soru")
+    parser.add_argument("--docs", type=int, default=300, help="bench: sentetik belge sayısı")
+    parser.add_argument("--queries", type=int, default=200, help="bench: soru sayısı")
+    parser.add_argument("--out", help="bench: sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    if args.command == "parse":
+        filters = parse_query_filters(args.question or "")
+        print(json.dumps({"filters": filters.describe(), "levels": filters.relaxation_levels() if filters else []},
+                         ensure_ascii=False, indent=2))
+        return
+
+    log.setLevel("WARNING") # Retriever'ların sorgu başına logları ölçümü boğmasın
+    report = run_bench(args.docs, args.queries)
+    print(f"{report['documents']} belge, {report['chunks']} chunk, {report['queries']} soru "
+          f"(kısıt bulunan: {report['parsed']:.0%}), k={report['k']}")
+    for name in ("chroma", "hybrid", "mmap"):
+        for mode in ("unfiltered", "filtered"):
+            r = report[name][mode]
+            print(f"   {name:>6} {mode:<10}: p50 {r['p50_ms']:6.2f} ms | p95 {r['p95_ms']:6.2f} ms | "
+                  f"kısıt isabeti {r['constraint_precision']:.3f} | doğru belge {r['source_recall']:.3f}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Düğüm başına Ollama model profilleri, açılışta ısınma (warm-up) ve keep-alive.
+
+Ollama bir modeli ilk istekte belleğe yükler ve `keep_alive` süresi (varsayılan
+5 dk) boyunca istek gelmezse boşaltır. Yükleme 14B bir model için onlarca
+saniye sürebilir; deploy sonrası veya boşta kalınan bir süreden sonraki ilk
+soru bu bedeli öder. Bu modül:
+- `LLM_PROFILES`'a göre her düğüm için (model, `num_predict`, `stop`) ayarlı
+  bir `ChatOllama` kurar; aynı ayarlı düğümler tek istemciyi paylaşır. Böylece
+  supervisor küçük ve hızlı bir modelle (`OLLAMA_SMALL_LLM`), cevap düğümleri
+  ana modelle çalışabilir,
+- Her LLM ve embedding isteğine `OLLAMA_KEEP_ALIVE` süresini ekler,
+- Embedding'leri `/api/embed` ucundan alır: birden çok metin tek istekte
+  gider, vektörler normalize döner ve öneksizdir (korpus notebook'ta
+  sentence-transformers ile öneksiz ve normalize embed edildi),
+- Açılışta tüm modelleri arka planda yükler (`warm_up`),
+- Düğüm başına soğuk/sıcak ilk token gecikmesini ölçer:
+    python -m haberbot.models latency [--repeat 3] [--out latency.json]
+"""
+import argparse
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import requests
+from langchain_community.chat_models import ChatOllama
+from langchain_community.embeddings import OllamaEmbeddings
+from pydantic import PrivateAttr
+
+from haberbot import config
+from haberbot.telemetry import log
+
+WARMUP_PROMPT = "Merhaba"
+
+
+class KeepAliveOllamaEmbeddings(OllamaEmbeddings):
+    """`/api/embed` ucunu paylaşımlı bir HTTP oturumuyla kullanan ve `keep_alive` ekleyen `OllamaEmbeddings`.
+
+    Topluluk sürümü her metin için eski `/api/embeddings` ucuna ayrı, oturumsuz
+    bir istek atar, "passage: "/"query: " öneki ekler ve normalize etmez.
+    Burada metin listesi tek istekte gönderilir; önek yoktur ve Ollama
+    vektörleri birim uzunlukta döndürür, yani korpusla aynı uzaydadır.
+    """
+    keep_alive: Optional[Union[int, str]] = None
+    embed_instruction: str = ""
+    query_instruction: str = ""
+    _session: requests.Session = PrivateAttr(default_factory=requests.Session)
+
+    @property
+    def _default_params(self) -> Dict[str, Any]:
+        params = super()._default_params
+        if self.keep_alive is not None:
+            params["keep_alive"] = self.keep_alive
+        return params
+
+    def _embed(self, input: List[str]) -> List[List[float]]:
+        if not input:
+            return []
+        try:
+            res = self._session.post(f"{self.base_url}/api/embed",
+                                     headers={"Content-Type": "application/json", **(self.headers or {})},
+                                     json={**self._default_params, "input": input})
+        except requests.exceptions.RequestException as e:
+            raise ValueError(f"Error raised by inference endpoint: {e}")
+        if res.status_code != 200:
+            raise ValueError(f"Error raised by inference API HTTP code: {res.status_code}, {res.text}")
+        return res.json()["embeddings"]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Soruları tek `/api/embed` isteğinde embed eder (`embed_query` ile aynı vektörler)."""
+        return self._embed([f"{self.query_instruction}{text}" for text in texts])
+
+    def close(self):
+        self._session.close()
+
+
+def profile_for(node: str) -> dict:
+    """Düğümün model profilini döndürür; tanımlı değilse "default" profili."""
+    return {**config.LLM_PROFILES["default"], **config.LLM_PROFILES.get(node, {})}
+
+
+def make_embeddings() -> OllamaEmbeddings:
+    return KeepAliveOllamaEmbeddings(model=config.OLLAMA_EMBED_MODEL, base_url=config.OLLAMA_BASE_URL,
+                                     keep_alive=config.OLLAMA_KEEP_ALIVE)
+
+
+def make_chat_model(profile: dict, **overrides) -> ChatOllama:
+    params = {"model": profile["model"], "temperature": 0, "base_url": config.OLLAMA_BASE_URL,
+              "num_predict": profile.get("num_predict"), "stop": profile.get("stop"),
+              "keep_alive": config.OLLAMA_KEEP_ALIVE}
+    return ChatOllama(**{**params, **overrides})
+
+
+def make_node_models(nodes) -> Dict[str, ChatOllama]:
+    """Düğüm adı -> `ChatOllama`; aynı profildeki düğümler aynı istemciyi paylaşır."""
+    shared, models = {}, {}
+    for node in nodes:
+        profile = profile_for(node)
+        key = (profile["model"], profile.get("num_predict"), tuple(profile.get("stop") or ()))
+        if key not in shared:
+            shared[key] = make_chat_model(profile)
+        models[node] = shared[key]
+    return models
+
+
+def distinct_models(nodes=None) -> List[str]:
+    nodes = nodes or list(config.LLM_PROFILES)
+    return sorted({profile_for(node)["model"] for node in nodes})
+
+
+def warm_up(embeddings=None, models: List[str] = None) -> Dict[str, dict]:
+    """Embedding modelini ve LLM'leri Ollama'ya yükler; model başına süre veya hata döndürür.
+
+    Tek token üretilir; yükleme süresi Ollama'nın bildirdiği `load_duration`'dan okunur.
+    """
+    results = {}
+    if embeddings is not None:
+        t0 = time.perf_counter()
+        try:
+            embeddings.embed_query(WARMUP_PROMPT)
+            results[config.OLLAMA_EMBED_MODEL] = {"seconds": round(time.perf_counter() - t0, 3)}
+        except Exception as e:
+            results[config.OLLAMA_EMBED_MODEL] = {"error": str(e)}
+    for model in models or distinct_models():
+        t0 = time.perf_counter()
+        try:
+            response = make_chat_model({"model": model}, num_predict=1).invoke(WARMUP_PROMPT)
+            load_ns = (response.response_metadata or {}).get("load_duration")
+            results[model] = {"seconds": round(time.perf_counter() - t0, 3),
+                              "load_seconds": round(load_ns / 1e9, 3) if load_ns is not None else None}
+        except Exception as e:
+            results[model] = {"error": str(e)}
+    for model, result in results.items():
+        if "error" in result:
+            log.warning(f"Isınma başarısız ({model}): {result['error']}")
+        else:
+            log.info(f"Model ısındı: {model} ({result['seconds']:.2f} s)")
+    return results
+
+
+def start_warm_up(rt, embeddings) -> threading.Thread:
+    """Isınmayı arka planda başlatır; sonuçlar `rt.warmup`'a yazılır (açılış beklemez)."""
+    rt.warmup = {"status": "running"}
+
+    def run():
+        results = warm_up(embeddings)
+        rt.warmup = {"status": "done", "models": results}
+
+    thread = threading.Thread(target=run, name="ollama-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def unload(model: str, embedding: bool = False, timeout: float = 30.0) -> bool:
+    """Modeli Ollama belleğinden boşaltır (`keep_alive: 0`) ve boşalana kadar bekler."""
+    endpoint, payload = ("embed", {"input": []}) if embedding else ("generate", {})
+    requests.post(f"{config.OLLAMA_BASE_URL}/api/{endpoint}", json={"model": model, "keep_alive": 0, **payload},
+                  timeout=timeout).raise_for_status()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        loaded = requests.get(f"{config.OLLAMA_BASE_URL}/api/ps", timeout=5).json().get("models", [])
+        if not any(m.get("name") == model or m.get("model") == model for m in loaded):
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def first_token_seconds(llm, prompt: str) -> float:
+    # Akış sonuna kadar okunur; yarıda bırakılırsa Ollama üretmeye devam eder ve sonraki ölçümü bozar
+    t0, first = time.perf_counter(), None
+    for _ in llm.stream(prompt):
+        if first is None:
+            first = time.perf_counter() - t0
+    return first if first is not None else time.perf_counter() - t0
+
+
+def measure_latency(nodes: List[str], repeat: int = 3) -> dict:
+    """Her düğüm için modeli boşaltıp soğuk, ardından `repeat` kez sıcak ilk token gecikmesini ölçer."""
+    report = {"keep_alive": config.OLLAMA_KEEP_ALIVE, "nodes": {}}
+    models = make_node_models(nodes)
+    embeddings = make_embeddings()
+    unload(config.OLLAMA_EMBED_MODEL, embedding=True)
+    t0 = time.perf_counter()
+    embeddings.embed_query(WARMUP_PROMPT)
+    cold = time.perf_counter() - t0
+    warm = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        embeddings.embed_query(WARMUP_PROMPT)
+        warm.append(time.perf_counter() - t0)
+    report["embeddings"] = {"model": config.OLLAMA_EMBED_MODEL, "cold_ms": cold * 1000,
+                            "warm_p50_ms": float(np.median(warm)) * 1000}
+
+    for node in nodes:
+        profile = profile_for(node)
+        unload(profile["model"])
+        cold = first_token_seconds(models[node], WARMUP_PROMPT)
+        warm = [first_token_seconds(models[node], WARMUP_PROMPT) for _ in range(repeat)]
+        report["nodes"][node] = {"model": profile["model"], "num_predict": profile.get("num_predict"),
+                                 "cold_ms": cold * 1000, "warm_p50_ms": float(np.median(warm)) * 1000}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ollama modelleri: ısınma ve soğuk/sıcak ilk token gecikmesi")
+    parser.add_argument("command", choices=["warmup", "latency"])
+    parser.add_argument("--nodes", default="supervisor,resmi_gazete_agent,general_agent")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="latency: sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    if args.command == "warmup":
+        print(json.dumps(warm_up(make_embeddings()), ensure_ascii=False, indent=2))
+        return
+
+    nodes = [n.strip() for n in args.nodes.split(",") if n.strip()]
+    report = measure_latency(nodes, args.repeat)
+    emb = report["embeddings"]
+    print(f"keep_alive={report['keep_alive']}")
+    print(f"{'embeddings':<20} {emb['model']:<22} soğuk {emb['cold_ms']:8.0f} ms | sıcak {emb['warm_p50_ms']:6.0f} ms")
+    for node, r in report["nodes"].items():
+        print(f"{node:<20} {r['model']:<22} soğuk {r['cold_ms']:8.0f} ms | sıcak {r['warm_p50_ms']:6.0f} ms (ilk token)")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
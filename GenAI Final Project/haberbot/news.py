@@ -0,0 +1,176 @@
+"""`general_knowledge_node` için paylaşımlı NewsData.io istemcisi.
+
+Her soruda yeni bir `NewsDataApiClient` oluşturup zaman aşımı olmadan
+beklemek yerine:
+- Tek bir `requests.Session` ve HTTP bağlantı havuzu süreç boyunca paylaşılır,
+- Normalize edilmiş sorgu sonuçları TTL ile önbellekte tutulur (kota korunur),
+- Bağlantı ve okuma için katı zaman aşımları uygulanır,
+- Art arda hatalarda veya 429 (rate limit) yanıtında devre kesici (circuit
+  breaker) açılır; açıkken API hiç çağrılmaz ve düğüm doğrudan LLM-only
+  yanıta düşer. Bekleme süresi dolunca tek bir deneme isteğine izin verilir.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from haberbot import config
+from haberbot.answer_cache import normalize_question
+from haberbot.telemetry import log, metrics, span
+
+
+class NewsApiError(Exception):
+    """NewsData.io isteği başarısız oldu (zaman aşımı, HTTP hatası, geçersiz yanıt)."""
+
+
+class CircuitOpenError(NewsApiError):
+    """Devre kesici açık; API geçici olarak atlanıyor."""
+
+
+class CircuitBreaker:
+    """Art arda `failure_threshold` hatadan sonra `cooldown` saniye boyunca açılır."""
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._open_until = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self._open_until
+
+    def allow(self) -> bool:
+        """İstek yapılabilir mi? Bekleme bittiğinde (half-open) sadece tek deneme geçer."""
+        with self._lock:
+            if self._failures < self.failure_threshold and not self.is_open:
+                return True
+            if self.is_open or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._open_until = 0.0
+            self._trial_in_flight = False
+
+    def record_failure(self, cooldown: float = None):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._failures >= self.failure_threshold or cooldown is not None:
+                self._failures = max(self._failures, self.failure_threshold)
+                self._open_until = time.monotonic() + (cooldown if cooldown is not None else self.cooldown)
+
+
+class NewsClient:
+    """Bağlantı havuzlu, önbellekli ve devre kesicili NewsData.io istemcisi."""
+
+    def __init__(self, api_key: str, base_url: str = None):
+        self.api_key = api_key
+        self.base_url = (base_url or config.NEWSDATA_BASE_URL).rstrip("/") + "/"
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.NEWS_POOL_SIZE, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.breaker = CircuitBreaker(config.NEWS_BREAKER_FAILURES, config.NEWS_BREAKER_COOLDOWN)
+        self._cache = OrderedDict()  # normalize sorgu -> (geçerlilik sonu, yanıt)
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.requests_made = 0
+
+    def _cache_get(self, key: str):
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None:
+                return None
+            expires_at, response = item
+            if expires_at <= time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return response
+
+    def _cache_put(self, key: str, response: dict):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + config.NEWS_CACHE_TTL, response)
+            self._cache.move_to_end(key)
+            while len(self._cache) > config.NEWS_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def search(self, question: str, size: int = 5) -> dict:
+        """Türkçe haberlerde arar ve NewsData.io yanıt sözlüğünü döndürür.
+
+        Devre açıksa `CircuitOpenError`, istek başarısızsa `NewsApiError` fırlatır.
+        API'nin kendi hata yanıtları ("status": "error") olduğu gibi döndürülür.
+        """
+        with span("news") as attrs:
+            try:
+                data = self._search(question, size, attrs)
+            except CircuitOpenError:
+                attrs["outcome"] = "circuit_open"
+                raise
+            except NewsApiError:
+                attrs.setdefault("outcome", "error")
+                raise
+            finally:
+                metrics.inc("haberbot_news_requests_total", outcome=attrs.get("outcome", "error"))
+            attrs["articles"] = len(data.get("results") or []) if data.get("status") == "success" else 0
+            return data
+
+    def _search(self, question: str, size: int, attrs: dict) -> dict:
+        key = normalize_question(question)
+        cached = self._cache_get(key)
+        if cached is not None:
+            log.info("NewsData.io sonucu önbellekten alındı.")
+            attrs["outcome"] = "cache"
+            return cached
+
+        if not self.breaker.allow():
+            raise CircuitOpenError("NewsData.io devre kesicisi açık, haber araması atlandı.")
+
+        with self._lock:
+            self.requests_made += 1 # İstemci ön getirme havuzu ve API thread'leri arasında paylaşılır
+        try:
+            response = self.session.get(
+                self.base_url + "latest",
+                params={"apikey": self.api_key, "q": question, "language": "tr", "size": size},
+                timeout=(config.NEWS_CONNECT_TIMEOUT, config.NEWS_READ_TIMEOUT),
+            )
+        except requests.RequestException as e:
+            self.breaker.record_failure()
+            raise NewsApiError(f"NewsData.io isteği başarısız: {e}") from e
+
+        if response.status_code == 429:
+            # Kota/rate limit: Retry-After kadar (yoksa varsayılan süre) API'yi hiç çağırma
+            retry_after = response.headers.get("Retry-After")
+            cooldown = float(retry_after) if retry_after and retry_after.isdigit() else config.NEWS_BREAKER_COOLDOWN
+            self.breaker.record_failure(cooldown=cooldown)
+            attrs["outcome"] = "rate_limited"
+            raise NewsApiError(f"NewsData.io rate limit (429), {cooldown:.0f} sn beklenecek.")
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+            raise NewsApiError(f"NewsData.io sunucu hatası: HTTP {response.status_code}")
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            self.breaker.record_failure()
+            raise NewsApiError("NewsData.io geçersiz JSON döndürdü.") from e
+
+        # 4xx yanıtları (ör. geçersiz sorgu) servisin sağlıklı olduğunu gösterir; devreyi açmaz
+        self.breaker.record_success()
+        attrs["outcome"] = "ok" if data.get("status") == "success" else "api_error"
+        if data.get("status") == "success":
+            self._cache_put(key, data)
+        return data
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,115 @@
+"""NewsData.io yerine geçen yerel sahte (stub) HTTP sunucusu.
+
+Testlerde ve benchmark'larda gerçek API anahtarı ve kota harcamadan
+`NewsClient`'ı denemek için kullanılır. Gecikme ve hata modu ayarlanabilir:
+
+    with NewsStubServer(latency=0.2) as base_url:
+        client = NewsClient("test", base_url=base_url)
+
+Tek başına çalıştırmak için:
+    python -m haberbot.news_stub --port 8765
+    NEWSDATA_BASE_URL=http://localhost:8765/api/1/ streamlit run app.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def fake_articles(query: str, size: int):
+    return [{
+        "title": f"{query} hakkında haber {i + 1}",
+        "description": f"'{query}' ile ilgili örnek haber açıklaması {i + 1}.",
+        "pubDate": "2024-01-01 12:00:00",
+        "link": f"https://example.com/haber/{i + 1}",
+        "source_id": "stub",
+    } for i in range(size)]
+
+
+class NewsStubServer:
+    """Arka plan thread'inde çalışan sahte NewsData.io sunucusu.
+
+    `mode`: "ok" (haber döner), "empty" (sonuç yok), "error" (HTTP 500),
+    "rate_limit" (HTTP 429), "hang" (`latency` kadar bekleyip yanıt verir;
+    zaman aşımı testleri için büyük bir gecikmeyle kullanılır).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, mode: str = "ok"):
+        self.latency = latency
+        self.mode = mode
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if not url.path.rstrip("/").endswith("/latest"):
+                    return self._send(404, {"status": "error", "results": {"message": "Bilinmeyen uç nokta"}})
+                if stub.mode == "error":
+                    return self._send(500, {"status": "error", "results": {"message": "Sunucu hatası"}})
+                if stub.mode == "rate_limit":
+                    return self._send(429, {"status": "error", "results": {"message": "Rate limit"}}, {"Retry-After": "30"})
+                size = int(params.get("size", 5))
+                articles = [] if stub.mode == "empty" else fake_articles(params.get("q", ""), size)
+                self._send(200, {"status": "success", "totalResults": len(articles), "results": articles})
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass # Test çıktısını kirletmesin
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/1/"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> str:
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sahte NewsData.io sunucusu")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Yanıt başına gecikme (saniye)")
+    parser.add_argument("--mode", choices=["ok", "empty", "error", "rate_limit", "hang"], default="ok")
+    args = parser.parse_args()
+    stub = NewsStubServer(port=args.port, latency=args.latency, mode=args.mode)
+    print(f"Sahte NewsData.io sunucusu çalışıyor: {stub.base_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
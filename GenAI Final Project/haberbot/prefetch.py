@@ -0,0 +1,67 @@
+"""Supervisor sınıflandırırken Chroma araması ve haber aramasını önceden başlatır.
+
+Retrieval ve NewsData.io çağrısı sınıflandırma sonucuna bağlı değildir; bu
+yüzden `classify_question_node` başında bir thread havuzunda başlatılır ve
+Future'lar grafik durumunda (`prefetch`) taşınır. Seçilen agent kendi
+sonucunu `claim` ile alır; diğerleri henüz başlamadıysa iptal edilir,
+başladıysa sonucu atılır. Yararlı/boşa giden ön getirmeler sayılır.
+"""
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict
+
+from haberbot import config
+from haberbot.telemetry import traced
+
+if TYPE_CHECKING:
+    from haberbot.runtime import Runtime
+
+MISSING = object() # İlgili türde ön getirme yapılmadıysa `claim` bunu döndürür
+
+
+class Prefetcher:
+    def __init__(self, kinds=None, workers: int = None):
+        self.kinds = set(kinds if kinds is not None else config.SPECULATIVE_PREFETCH)
+        self.pool = ThreadPoolExecutor(max_workers=workers or config.PREFETCH_WORKERS, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self.stats = {"started": 0, "useful": 0, "wasted": 0, "cancelled": 0}
+
+    def start(self, question: str, rt: "Runtime") -> Dict[str, Future]:
+        """Açık olan türler için ön getirmeyi başlatır ve Future'ları döndürür."""
+        futures = {}
+        if "retrieval" in self.kinds and rt.retriever is not None:
+            futures["retrieval"] = self._submit(traced("retrieval", rt.retrieve), question)
+        if "news" in self.kinds and rt.news is not None:
+            futures["news"] = self._submit(rt.news.search, question, 5)
+        with self._lock:
+            self.stats["started"] += len(futures)
+        return futures
+
+    def _submit(self, fn, *args) -> Future:
+        # İsteğin izi (request ID, span'ler) havuz thread'ine de taşınsın
+        return self.pool.submit(contextvars.copy_context().run, fn, *args)
+
+    def claim(self, futures: Dict[str, Future] | None, kind: str = None):
+        """`kind` türünün sonucunu döndürür (görev hata verdiyse hatayı fırlatır), diğerlerini bırakır.
+
+        `kind` None ise (ör. fallback agent) tüm ön getirmeler bırakılır.
+        Ön getirme yoksa `MISSING` döner; çağıran taraf işi kendisi yapar.
+        """
+        if not futures:
+            return MISSING
+        chosen = futures.get(kind) if kind else None
+        for other_kind, future in futures.items():
+            if future is chosen:
+                continue
+            cancelled = future.cancel()
+            with self._lock:
+                self.stats["cancelled" if cancelled else "wasted"] += 1
+        if chosen is None:
+            return MISSING
+        with self._lock:
+            self.stats["useful"] += 1
+        return chosen.result()
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,408 @@
+"""Süreç başına bir kez kurulan paylaşımlı kaynaklar.
+
+Streamlit her chat mesajında betiğin tamamını yeniden çalıştırır. Embedding
+modeli, LLM istemcisi, ChromaDB vektör deposu ve derlenmiş LangGraph grafiği
+burada bir kez oluşturulur ve tüm oturumlar tarafından paylaşılır; böylece
+mesaj başına maliyet yalnızca grafiğin çalıştırılmasından ibaret kalır.
+İndeks değiştiğinde `reload_runtime()` ile (veya `get_runtime()` içindeki
+parmak izi kontrolüyle otomatik olarak) kaynaklar yeniden kurulur.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_community.vectorstores import Chroma
+
+from haberbot import config
+from haberbot.answer_cache import AnswerCache
+from haberbot.classifier import PreClassifier
+from haberbot.context import assemble_context
+from haberbot.graph import build_workflow
+from haberbot.lexical import HybridRetriever, LexicalIndex
+from haberbot.limits import ConcurrencyLimiter, LimitedChatModel, LimitedEmbeddings
+from haberbot.metadata import filtered_search, filtered_search_batch
+from haberbot.models import make_chat_model, make_embeddings, make_node_models, profile_for, start_warm_up
+from haberbot.news import NewsClient
+from haberbot.prefetch import Prefetcher
+from haberbot.telemetry import log, metrics
+from haberbot.vectors import VectorIndex, VectorRetriever
+
+
+@dataclass
+class Runtime:
+    """Grafik düğümlerinin ihtiyaç duyduğu, oturumlar arasında paylaşılan kaynaklar."""
+    embeddings: Any = None
+    llm: Any = None                      # Varsayılan profildeki LLM (LLM_PROFILES["default"])
+    llms: Dict[str, Any] = field(default_factory=dict)  # Düğüm adı -> kendi profilindeki LLM
+    vectorstore: Any = None
+    retriever: Any = None
+    collection: Any = None               # Chroma koleksiyonu veya mmap VectorIndex (ID ile chunk getirmek için)
+    app: Any = None                      # Derlenmiş LangGraph grafiği
+    classifier: Any = None               # LLM'siz ön sınıflandırıcı (kapalıysa None)
+    answer_cache: Any = None             # Anlamsal cevap önbelleği (kapalıysa None)
+    news_api_key: Optional[str] = None
+    news: Any = None                     # Paylaşımlı NewsData.io istemcisi (anahtar yoksa None)
+    prefetcher: Any = None               # Sınıflandırma sırasında spekülatif retrieval/haber araması (kapalıysa None)
+    llm_limiter: Any = None              # Ollama'ya giden eşzamanlı LLM çağrısı sınırı
+    embed_limiter: Any = None            # Ollama'ya giden eşzamanlı embedding çağrısı sınırı
+    warmup: Dict[str, Any] = field(default_factory=dict)  # Açılıştaki model ısınmasının durumu/süreleri
+    index_fingerprint: Optional[Tuple[int, ...]] = None
+    startup_timings: Dict[str, float] = field(default_factory=dict)  # Aşama -> saniye
+    warnings: List[str] = field(default_factory=list)  # Arayüzde gösterilecek uyarılar
+
+    @property
+    def startup_seconds(self) -> float:
+        return sum(self.startup_timings.values())
+
+    def llm_for(self, node: str):
+        """Düğümün profilindeki LLM'i döndürür (bkz. `config.LLM_PROFILES`)."""
+        return self.llms.get(node, self.llm)
+
+    def fetch_context(self, ids: List[str]) -> List[str]:
+        """Chunk ID'lerinden RAG düğümünün prompt'a koyduğu bağlam parçalarını yeniden oluşturur.
+
+        Chunk'lar retrieval sırasıyla getirilip aynı `assemble_context` adımından
+        geçirilir; indeks değişmediyse sonuç cevap üretilirkenki bağlamla aynıdır.
+        """
+        if not ids or self.collection is None:
+            return []
+        got = self.collection.get(ids=list(ids), include=["documents", "metadatas"])
+        found = {i: Document(page_content=d, metadata=m or {}, id=i)
+                 for i, d, m in zip(got["ids"], got["documents"], got["metadatas"])}
+        return assemble_context([found[i] for i in ids if i in found]).passages
+
+    def retrieve(self, question: str) -> List[Document]:
+        """Resmi Gazete araması; sorudaki tarih/sayı/tür kısıtları `where` filtresi olarak uygulanır."""
+        if config.METADATA_FILTERS:
+            return filtered_search(self.retriever, question)
+        return self.retriever.invoke(question)
+
+    def retrieve_batch(self, questions: List[str], embeddings: List[List[float]]) -> List[List[Document]]:
+        """`retrieve`'ın toplu sürümü: embedding'ler hazırdır, aynı filtreli sorular tek aramada sorgulanır."""
+        search_batch = getattr(self.retriever, "search_batch", None) or self._chroma_search_batch
+
+        def search(indices, where):
+            return search_batch([questions[i] for i in indices], [embeddings[i] for i in indices], where)
+
+        if config.METADATA_FILTERS:
+            return filtered_search_batch(search, questions)
+        return search(range(len(questions)), None)
+
+    def _chroma_search_batch(self, queries: List[str], embeddings: List[List[float]],
+                             filter: dict = None) -> List[List[Document]]:
+        """`vectorstore.as_retriever` aramasının toplu karşılığı: tüm sorular tek `collection.query` çağrısında."""
+        result = self.collection.query(query_embeddings=list(embeddings), n_results=config.RETRIEVER_K, where=filter,
+                                       include=["documents", "metadatas"])
+        return [[Document(page_content=d, metadata=m or {}, id=i) for i, d, m in zip(ids, docs, metas)]
+                for ids, docs, metas in zip(result["ids"], result["documents"], result["metadatas"])]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Soru embedding'ini döndürür (`CachedEmbeddings` ile sarılıysa önbellekten)."""
+        return self.embeddings.embed_query(text)
+
+    def close(self):
+        """Ön getirme havuzunu, cevap önbelleği bağlantısını ve haber istemcisinin HTTP oturumunu kapatır."""
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+        if self.answer_cache is not None:
+            self.answer_cache.close()
+        if self.news is not None:
+            self.news.close()
+
+    def stats(self) -> dict:
+        """Arayüzün kenar çubuğu ve API'nin `/stats` ucu için özet."""
+        stats = {"startup_seconds": self.startup_seconds, "warnings": list(self.warnings)}
+        if self.warmup:
+            stats["warmup"] = self.warmup
+        if self.answer_cache is not None:
+            stats["answer_cache"] = self.answer_cache.stats()
+        if self.prefetcher is not None:
+            stats["prefetch"] = {"kinds": sorted(self.prefetcher.kinds), **self.prefetcher.stats}
+        stats["limits"] = {name: limiter.stats() for name, limiter in
+                           (("llm", self.llm_limiter), ("embeddings", self.embed_limiter)) if limiter is not None}
+        return stats
+
+
+class CachedEmbeddings(Embeddings):
+    """Soru embedding'lerini LRU önbellekte tutan sarmalayıcı.
+
+    Ön sınıflandırıcı, cevap önbelleği ve retriever (ön getirme ile aynı anda
+    çalışsalar bile) aynı soruyu tekrar embed etmez: hesaplanmakta olan bir
+    soru için ikinci çağrı ilk hesaplamanın bitmesini bekler.
+    """
+
+    def __init__(self, base: Embeddings, max_size: int = None):
+        self.base = base
+        self.max_size = max_size or config.QUERY_EMBED_CACHE_SIZE
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._lock:
+            vec = self._cache.get(text)
+            if vec is not None:
+                self._cache.move_to_end(text)
+            else:
+                future = self._in_flight.get(text)
+                owner = future is None
+                if owner:
+                    future = self._in_flight[text] = Future()
+        if vec is not None:
+            metrics.inc("haberbot_query_embedding_cache_total", result="hit")
+            return vec
+        if not owner:
+            metrics.inc("haberbot_query_embedding_cache_total", result="in_flight")
+            return future.result()
+        metrics.inc("haberbot_query_embedding_cache_total", result="miss")
+        try:
+            vec = self.base.embed_query(text)
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[text]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._cache[text] = vec
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+            del self._in_flight[text]
+        future.set_result(vec)
+        return vec
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Önbellekte olmayan soruları tek toplu çağrıda embed eder (toplu değerlendirme için).
+
+        Sonuçlar önbelleğe yazılır; böylece ardından grafikte çalışan ön
+        sınıflandırıcı aynı soruları tekrar embed etmez.
+        """
+        with self._lock:
+            found = {text: self._cache[text] for text in texts if text in self._cache}
+        missing = list(dict.fromkeys(text for text in texts if text not in found))
+        metrics.inc("haberbot_query_embedding_cache_total", len(texts) - len(missing), result="hit")
+        if missing:
+            metrics.inc("haberbot_query_embedding_cache_total", len(missing), result="miss")
+            vectors = self.base.embed_queries(missing) if hasattr(self.base, "embed_queries") else \
+                [self.base.embed_query(text) for text in missing]
+            with self._lock:
+                for text, vec in zip(missing, vectors):
+                    found[text] = self._cache[text] = vec
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+        return [found[text] for text in texts]
+
+
+def index_fingerprint(path: str = None) -> Optional[Tuple[int, ...]]:
+    """ChromaDB dosyasının, BM25 ve vektör indekslerinin (mtime, boyut) bilgisini döndürür; hiçbiri yoksa None.
+
+    Birkaç `os.stat` çağrısı olduğu için her rerun'da kontrol etmek ucuzdur.
+    """
+    path = path or config.CHROMA_DB_PATH
+    def stat(*parts) -> Tuple[int, int]:
+        try:
+            st = os.stat(os.path.join(path, *parts))
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return 0, 0
+
+    chroma = stat("chroma.sqlite3")
+    vectors = stat(config.VECTOR_DIR_NAME, "meta.json")[0]
+    if chroma == (0, 0) and not vectors:
+        return None
+    return (*chroma, stat(config.BM25_DIR_NAME, "meta.json")[0], vectors)
+
+
+def build_runtime(embeddings: Embeddings = None, llm=None, previous: Runtime = None) -> Runtime:
+    """Modelleri, vektör deposunu ve grafiği oluşturur.
+
+    `embeddings`/`llm` verilirse Ollama yerine bunlar kullanılır (ör. benchmark'taki
+    sahte modeller, bkz. `haberbot.bench`); sınırlayıcı ve önbellek sarmalayıcıları
+    yine uygulanır. `previous` verilirse (yeniden yüklemede eski Runtime) onun
+    sınırlayıcıları devralınır: eski Runtime `RUNTIME_CLOSE_GRACE` boyunca
+    istek bitirirken iki Runtime birlikte Ollama'ya en fazla
+    `LLM_MAX_CONCURRENCY` çağrı gönderir. Herhangi bir adım başarısız olursa kullanıcıya gösterilebilecek
+    bir mesajla RuntimeError fırlatır (arayüz bunu `st.error` ile gösterir).
+    """
+    rt = Runtime(news_api_key=config.NEWSDATA_API_KEY)
+    if embeddings is None or llm is None:
+        log.info(f"Kullanılacak Ollama Adresi: {config.OLLAMA_BASE_URL} ({config.OLLAMA_HOST_NOTE})")
+    # Tek Ollama sunucusunu korumak için tüm LLM ve embedding çağrıları bu sınırlayıcılardan geçer
+    if previous is not None and previous.llm_limiter is not None:
+        rt.llm_limiter, rt.embed_limiter = previous.llm_limiter, previous.embed_limiter
+    else:
+        rt.llm_limiter = ConcurrencyLimiter("LLM", config.LLM_MAX_CONCURRENCY, config.LLM_MAX_QUEUE,
+                                            config.OLLAMA_QUEUE_TIMEOUT)
+        rt.embed_limiter = ConcurrencyLimiter("Embedding", config.EMBED_MAX_CONCURRENCY, config.EMBED_MAX_QUEUE,
+                                              config.OLLAMA_QUEUE_TIMEOUT)
+
+    # Embedding Modeli
+    t0 = time.perf_counter()
+    try:
+        base = embeddings or make_embeddings()
+        base_embeddings = base
+        rt.embeddings = CachedEmbeddings(LimitedEmbeddings(base, rt.embed_limiter))
+        log.info("Ollama Embeddings modeli başarıyla yüklendi.")
+    except Exception as e:
+        raise RuntimeError(f"Ollama Embedding modeli ({config.OLLAMA_EMBED_MODEL}) yüklenirken hata: {e}\n"
+                           f"Ollama Adresi: {config.OLLAMA_BASE_URL}\n"
+                           "Lütfen Ollama'nın çalıştığından, modelin indirildiğinden ve belirtilen adresten erişilebilir olduğundan emin olun.") from e
+    rt.startup_timings["embeddings"] = time.perf_counter() - t0
+
+    # LLM Modeli
+    t0 = time.perf_counter()
+    try:
+        rt.llm = LimitedChatModel(llm or make_chat_model(profile_for("default")), rt.llm_limiter)
+        if llm is None:
+            # Aynı Ollama sunucusuna gittikleri için tüm modeller tek sınırlayıcıyı paylaşır
+            wrapped = {}
+            for node, model in make_node_models(config.LLM_PROFILES).items():
+                if id(model) not in wrapped:
+                    wrapped[id(model)] = LimitedChatModel(model, rt.llm_limiter)
+                rt.llms[node] = wrapped[id(model)]
+        models = sorted({m.model_name for m in [rt.llm, *rt.llms.values()]})
+        log.info(f"Ollama LLM ({', '.join(models)}) başarıyla yüklendi.")
+    except Exception as e:
+        raise RuntimeError(f"Ollama LLM ({config.OLLAMA_LLM}) yüklenirken/test edilirken hata: {e}\n"
+                           f"Ollama Adresi: {config.OLLAMA_BASE_URL}\n"
+                           "Lütfen Ollama'nın çalıştığından, modelin indirildiğinden ve belirtilen adresten erişilebilir olduğundan emin olun.") from e
+    rt.startup_timings["llm"] = time.perf_counter() - t0
+
+    # ChromaDB İstemcisi ve Vektör Deposu
+    t0 = time.perf_counter()
+    try:
+        if not os.path.exists(config.CHROMA_DB_PATH):
+            raise FileNotFoundError(f"ChromaDB yolu bulunamadı: {config.CHROMA_DB_PATH}. "
+                                    "Lütfen 'chroma_db' klasörünün bu betikle aynı dizinde olduğundan emin olun.")
+        vectors = VectorIndex.open(config.CHROMA_DB_PATH) if config.VECTOR_BACKEND == "mmap" else None
+        if vectors is not None:
+            # Chroma açılmaz; vektörler mmap ile okunur, yükleme süresi neredeyse sıfırdır
+            collection = vectors
+            rt.retriever = VectorRetriever(index=vectors, embeddings=rt.embeddings, k=config.RETRIEVER_K)
+            log.info(f"Vektör indeksi mmap ile açıldı ({vectors.meta['documents']} chunk, {vectors.meta['dtype']}).")
+        else:
+            if config.VECTOR_BACKEND == "mmap":
+                rt.warnings.append("UYARI: Vektör indeksi bulunamadı, ChromaDB kullanılacak. "
+                                   "Oluşturmak için: python -m haberbot.vectors export")
+            rt.vectorstore = Chroma(
+                collection_name=config.CHROMA_COLLECTION_NAME,
+                persist_directory=config.CHROMA_DB_PATH,
+                embedding_function=rt.embeddings # embedding_function'ı burada belirtmek önemli
+            )
+            collection = rt.vectorstore._collection
+            rt.retriever = rt.vectorstore.as_retriever(search_kwargs={"k": config.RETRIEVER_K})
+        rt.collection = collection
+        # Koleksiyonun boş olup olmadığını kontrol et (artık rerun başına değil, yüklemede bir kez)
+        if collection.count() == 0:
+            rt.warnings.append(f"UYARI: ChromaDB'deki '{config.CHROMA_COLLECTION_NAME}' koleksiyonu boş görünüyor. RAG sonuçları beklenildiği gibi olmayabilir.")
+        if config.HYBRID_RETRIEVAL:
+            lexical = LexicalIndex.open(config.CHROMA_DB_PATH)
+            if lexical is not None:
+                rt.retriever = HybridRetriever(collection=collection, embeddings=rt.embeddings,
+                                               lexical=lexical, k=config.RETRIEVER_K, fetch_k=config.HYBRID_FETCH_K)
+                log.info(f"BM25 indeksi yüklendi ({lexical.meta['documents']} chunk), hibrit arama açık.")
+            else:
+                rt.warnings.append("UYARI: BM25 indeksi bulunamadı, sadece vektör araması kullanılacak. "
+                                   "Oluşturmak için: python -m haberbot.lexical build")
+        # Parmak izi açılıştan sonra alınır; Chroma açılışta sqlite dosyasına yazabiliyor
+        rt.index_fingerprint = index_fingerprint()
+        log.info(f"ChromaDB'den '{config.CHROMA_COLLECTION_NAME}' koleksiyonu başarıyla yüklendi ve retriever oluşturuldu.")
+    except Exception as e:
+        raise RuntimeError(f"ChromaDB yüklenirken/erişilirken hata: {e}") from e
+    rt.startup_timings["vectorstore"] = time.perf_counter() - t0
+
+    # NewsData.io API anahtarı kontrolü
+    if rt.news_api_key:
+        rt.news = NewsClient(rt.news_api_key)
+    else:
+        rt.warnings.append("UYARI: NEWSDATA_API_KEY ortam değişkeni bulunamadı. "
+                           "Genel bilgi soruları için haber arama özelliği devre dışı kalacak "
+                           "ve sadece LLM'in genel bilgisi kullanılacaktır.")
+
+    if config.PRECLASSIFIER_ENABLED:
+        rt.classifier = PreClassifier(rt)
+
+    if config.SPECULATIVE_PREFETCH:
+        rt.prefetcher = Prefetcher()
+
+    # Cevap önbelleği (SQLite); indeks değiştiyse eski Resmi Gazete cevapları silinir
+    if config.ANSWER_CACHE_ENABLED:
+        try:
+            rt.answer_cache = AnswerCache()
+            rt.answer_cache.sync_index_fingerprint(rt.index_fingerprint)
+            log.info(f"Cevap önbelleği açıldı: {config.ANSWER_CACHE_PATH} ({rt.answer_cache.stats()['entries']} kayıt)")
+        except Exception as e:
+            # Önbellek olmadan da çalışılabilir, sadece uyar
+            rt.warnings.append(f"UYARI: Cevap önbelleği açılamadı, önbelleksiz devam ediliyor: {e}")
+
+    # Grafiği derle
+    t0 = time.perf_counter()
+    try:
+        rt.app = build_workflow(rt).compile()
+        log.info("LangGraph grafiği başarıyla derlendi.")
+    except Exception as e:
+        raise RuntimeError(f"LangGraph grafiği derlenirken hata: {e}") from e
+    rt.startup_timings["graph_compile"] = time.perf_counter() - t0
+
+    # Modeller ilk soruda değil açılışta yüklensin; arka planda çalıştığı için açılışı bekletmez
+    if config.OLLAMA_WARMUP and embeddings is None and llm is None:
+        start_warm_up(rt, base_embeddings)
+
+    timings = ", ".join(f"{k}={v:.3f}s" for k, v in rt.startup_timings.items())
+    log.info(f"Runtime hazır. Başlangıç süresi: {rt.startup_seconds:.3f}s ({timings})")
+    return rt
+
+
+_runtime: Optional[Runtime] = None
+_lock = threading.Lock()
+
+
+def get_runtime(auto_reload: bool = True) -> Runtime:
+    """Süreçteki paylaşımlı Runtime'ı döndürür, ilk çağrıda oluşturur.
+
+    `auto_reload` açıksa ChromaDB dosyasının parmak izi değiştiğinde (ör. yeni
+    bir ingest sonrası) kaynaklar yeniden kurulur.
+    """
+    global _runtime
+    rt = _runtime
+    if rt is not None and (not auto_reload or index_fingerprint() == rt.index_fingerprint):
+        return rt
+    with _lock:
+        # Kilit beklenirken başka bir thread kurmuş olabilir
+        if _runtime is not None and (not auto_reload or index_fingerprint() == _runtime.index_fingerprint):
+            return _runtime
+        old = _runtime
+        if old is not None:
+            log.info("ChromaDB indeksi değişmiş görünüyor, kaynaklar yeniden yükleniyor...")
+        _runtime = build_runtime(previous=old)
+        new = _runtime
+    if old is not None:
+        _retire(old)
+    return new
+
+
+def reload_runtime() -> Runtime:
+    """Kaynakları açıkça yeniden kurar (ör. indeks güncellendikten sonra)."""
+    global _runtime
+    with _lock:
+        log.info("Runtime yeniden yükleniyor...")
+        old, _runtime = _runtime, build_runtime(previous=_runtime)
+        new = _runtime
+    if old is not None:
+        _retire(old)
+    return new
+
+
+def _retire(rt: Runtime):
+    """Yerine yenisi kurulan Runtime'ı, üzerinde süren istekler bitsin diye gecikmeli kapatır."""
+    timer = threading.Timer(config.RUNTIME_CLOSE_GRACE, rt.close)
+    timer.daemon = True
+    timer.start()
@@ -0,0 +1,182 @@
+"""Grafik çalışırken cevap token'larını ve düğüm olaylarını arayüze akıtır.
+
+LangGraph'ın "messages" modu agent düğümlerindeki `ChatOllama.stream`
+token'larını, "updates" modu düğüm geçişlerini, "custom" modu da düğümlerin
+içinden yayılan ara olayları ("3 chunk bulundu" gibi) iletir. deepseek-r1'in
+`<think>` bölümleri cevabın tamamı beklenmeden akış sırasında ayıklanır.
+"""
+import asyncio
+import re
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, Tuple
+
+from haberbot.answer_cache import cache_lookup, cache_store
+from haberbot.telemetry import trace
+
+if TYPE_CHECKING:
+    from haberbot.runtime import Runtime
+
+# Token'ları kullanıcıya akıtılacak düğümler (supervisor'ın sınıflandırma çıktısı gösterilmez)
+ANSWER_NODES = ("resmi_gazete_agent", "general_agent")
+STREAM_MODES = ["updates", "messages", "custom"]
+
+_THINK_RE = re.compile(r"<think>.*?(?:</think>|$)", re.DOTALL)
+
+
+def strip_think(text: str) -> str:
+    """Tam metindeki `<think>...</think>` bölümlerini (kapanmamış olanlar dahil) siler."""
+    return _THINK_RE.sub("", text).strip()
+
+
+def _partial_tag_suffix(text: str, tag: str) -> int:
+    """Metnin sonu etiketin bir ön ekiyle bitiyorsa o ön ekin uzunluğunu döndürür."""
+    for k in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:k]):
+            return k
+    return 0
+
+
+class ThinkFilter:
+    """Parça parça gelen metinden `<think>` bölümlerini ayıklar.
+
+    Sadece bölünmüş olabilecek bir etiket ön eki (ör. "<thi") bekletilir;
+    geri kalan görünür metin hemen döndürülür.
+    """
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self._buffer = ""
+        self._in_think = False
+        self._started = False  # Görünür metnin başındaki boşlukları atmak için
+
+    def feed(self, text: str) -> str:
+        self._buffer += text
+        visible = []
+        while True:
+            tag = self.CLOSE if self._in_think else self.OPEN
+            index = self._buffer.find(tag)
+            if index >= 0:
+                if not self._in_think:
+                    visible.append(self._buffer[:index])
+                self._buffer = self._buffer[index + len(tag):]
+                self._in_think = not self._in_think
+                continue
+            keep = _partial_tag_suffix(self._buffer, tag)
+            if not self._in_think:
+                visible.append(self._buffer[:len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+        return self._emit("".join(visible))
+
+    def flush(self) -> str:
+        rest = "" if self._in_think else self._buffer
+        self._buffer = ""
+        return self._emit(rest)
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+
+def describe_update(node: str, update: dict) -> str | None:
+    """Düğüm güncellemesinden arayüzde gösterilecek kısa bir durum metni üretir."""
+    if node == "supervisor" and update:
+        method = update.get("classification_method")
+        suffix = f" ({method})" if method else ""
+        return f"Sınıflandırıldı: {update.get('classification')}{suffix}"
+    return None
+
+
+def describe_custom(event: dict) -> str | None:
+    """Düğümlerin `get_stream_writer` ile yaydığı olayları metne çevirir."""
+    kind = event.get("event")
+    if kind == "retrieved":
+        return f"{event.get('count', 0)} chunk bulundu"
+    if kind == "news":
+        return f"{event.get('count', 0)} haber bulundu"
+    if kind == "generating":
+        return "Cevap üretiliyor..."
+    return None
+
+
+class _GraphStream:
+    """Grafik akış parçalarını arayüz olaylarına çevirir; senkron ve asenkron akışta ortaktır."""
+
+    def __init__(self, question: str):
+        self.final_state = {"question": question}
+        self.filters = {}
+
+    def handle(self, mode: str, chunk) -> Iterator[Tuple[str, object]]:
+        if mode == "messages":
+            message, metadata = chunk
+            node = metadata.get("langgraph_node")
+            if node not in ANSWER_NODES or not message.content:
+                return
+            text = self.filters.setdefault(node, ThinkFilter()).feed(message.content)
+            if text:
+                yield "token", text
+        elif mode == "updates":
+            for node, update in chunk.items():
+                if update:
+                    self.final_state.update(update)
+                status = describe_update(node, update)
+                if status:
+                    yield "status", status
+        elif mode == "custom":
+            status = describe_custom(chunk) if isinstance(chunk, dict) else None
+            if status:
+                yield "status", status
+
+    def finish(self) -> Iterator[Tuple[str, object]]:
+        for think_filter in self.filters.values():
+            rest = think_filter.flush()
+            if rest:
+                yield "token", rest
+
+
+def stream_answer(rt: "Runtime", question: str, invoke_config: dict = None,
+                  request_id: str = None) -> Iterator[Tuple[str, object]]:
+    """Soruyu çalıştırır ve ("status", str), ("token", str), ("final", dict) olayları üretir.
+
+    Önbellek isabetinde grafik çalıştırılmaz; doğrudan "final" olayı döner.
+    Son olay her zaman nihai durumu (ve isteğin `request_id`'sini) taşıyan "final" olayıdır.
+    """
+    with trace(question, request_id) as current:
+        hit, embedding = cache_lookup(rt, question)
+        if hit is not None:
+            yield "status", f"Önbellekten ({hit['cache_hit']})"
+            yield "final", {**hit, "request_id": current.request_id}
+
+        else:
+            stream = _GraphStream(question)
+            for mode, chunk in rt.app.stream({"question": question}, invoke_config, stream_mode=STREAM_MODES):
+                yield from stream.handle(mode, chunk)
+            yield from stream.finish()
+            cache_store(rt, question, embedding, stream.final_state)
+            yield "final", {**stream.final_state, "request_id": current.request_id}
+
+
+async def astream_answer(rt: "Runtime", question: str, invoke_config: dict = None,
+                         request_id: str = None) -> AsyncIterator[Tuple[str, object]]:
+    """`stream_answer`'ın asenkron sürümü (HTTP API için); grafik `astream` ile çalışır.
+
+    Senkron düğümler LangGraph tarafından thread havuzunda çalıştırılır;
+    önbellek araması ve kaydı da event loop'u bloklamamak için thread'e alınır.
+    """
+    with trace(question, request_id) as current:
+        hit, embedding = await asyncio.to_thread(cache_lookup, rt, question)
+        if hit is not None:
+            yield "status", f"Önbellekten ({hit['cache_hit']})"
+            yield "final", {**hit, "request_id": current.request_id}
+            return
+
+        stream = _GraphStream(question)
+        async for mode, chunk in rt.app.astream({"question": question}, invoke_config, stream_mode=STREAM_MODES):
+            for event in stream.handle(mode, chunk):
+                yield event
+        for event in stream.finish():
+            yield event
+        await asyncio.to_thread(cache_store, rt, question, embedding, stream.final_state)
+        yield "final", {**stream.final_state, "request_id": current.request_id}
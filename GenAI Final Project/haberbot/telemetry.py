@@ -0,0 +1,261 @@
+"""İstek izleri (tracing), Prometheus metrikleri ve istek kimlikli loglama.
+
+Her soru bir `trace` içinde çalışır ve bir istek kimliği (request ID) alır.
+Grafik düğümleri ve dış çağrılar (LLM, embedding, Chroma/BM25 araması,
+NewsData.io) `span` ile sarılır; süreleri, LLM token sayıları, getirilen
+chunk ID'leri ve skorları, önbellek isabetleri ve sınıflandırma yolu izin
+özniteliklerine yazılır. İstek bitince iz `TRACE_PATH`'e (ayarlanmışsa) tek
+satır JSON olarak eklenir; süreler ve sayaçlar süreç içi metrik kayıt
+defterinde birikir ve API'nin `/metrics` ucundan Prometheus metin
+formatında okunur.
+
+İz dosyası `TRACE_MAX_BYTES`'ı aşınca döndürülür (`traces.jsonl.1`, ...);
+en fazla `TRACE_BACKUP_COUNT` eski dosya tutulur.
+
+Maliyet istek başına birkaç `perf_counter` çağrısı, kilitli sayaç artışı ve
+tek bir dosya satırıdır; üretimde açık bırakılabilir.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Optional
+
+from haberbot import config
+
+# Saniye cinsinden histogram sınırları (sınıflandırma ms, üretim onlarca saniye sürebilir)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+HELP = {
+    "haberbot_requests_total": "Tamamlanan istekler (kaynağa göre)",
+    "haberbot_request_seconds": "Uçtan uca istek süresi",
+    "haberbot_span_seconds": "Düğüm ve dış çağrı süreleri",
+    "haberbot_span_errors_total": "Hata ile biten düğüm/dış çağrılar",
+    "haberbot_route_total": "Supervisor yönlendirmeleri (sınıf ve yönteme göre)",
+    "haberbot_answer_cache_total": "Cevap önbelleği aramaları (sonuca göre)",
+    "haberbot_query_embedding_cache_total": "Soru embedding önbelleği aramaları",
+    "haberbot_llm_tokens_total": "LLM token sayıları (Ollama yanıt metadatasından)",
+    "haberbot_llm_first_token_seconds": "LLM ilk token gecikmesi (modele göre)",
+    "haberbot_llm_load_seconds": "Ollama'nın model yükleme süresi (soğuk başlangıç; yanıt metadatasından)",
+    "haberbot_queue_wait_seconds": "Ollama sınırlayıcı kuyruğunda bekleme",
+    "haberbot_retrieved_chunks_total": "Getirilen chunk sayısı",
+    "haberbot_news_requests_total": "NewsData.io aramaları (sonuca göre)",
+}
+
+
+class Metrics:
+    """Thread-safe sayaç ve histogram kayıt defteri; Prometheus metin formatına çevrilir."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}    # (ad, etiketler) -> değer
+        self._histograms = {}  # (ad, etiketler) -> [kova sayıları, toplam, adet]
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+            hist[0][bisect_left(BUCKETS, value)] += 1
+            hist[1] += value
+            hist[2] += 1
+
+    def render(self) -> str:
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ") for _, v in items)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._histograms.items())
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} counter"]
+            lines.append(f"{name}{fmt(labels)} {value:g}")
+        for (name, labels), (buckets, total, count) in histograms:
+            if name not in seen:
+                seen.add(name)
+                lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} histogram"]
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS + (float("inf"),), buckets):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{name}_bucket{fmt(labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{fmt(labels)} {total:g}")
+            lines.append(f"{name}_count{fmt(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class Trace:
+    """Tek bir isteğin izi: span listesi ve istek düzeyindeki öznitelikler."""
+
+    def __init__(self, question: str, request_id: str = None):
+        self.request_id = request_id or uuid.uuid4().hex[:16]
+        self.question = question
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.spans = []
+        self.attrs = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, start: float, seconds: float, attrs: dict):
+        with self._lock:
+            self.spans.append({"name": name, "start_ms": round((start - self._t0) * 1000, 2),
+                               "duration_ms": round(seconds * 1000, 2), **attrs})
+
+    def to_dict(self, seconds: float) -> dict:
+        with self._lock:
+            return {"request_id": self.request_id, "ts": self.started_at, "question": self.question,
+                    "duration_ms": round(seconds * 1000, 2), **self.attrs,
+                    "spans": sorted(self.spans, key=lambda s: s["start_ms"])}
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("haberbot_trace", default=None)
+_trace_handler = None
+_trace_lock = threading.Lock()
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def request_id() -> Optional[str]:
+    trace = _current.get()
+    return trace.request_id if trace is not None else None
+
+
+def annotate(**attrs):
+    """Aktif isteğin izine öznitelik ekler (iz yoksa sessizce atlanır)."""
+    trace = _current.get()
+    if trace is not None:
+        with trace._lock:
+            trace.attrs.update(attrs)
+
+
+def _write_trace(record: dict):
+    global _trace_handler
+    if not config.TRACE_PATH:
+        return
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _trace_lock:
+        if _trace_handler is None or _trace_handler.baseFilename != os.path.abspath(config.TRACE_PATH):
+            if _trace_handler is not None:
+                _trace_handler.close()
+            # Boyut sınırında döndürülür; uzun süre çalışan serviste disk dolmaz
+            _trace_handler = RotatingFileHandler(config.TRACE_PATH, maxBytes=config.TRACE_MAX_BYTES,
+                                                 backupCount=config.TRACE_BACKUP_COUNT, encoding="utf-8")
+        _trace_handler.handle(logging.makeLogRecord({"msg": line}))
+
+
+@contextmanager
+def trace(question: str, request_id: str = None):
+    """Bir isteği izler; bitince metrikleri günceller ve izi JSONL dosyasına yazar."""
+    current = Trace(question, request_id)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attrs.setdefault("error", f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        try:
+            _current.reset(token)
+        except ValueError:
+            pass # Akış üreteci farklı bir bağlamda kapatıldıysa
+        seconds = time.perf_counter() - current._t0
+        source = current.attrs.get("source") or "Bilinmiyor"
+        metrics.inc("haberbot_requests_total", source=source)
+        metrics.observe("haberbot_request_seconds", seconds, source=source)
+        try:
+            _write_trace(current.to_dict(seconds))
+        except OSError as e:
+            log.warning(f"İz dosyasına yazılamadı: {e}")
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Bir düğümü veya dış çağrıyı ölçer; blok içinde dönen sözlüğe öznitelik eklenebilir."""
+    data = dict(attrs)
+    t0 = time.perf_counter()
+    try:
+        yield data
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            data["error"] = type(e).__name__
+            metrics.inc("haberbot_span_errors_total", span=name)
+        raise
+    finally:
+        seconds = time.perf_counter() - t0
+        metrics.observe("haberbot_span_seconds", seconds, span=name)
+        trace = _current.get()
+        if trace is not None:
+            trace.add_span(name, t0, seconds, data)
+
+
+def traced(name: str, fn):
+    """`fn`'i bir span içinde çalıştıran sarmalayıcı döndürür."""
+    def run(*args, **kwargs):
+        with span(name):
+            return fn(*args, **kwargs)
+    return run
+
+
+def record_llm_usage(attrs: dict, message) -> None:
+    """Ollama yanıt metadatasındaki token sayılarını span'e ve metriklere ekler."""
+    meta = getattr(message, "response_metadata", None) or {}
+    usage = getattr(message, "usage_metadata", None) or {}
+    prompt_tokens = meta.get("prompt_eval_count", usage.get("input_tokens"))
+    completion_tokens = meta.get("eval_count", usage.get("output_tokens"))
+    if prompt_tokens is not None:
+        attrs["prompt_tokens"] = prompt_tokens
+        metrics.inc("haberbot_llm_tokens_total", prompt_tokens, kind="prompt")
+    if completion_tokens is not None:
+        attrs["completion_tokens"] = completion_tokens
+        metrics.inc("haberbot_llm_tokens_total", completion_tokens, kind="completion")
+    load_ns = meta.get("load_duration")
+    if load_ns is not None:
+        # Sıcak modelde birkaç ms; saniyeler sürüyorsa model bu istekte yüklenmiştir
+        attrs["load_ms"] = round(load_ns / 1e6, 2)
+        metrics.observe("haberbot_llm_load_seconds", load_ns / 1e9, model=meta.get("model", "?"))
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id() or "-"
+        return True
+
+
+def _make_logger() -> logging.Logger:
+    logger = logging.getLogger("haberbot")
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.addFilter(_RequestIdFilter())
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(config.LOG_LEVEL)
+        logger.propagate = False
+    return logger
+
+
+log = _make_logger()
@@ -0,0 +1,472 @@
+"""Chroma koleksiyonunun mmap ile açılan sıkıştırılmış vektör kopyası (cold start için).
+
+Uygulama açılışta `Chroma(persist_directory=...)` ile sqlite + HNSW indeksini
+belleğe yükler; bu hem açılışı yavaşlatır hem de her worker'da ayrı bir kopya
+tutar. Bu modül bge-m3 vektörlerini `chroma_db/vectors/` altına dışa aktarır:
+- Vektörler float16 veya int8 (satır başına ölçekle) `.npy` matrisi olarak
+  yazılır; `np.load(mmap_mode="r")` ile açıldığı için
+  yükleme süresi neredeyse sıfırdır ve aynı makinedeki worker'lar işletim
+  sisteminin sayfa önbelleğini paylaşır,
+- Chunk ID'leri, metinleri ve metadata'sı yan dosyalarda tutulur
+  (`ids.bin` + ofsetler ve ID sırasına göre dizilmiş satır numaraları,
+  `documents.jsonl` + satır ofsetleri); hepsi mmap ile açılır, ID -> satır
+  araması ikili aramadır ve worker başına ID sözlüğü kurulmaz,
+- Arama NumPy ile blok blok kosinüs benzerliği + top-k'dır. Büyük
+  korpuslarda (`VECTOR_IVF_MIN_DOCS` üstü) vektörler k-means ile bölümlere
+  ayrılır (IVF) ve sorgu sadece en yakın `VECTOR_IVF_NPROBE` bölümde aranır,
+- Filtre alanları (`date`, `issue`, `doc_type`, bkz. `haberbot.metadata`)
+  ayrıca sütun dizileri olarak yazılır; Chroma `where` filtresi bu
+  sütunlarla maskeye çevrilir ve sadece filtreyi sağlayan satırlar taranır.
+
+`VectorIndex`, `HybridRetriever`'ın kullandığı Chroma koleksiyonu
+metotlarının (`count`, `get`, `query`) bir alt kümesini sunar; böylece
+`VECTOR_BACKEND=mmap` ile retriever arayüzü değişmeden Chroma yerine bu indeks
+kullanılır. Notebook koleksiyonu varsayılan L2 uzaklığıyla kurmuştu; kosinüs
+sıralaması L2 ile ancak koleksiyondaki vektörler birim uzunluktaysa aynıdır.
+Bu yüzden dışa aktarma her satırın normunu kontrol eder ve normalize
+edilmemiş (ör. eski ingest'le karışmış) bir koleksiyonu reddeder.
+
+Kullanım:
+    python -m haberbot.vectors export [--dtype float16|int8] [--ivf auto|on|off]
+    python -m haberbot.vectors compare [--queries 200]   # Chroma'ya karşı recall/gecikme
+"""
+import argparse
+import json
+import mmap
+import os
+import shutil
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from haberbot import config
+from haberbot.metadata import FILTER_FIELDS, where_mask
+
+BLOCK_ROWS = 8192 # Arama ve dışa aktarmada tek seferde float32'ye çevrilen satır sayısı
+DTYPES = ("float16", "int8")
+NORM_TOLERANCE = 1e-3 # Dışa aktarılan satırların ‖v‖ değerinin 1'den en fazla sapması
+
+
+def index_dir(chroma_path: str = None) -> str:
+    return os.path.join(chroma_path or config.CHROMA_DB_PATH, config.VECTOR_DIR_NAME)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Birim vektörleri `dtype`'a çevirir; int8 için satır başına ölçekleri de döndürür."""
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def _kmeans(sample: np.ndarray, n_lists: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Küresel k-means: merkezler birim uzunlukta tutulur, atama kosinüs benzerliğiyle yapılır."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(n_lists):
+            members = sample[assign == c]
+            # Boş kalan bölüme rastgele bir örnek atanır
+            centroids[c] = members.sum(axis=0) if len(members) else sample[rng.integers(len(sample))]
+        centroids = _normalize(centroids)
+    return centroids
+
+
+def _iter_collection(collection, page_size: int = 1000, check_norms: bool = False):
+    """Chroma koleksiyonundaki (id, metin, metadata, embedding) dörtlülerini sayfa sayfa üretir.
+
+    `check_norms` ile birim uzunlukta olmayan bir vektör görülürse RuntimeError verir.
+    """
+    offset = 0
+    while True:
+        page = collection.get(include=["documents", "metadatas", "embeddings"], limit=page_size, offset=offset)
+        if not len(page["ids"]):
+            return
+        vecs = np.asarray(page["embeddings"], dtype=np.float32)
+        if check_norms:
+            norms = np.linalg.norm(vecs, axis=1)
+            bad = np.flatnonzero(np.abs(norms - 1.0) > NORM_TOLERANCE)
+            if len(bad):
+                raise RuntimeError(
+                    f"HATA: Koleksiyonda birim uzunlukta olmayan vektörler var (ör. {page['ids'][bad[0]]}, "
+                    f"‖v‖={norms[bad[0]]:.4f}; {len(bad)}/{len(vecs)} satır). Kosinüs araması Chroma'nın L2 "
+                    f"sıralamasıyla uyuşmaz; koleksiyonu python -m haberbot.ingest ile yeniden oluşturun.")
+        yield page["ids"], page["documents"], page["metadatas"], _normalize(vecs)
+        offset += len(page["ids"])
+
+
+def export_collection(collection, chroma_path: str = None, dtype: str = None, ivf: str = "auto") -> dict:
+    """Koleksiyonu `chroma_db/vectors/`'e yazar.
+
+    Tepe bellek sayfa boyutuyla sınırlıdır: vektörler doğrudan diskteki
+    `.npy` matrisine yazılır. IVF açıksa k-means bir örneklem üzerinde
+    eğitilir ve satırlar bölüm sırasına göre yeniden dizilir; böylece her
+    bölüm diskte bitişik durur. Önce geçici klasöre yazılır, sonra eski
+    indeksin yerine taşınır (çalışan uygulama yarım bir indeks okumaz).
+    """
+    t0 = time.perf_counter()
+    dtype = dtype or config.VECTOR_DTYPE
+    if dtype not in DTYPES:
+        raise ValueError(f"Desteklenmeyen vektör tipi: {dtype} (seçenekler: {', '.join(DTYPES)})")
+    out_dir = index_dir(chroma_path)
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    path = lambda name: os.path.join(tmp_dir, name)
+
+    total = collection.count()
+    ids, offsets, dim, vectors, scales, row = [], [0], None, None, None, 0
+    # Sayısal alanlar float (eksik: NaN), metin alanları sözlük kodu (eksik: -1) olarak tutulur
+    columns = {field: np.full(total, np.nan) if kind is int else np.full(total, -1, dtype=np.int32)
+               for field, kind in FILTER_FIELDS.items()}
+    vocab = {field: {} for field, kind in FILTER_FIELDS.items() if kind is str}
+    with open(path("documents.jsonl"), "wb") as docs_file:
+        for page_ids, page_docs, page_metas, page_vecs in _iter_collection(collection, check_norms=True):
+            if vectors is None:
+                dim = page_vecs.shape[1]
+                vectors = np.lib.format.open_memmap(path("vectors.npy"), mode="w+",
+                                                    dtype=np.dtype(dtype), shape=(total, dim))
+                scales = np.empty(total, dtype=np.float32)
+            quantized, page_scales = quantize(page_vecs, dtype)
+            vectors[row:row + len(page_ids)] = quantized
+            if page_scales is not None:
+                scales[row:row + len(page_ids)] = page_scales
+            for j, metadata in enumerate(page_metas):
+                for field, value in (metadata or {}).items():
+                    if field in vocab:
+                        columns[field][row + j] = vocab[field].setdefault(value, len(vocab[field]))
+                    elif field in columns:
+                        columns[field][row + j] = value
+            row += len(page_ids)
+            for chunk_id, text, metadata in zip(page_ids, page_docs, page_metas):
+                line = json.dumps({"id": chunk_id, "document": text, "metadata": metadata or {}},
+                                  ensure_ascii=False).encode("utf-8") + b"\n"
+                docs_file.write(line)
+                offsets.append(offsets[-1] + len(line))
+                ids.append(chunk_id)
+    if vectors is None: # Boş koleksiyon
+        dim = 0
+        vectors = np.lib.format.open_memmap(path("vectors.npy"), mode="w+", dtype=np.dtype(dtype), shape=(0, 0))
+        scales = np.empty(0, dtype=np.float32)
+    vectors.flush()
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    use_ivf = ivf == "on" or (ivf == "auto" and len(ids) >= config.VECTOR_IVF_MIN_DOCS)
+    n_lists = 0
+    if use_ivf and len(ids) > 1:
+        n_lists = min(max(int(4 * np.sqrt(len(ids))), 2), len(ids))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(len(ids), min(len(ids), n_lists * 64), replace=False))
+        sample = _dequantize(vectors[sample_rows], scales[sample_rows] if dtype == "int8" else None)
+        centroids = _kmeans(sample, n_lists)
+        assign = np.concatenate([np.argmax(_dequantize(vectors[s:s + BLOCK_ROWS], scales[s:s + BLOCK_ROWS]
+                                                       if dtype == "int8" else None) @ centroids.T, axis=1)
+                                 for s in range(0, len(ids), BLOCK_ROWS)])
+        order = np.argsort(assign, kind="stable")
+        list_offsets = np.searchsorted(assign[order], np.arange(n_lists + 1)).astype(np.int64)
+
+        # Satırları bölüm sırasına göre yeniden yaz
+        reordered = np.lib.format.open_memmap(path("vectors.ivf.npy"), mode="w+", dtype=vectors.dtype,
+                                              shape=vectors.shape)
+        for s in range(0, len(ids), BLOCK_ROWS):
+            reordered[s:s + BLOCK_ROWS] = vectors[order[s:s + BLOCK_ROWS]]
+        reordered.flush()
+        del vectors, reordered
+        os.replace(path("vectors.ivf.npy"), path("vectors.npy"))
+        scales = scales[order]
+        columns = {field: values[order] for field, values in columns.items()}
+        ids = [ids[i] for i in order]
+        # Metinler yerinde kalır; satır -> (başlangıç, bitiş) ofsetleri yeniden dizilir
+        offsets = np.stack([offsets[:-1][order], offsets[1:][order]], axis=1)
+        np.save(path("centroids.npy"), centroids.astype(np.float32))
+        np.save(path("list_offsets.npy"), list_offsets)
+    else:
+        del vectors
+        offsets = np.stack([offsets[:-1], offsets[1:]], axis=1)
+
+    np.save(path("doc_offsets.npy"), offsets)
+    for field, values in columns.items():
+        np.save(path(f"filter_{field}.npy"), values)
+    if dtype == "int8":
+        np.save(path("scales.npy"), scales)
+    # ID'ler satır sırasıyla tek bir bayt dosyasında; ikili arama için bayt sırasına göre satır numaraları
+    encoded = [chunk_id.encode("utf-8") for chunk_id in ids]
+    with open(path("ids.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(path("id_offsets.npy"), np.concatenate([[0], np.cumsum([len(e) for e in encoded])]).astype(np.int64))
+    np.save(path("id_order.npy"), np.asarray(sorted(range(len(encoded)), key=encoded.__getitem__), dtype=np.int64))
+    del encoded
+    meta = {"documents": len(ids), "dim": int(dim), "dtype": dtype, "metric": "cosine", "lists": n_lists,
+            "collection": config.CHROMA_COLLECTION_NAME,
+            "filter_vocab": {field: list(values) for field, values in vocab.items()}}
+    with open(path("meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    size_mb = sum(os.path.getsize(os.path.join(out_dir, f)) for f in os.listdir(out_dir)) / 2**20
+    print(f"Vektör indeksi dışa aktarıldı: {meta['documents']} chunk, {dim} boyut, {dtype}, "
+          f"{'IVF ' + str(n_lists) + ' bölüm' if n_lists else 'tam arama'}, {size_mb:.1f} MB "
+          f"({time.perf_counter() - t0:.1f} s)")
+    return meta
+
+
+def _dequantize(block: np.ndarray, scales: np.ndarray = None) -> np.ndarray:
+    block = np.asarray(block, dtype=np.float32)
+    return block * scales[:, None] if scales is not None else block
+
+
+class VectorIndex:
+    """Dışa aktarılmış vektör indeksini mmap ile açar; Chroma koleksiyonu gibi sorgulanabilir."""
+
+    def __init__(self, path: str, nprobe: int = None):
+        self.path = path
+        self.nprobe = nprobe or config.VECTOR_IVF_NPROBE
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.id_offsets = load("id_offsets.npy")
+        self.id_order = load("id_order.npy")
+        self._ids_file = open(os.path.join(path, "ids.bin"), "rb")
+        self._ids = mmap.mmap(self._ids_file.fileno(), 0, access=mmap.ACCESS_READ) if self.meta["documents"] else b""
+        self.vectors = load("vectors.npy")
+        self.scales = load("scales.npy") if self.meta["dtype"] == "int8" else None
+        self.doc_offsets = load("doc_offsets.npy")
+        self.centroids = np.load(os.path.join(path, "centroids.npy")) if self.meta["lists"] else None
+        self.list_offsets = np.load(os.path.join(path, "list_offsets.npy")) if self.meta["lists"] else None
+        self._docs_file = open(os.path.join(path, "documents.jsonl"), "rb")
+        self._docs = mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ) if self.count() else b""
+        self._columns = {}
+
+    @classmethod
+    def open(cls, chroma_path: str = None):
+        """İndeks varsa açar, yoksa None döndürür."""
+        path = index_dir(chroma_path)
+        # ids.bin olmayan eski biçimli indeks yok sayılır; ingest/export yeniden yazar
+        if not os.path.exists(os.path.join(path, "meta.json")) or not os.path.exists(os.path.join(path, "ids.bin")):
+            return None
+        return cls(path)
+
+    def count(self) -> int:
+        return self.meta["documents"]
+
+    def _id_bytes(self, row: int) -> bytes:
+        return self._ids[int(self.id_offsets[row]):int(self.id_offsets[row + 1])]
+
+    def chunk_id(self, row: int) -> str:
+        return self._id_bytes(row).decode("utf-8")
+
+    def row_of(self, chunk_id: str):
+        """Chunk ID'sinin satırı (yoksa None); `id_order` üzerinde ikili arama."""
+        key, lo, hi = chunk_id.encode("utf-8"), 0, self.count()
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._id_bytes(int(self.id_order[mid])) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count() and self._id_bytes(int(self.id_order[lo])) == key:
+            return int(self.id_order[lo])
+        return None
+
+    def _score_rows(self, query: np.ndarray, start: int, end: int) -> np.ndarray:
+        scores = np.empty(end - start, dtype=np.float32)
+        for s in range(start, end, BLOCK_ROWS):
+            e = min(s + BLOCK_ROWS, end)
+            block = np.asarray(self.vectors[s:e], dtype=np.float32)
+            scores[s - start:e - start] = block @ query
+            if self.scales is not None:
+                scores[s - start:e - start] *= self.scales[s:e]
+        return scores
+
+    def _score_selected(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(rows), dtype=np.float32)
+        for s in range(0, len(rows), BLOCK_ROWS):
+            block_rows = rows[s:s + BLOCK_ROWS]
+            scores[s:s + len(block_rows)] = np.asarray(self.vectors[block_rows], dtype=np.float32) @ query
+            if self.scales is not None:
+                scores[s:s + len(block_rows)] *= self.scales[block_rows]
+        return scores
+
+    def column(self, field: str) -> np.ndarray:
+        """Metadata alanının satır başına değerleri; sütun dosyası yoksa kayıtlardan bir kez okunur."""
+        if field not in self._columns:
+            path = os.path.join(self.path, f"filter_{field}.npy")
+            vocab = self.meta.get("filter_vocab", {}).get(field)
+            if os.path.exists(path):
+                values = np.load(path)
+                if vocab is not None:
+                    values = np.asarray(vocab + [None], dtype=object)[values] # -1 -> None
+            else:
+                values = np.asarray([self.record(row)["metadata"].get(field) for row in range(self.count())],
+                                    dtype=object)
+            self._columns[field] = values
+        return self._columns[field]
+
+    def filter_mask(self, where: dict) -> np.ndarray:
+        """Chroma `where` filtresini satır maskesine çevirir."""
+        return where_mask(where, self.column, self.count())
+
+    def search(self, embedding, k: int, where: dict = None) -> List[Tuple[int, float]]:
+        """Kosinüs benzerliğine göre en iyi `k` (satır, skor) çiftini döndürür.
+
+        `where` verilirse sadece filtreyi sağlayan satırlar taranır (IVF'siz, tam arama).
+        """
+        if not self.count() or k <= 0:
+            return []
+        query = _normalize(embedding)
+        if where:
+            rows = np.flatnonzero(self.filter_mask(where))
+            scores = self._score_selected(query, rows)
+        else:
+            if self.centroids is None:
+                ranges = [(0, self.count())]
+            else:
+                lists = np.argsort(self.centroids @ query)[::-1][:self.nprobe]
+                ranges = [(int(self.list_offsets[c]), int(self.list_offsets[c + 1])) for c in lists]
+            rows = np.concatenate([np.arange(s, e) for s, e in ranges])
+            scores = np.concatenate([self._score_rows(query, s, e) for s, e in ranges])
+        if len(scores) > k:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def record(self, row: int) -> dict:
+        start, end = self.doc_offsets[row]
+        return json.loads(self._docs[int(start):int(end)])
+
+    # --- Chroma koleksiyonu uyumlu alt küme (HybridRetriever bunları kullanır) ---
+
+    def get(self, ids: List[str] = None, include=None, where: dict = None, **kwargs) -> Dict[str, list]:
+        if ids is not None:
+            rows = [row for row in map(self.row_of, ids) if row is not None]
+        else:
+            rows = range(self.count())
+        if where:
+            mask = self.filter_mask(where)
+            rows = [row for row in rows if mask[row]]
+        records = [self.record(row) for row in rows]
+        return {"ids": [r["id"] for r in records], "documents": [r["document"] for r in records],
+                "metadatas": [r["metadata"] for r in records]}
+
+    def query(self, query_embeddings, n_results: int = 10, include=None, where: dict = None,
+              **kwargs) -> Dict[str, list]:
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for embedding in query_embeddings:
+            hits = self.search(embedding, n_results, where)
+            records = [self.record(row) for row, _ in hits]
+            result["ids"].append([r["id"] for r in records])
+            result["documents"].append([r["document"] for r in records])
+            result["metadatas"].append([r["metadata"] for r in records])
+            # Chroma'nın L2 (kare) uzaklığı; birim vektörlerde 2 - 2 * kosinüs
+            result["distances"].append([2.0 - 2.0 * score for _, score in hits])
+        return result
+
+
+class VectorRetriever(BaseRetriever):
+    """`VectorIndex` üzerinde kosinüs araması; `vectorstore.as_retriever` yerine geçer."""
+    index: object
+    embeddings: object
+    k: int = 3
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                filter: dict = None) -> List[Document]:
+        return self._documents(self.index.search(self.embeddings.embed_query(query), self.k, filter))
+
+    def _documents(self, hits) -> List[Document]:
+        docs = []
+        for row, score in hits:
+            record = self.index.record(row)
+            docs.append(Document(page_content=record["document"], metadata={**record["metadata"], "score": score},
+                                 id=record["id"]))
+        return docs
+
+    def search_batch(self, queries: List[str], embeddings: List[List[float]], filter: dict = None) -> List[List[Document]]:
+        """Önceden hesaplanmış embedding'lerle arar (toplu değerlendirme; arama zaten bellekte, Chroma yok)."""
+        return [self._documents(self.index.search(embedding, self.k, filter)) for embedding in embeddings]
+
+
+def compare(collection, index: VectorIndex, n_queries: int = 200, k: int = 10, noise: float = 0.05,
+            seed: int = 0) -> dict:
+    """Dışa aktarılan indeksi Chroma'nın HNSW aramasıyla karşılaştırır (recall@k ve sorgu gecikmesi).
+
+    Sorgular koleksiyondaki vektörlere küçük gürültü eklenerek üretilir
+    (Ollama gerekmez). Doğru cevap float32 vektörler üzerinde tam kosinüs
+    aramasıdır; hem Chroma hem mmap indeksi buna göre ölçülür.
+    """
+    rng = np.random.default_rng(seed)
+    all_ids, all_vecs = [], []
+    for page_ids, _, _, page_vecs in _iter_collection(collection):
+        all_ids += page_ids
+        all_vecs.append(page_vecs)
+    exact = np.concatenate(all_vecs) if all_vecs else np.empty((0, 0), dtype=np.float32)
+    picks = rng.choice(len(all_ids), min(n_queries, len(all_ids)), replace=False)
+    queries = _normalize(exact[picks] + rng.normal(0, noise, (len(picks), exact.shape[1])).astype(np.float32))
+
+    def measure(search) -> dict:
+        recalls, latencies = [], []
+        for query in queries:
+            truth = {all_ids[i] for i in np.argsort(exact @ query)[::-1][:k]}
+            t0 = time.perf_counter()
+            found = search(query)
+            latencies.append(time.perf_counter() - t0)
+            recalls.append(len(truth & set(found)) / len(truth))
+        return {"recall_at_k": float(np.mean(recalls)), "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                "p95_ms": float(np.percentile(latencies, 95) * 1000)}
+
+    return {
+        "queries": len(queries), "k": k, "documents": len(all_ids), "dtype": index.meta["dtype"],
+        "lists": index.meta["lists"],
+        "chroma": measure(lambda q: collection.query(query_embeddings=[q.tolist()], n_results=k,
+                                                     include=[])["ids"][0]),
+        "mmap": measure(lambda q: [index.chunk_id(row) for row, _ in index.search(q, k)]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chroma vektörlerini mmap indeksine aktarır ve karşılaştırır.")
+    parser.add_argument("command", choices=["export", "compare"])
+    parser.add_argument("--chroma-path", default=config.CHROMA_DB_PATH)
+    parser.add_argument("--dtype", choices=DTYPES, default=config.VECTOR_DTYPE)
+    parser.add_argument("--ivf", choices=["auto", "on", "off"], default="auto",
+                        help=f"IVF bölümleme (auto: {config.VECTOR_IVF_MIN_DOCS}+ chunk için açık)")
+    parser.add_argument("--queries", type=int, default=200, help="compare: sorgu sayısı")
+    parser.add_argument("--k", type=int, default=10, help="compare: recall@k")
+    args = parser.parse_args()
+
+    import chromadb
+    client = chromadb.PersistentClient(path=args.chroma_path)
+    collection = client.get_collection(name=config.CHROMA_COLLECTION_NAME)
+    if args.command == "export":
+        export_collection(collection, args.chroma_path, args.dtype, args.ivf)
+        return
+
+    t0 = time.perf_counter()
+    index = VectorIndex.open(args.chroma_path)
+    if index is None:
+        raise SystemExit("Vektör indeksi bulunamadı; önce: python -m haberbot.vectors export")
+    load_ms = (time.perf_counter() - t0) * 1000
+    report = compare(collection, index, args.queries, args.k)
+    print(f"{report['documents']} chunk, {report['queries']} sorgu, recall@{report['k']} "
+          f"(mmap: {report['dtype']}, {'IVF ' + str(report['lists']) + ' bölüm' if report['lists'] else 'tam arama'}, "
+          f"açılış {load_ms:.1f} ms)")
+    for name in ("chroma", "mmap"):
+        r = report[name]
+        print(f"   {name:>6}: recall {r['recall_at_k']:.3f} | p50 {r['p50_ms']:.2f} ms | p95 {r['p95_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
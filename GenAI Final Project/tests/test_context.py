@@ -0,0 +1,83 @@
+"""`merge_adjacent` ve `assemble_context` testleri: komşu chunk birleştirme ve token bütçesi kırpması.
+
+Hesaplar kolay takip edilsin diye bir token bir karakter sayılır
+(`CONTEXT_CHARS_PER_TOKEN = 1`).
+"""
+import pytest
+from langchain_core.documents import Document
+
+from haberbot import config
+from haberbot.context import MIN_TRUNCATED_TOKENS, assemble_context, merge_adjacent
+
+TEXT = " ".join(f"kelime{i}" for i in range(120)) # ~1000 karakterlik kaynak metin
+
+
+def chunk(source, start, size=300, **metadata):
+    return Document(page_content=TEXT[start:start + size], metadata={"source": source, **metadata})
+
+
+@pytest.fixture(autouse=True)
+def one_char_per_token(monkeypatch):
+    monkeypatch.setattr(config, "CONTEXT_CHARS_PER_TOKEN", 1.0)
+
+
+def test_overlapping_chunks_merge_by_start_index():
+    # Retrieval sırası dosyadaki sıradan farklı; örtüşen kısım bir kez yazılmalı
+    docs = [chunk("a.txt", 250, start_index=250), chunk("a.txt", 0, start_index=0), chunk("a.txt", 500, start_index=500)]
+    [passage] = merge_adjacent(docs)
+    assert passage.text == TEXT[:800]
+    assert passage.rank == 0 and passage.chunks == 3
+
+
+def test_distant_chunks_and_sources_stay_separate_in_retrieval_order():
+    docs = [chunk("b.txt", 50, start_index=0), chunk("a.txt", 600, start_index=600), chunk("a.txt", 0, start_index=0)]
+    passages = merge_adjacent(docs)
+    assert [p.rank for p in passages] == [0, 1, 2]
+    assert [p.chunks for p in passages] == [1, 1, 1]
+
+
+def test_chunks_without_offsets_merge_by_text_only_when_consecutive():
+    docs = [chunk("a.txt", 0, chunk_index=0), chunk("a.txt", 250, chunk_index=1), chunk("a.txt", 500, chunk_index=5)]
+    passages = merge_adjacent(docs)
+    # 0 ile 1 örtüşüyor ve ardışık; 5 örtüşse de ardışık değil
+    assert [p.text for p in passages] == [TEXT[:550], TEXT[500:800]]
+
+
+def test_identical_texts_are_dropped():
+    docs = [chunk("a.txt", 0, start_index=0), chunk("kopya.txt", 0, start_index=0)]
+    assert len(merge_adjacent(docs)) == 1
+
+
+def test_everything_fits_within_budget():
+    docs = [chunk("a.txt", 0, start_index=0), chunk("b.txt", 0, size=100, start_index=0)]
+    context = assemble_context(docs, token_budget=1000)
+    separator = len(config.CONTEXT_SEPARATOR)
+    assert context.passages == [TEXT[:300], TEXT[:100]]
+    assert context.tokens_out == 300 + separator + 100
+    assert context.tokens_saved == 0
+
+
+def test_last_passage_is_cut_on_a_word_boundary():
+    docs = [chunk("a.txt", 0, start_index=0), chunk("b.txt", 500, start_index=0)]
+    budget = 300 + len(config.CONTEXT_SEPARATOR) + MIN_TRUNCATED_TOKENS + 10
+    context = assemble_context(docs, token_budget=budget)
+    assert len(context.passages) == 2
+    cut = context.passages[1]
+    assert TEXT[500:].startswith(cut) and len(cut) <= MIN_TRUNCATED_TOKENS + 10
+    assert TEXT[500 + len(cut)] == " " # kelime ortasından kesilmedi
+    assert context.tokens_out <= budget
+
+
+def test_too_short_remainder_is_not_added():
+    docs = [chunk("a.txt", 0, start_index=0), chunk("b.txt", 500, start_index=0)]
+    budget = 300 + len(config.CONTEXT_SEPARATOR) + MIN_TRUNCATED_TOKENS - 1
+    context = assemble_context(docs, token_budget=budget)
+    assert context.passages == [TEXT[:300]]
+    assert context.tokens_out == 300
+
+
+def test_first_passage_is_always_included_even_over_budget():
+    context = assemble_context([chunk("a.txt", 0, start_index=0)], token_budget=20)
+    assert len(context.passages) == 1
+    assert 0 < len(context.passages[0]) <= 20
+    assert context.tokens_in == 300 and context.tokens_saved == 300 - context.tokens_out
@@ -0,0 +1,95 @@
+"""`DedupIndex` testleri: filtre kapsamı, yarıda kalan ingest'e devam ve zincirleme `release`.
+
+İndeks geçici klasördeki bir SQLite dosyasında tutulur; devam senaryosu
+için kapatılıp yeniden açılır.
+"""
+import pytest
+
+from haberbot.dedup import DedupIndex
+
+# ~150 kelimelik ilan metni; tek kelime farkı tahmini Jaccard'ı eşiğin üstünde bırakır
+NOTICE = " ".join(f"Taşınmaz {i} numaralı parsel kiralama ihalesi ile satılacaktır." for i in range(25))
+OTHER = " ".join(f"Öğretim üyesi {i} kadrosuna başvuru şartları belirlenmiştir." for i in range(25))
+MARCH = {"date": 20240312, "issue": 32456, "doc_type": "İlan"}
+APRIL = {"date": 20240402, "issue": 32477, "doc_type": "İlan"}
+
+
+def meta(source, scope=MARCH):
+    return {"source": source, **scope}
+
+
+@pytest.fixture
+def index(tmp_path):
+    dedup = DedupIndex(str(tmp_path / "dedup.sqlite3"))
+    yield dedup
+    dedup.close()
+
+
+def test_exact_duplicate_case_and_punctuation_insensitive(index):
+    decisions = index.assign([
+        ("a_0", NOTICE, meta("a.txt")),
+        # Türkçe büyük harf: i -> İ (Python'un upper'ı I yapar)
+        ("b_0", NOTICE.replace("i", "İ").upper().replace(".", " ;"), meta("b.txt")),
+    ])
+    assert decisions == [(None, "unique"), ("a_0", "exact")]
+    assert index.canonical_of("b_0")["canonical"] == "a_0"
+
+
+def test_near_duplicate(index):
+    decisions = index.assign([
+        ("a_0", NOTICE, meta("a.txt")),
+        ("b_0", NOTICE.replace("kiralama", "satış", 1), meta("b.txt")),
+        ("c_0", OTHER, meta("c.txt")),
+    ])
+    assert decisions[1] == ("a_0", "near")
+    assert decisions[2] == (None, "unique")
+    assert [d["id"] for d in index.duplicates_of("a_0")] == ["b_0"]
+
+
+def test_copies_in_another_scope_are_kept(index):
+    # Aynı ilan başka bir gün/sayıda yayımlanmışsa o tarihle filtrelenen arama onu bulmalı
+    decisions = index.assign([
+        ("a_0", NOTICE, meta("a.txt", MARCH)),
+        ("b_0", NOTICE, meta("b.txt", APRIL)),
+        ("c_0", NOTICE.replace("kiralama", "satış", 1), meta("c.txt", APRIL)),
+    ])
+    assert decisions == [(None, "unique"), (None, "unique"), ("b_0", "near")]
+
+
+def test_resumed_ingest_gets_the_same_decisions(tmp_path):
+    path = str(tmp_path / "dedup.sqlite3")
+    chunks = [("a_0", NOTICE, meta("a.txt")), ("b_0", NOTICE, meta("b.txt")), ("c_0", OTHER, meta("c.txt"))]
+    first = DedupIndex(path)
+    decisions = first.assign(chunks)
+    first.close()
+
+    resumed = DedupIndex(path)
+    # Kanonik chunk kendi kopyası sayılmaz, kayıtlar çoğalmaz
+    assert resumed.assign(chunks) == decisions == [(None, "unique"), ("a_0", "exact"), (None, "unique")]
+    assert resumed.stats()["chunks"] == 3
+    resumed.close()
+
+
+def test_changed_chunk_text_is_decided_again(index):
+    index.assign([("a_0", NOTICE, meta("a.txt")), ("b_0", NOTICE, meta("b.txt"))])
+    assert index.assign([("b_0", OTHER, meta("b.txt"))]) == [(None, "unique")]
+
+
+def test_release_chains_through_orphaned_copies(index):
+    index.assign([("a_0", NOTICE, meta("a.txt"))])
+    # b'nin ilk chunk'ı a'nın kopyası, ikincisi kanonik; c de b'nin kanoniğinin kopyası
+    index.assign([("b_0", NOTICE, meta("b.txt")), ("b_1", OTHER, meta("b.txt"))])
+    index.assign([("c_0", OTHER, meta("c.txt"))])
+    index.assign([("d_0", NOTICE, meta("d.txt", APRIL))])
+
+    assert index.release(["a.txt"]) == {"b.txt", "c.txt"}
+    assert index.sources() == {"d.txt"}
+    # Serbest kalan dosyalar yeniden yüklenince yeni kanonikler seçilir
+    assert index.assign([("b_0", NOTICE, meta("b.txt"))]) == [(None, "unique")]
+
+
+def test_release_of_unrelated_file_has_no_orphans(index):
+    index.assign([("a_0", NOTICE, meta("a.txt")), ("b_0", NOTICE, meta("b.txt")), ("c_0", OTHER, meta("c.txt"))])
+    # b sadece kopya içeriyor; silinmesi kimseyi yetim bırakmaz
+    assert index.release(["b.txt"]) == set()
+    assert index.sources() == {"a.txt", "c.txt"}
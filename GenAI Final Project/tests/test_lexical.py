@@ -0,0 +1,99 @@
+"""`LexicalIndex` ve `HybridRetriever` testleri: BM25 araması ve kimlik numarası kısayolu.
+
+İndeks geçici klasörde `build_index` ile kurulur; Chroma koleksiyonu ve
+embedding modeli yerine bellek içi sahteleri kullanılır.
+"""
+import pytest
+
+from haberbot.lexical import HybridRetriever, LexicalIndex, build_index, identifier_terms
+
+CHUNKS = {
+    "k5510": "5510 sayılı Sosyal Sigortalar ve Genel Sağlık Sigortası Kanunu prim oranları değişti.",
+    "k7524": "7524 sayılı Kanun ile vergi usul kanununda değişiklik yapıldı.",
+    "karar": "Karar Sayısı: 2024/123 ile ithalat rejimi kararı yayımlandı.",
+    "ilan": "Kanun hükmünde kararname ile ilgili yönetmelik yayımlandı.",
+}
+
+
+class FakeCollection:
+    """Chroma koleksiyonunun retriever'ın kullandığı `get`/`query` alt kümesi."""
+
+    def __init__(self, chunks: dict):
+        self.chunks = chunks
+        self.queries = 0
+
+    def get(self, ids, include):
+        ids = [i for i in ids if i in self.chunks]
+        return {"ids": ids, "documents": [self.chunks[i] for i in ids], "metadatas": [{} for _ in ids]}
+
+    def query(self, query_embeddings, n_results, where, include):
+        self.queries += 1
+        # Vektör araması her zaman son eklenen chunk'ı en yakın bulur
+        ids = list(reversed(self.chunks))[:n_results]
+        return {"ids": [ids] * len(query_embeddings),
+                "documents": [[self.chunks[i] for i in ids]] * len(query_embeddings),
+                "metadatas": [[{} for _ in ids]] * len(query_embeddings)}
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        self.calls += 1
+        return [0.0, 1.0]
+
+
+@pytest.fixture
+def lexical(tmp_path):
+    build_index(CHUNKS.items(), str(tmp_path / "bm25"))
+    return LexicalIndex(str(tmp_path / "bm25"))
+
+
+@pytest.fixture
+def retriever(lexical):
+    return HybridRetriever(collection=FakeCollection(CHUNKS), embeddings=FakeEmbeddings(), lexical=lexical,
+                           k=2, fetch_k=4)
+
+
+def test_search_ranks_matching_chunk_first(lexical):
+    hits = lexical.search("sosyal sigortalar prim", 3)
+    assert hits[0][0] == "k5510"
+    assert all(score > 0 for _, score in hits)
+
+
+def test_term_and_chunk_lookup_without_python_dicts(lexical):
+    # Sözlük ikili aramayla bulunur; Türkçe karakterli terimler de UTF-8 bayt sırasında doğru yerde
+    assert lexical.term_id("sosya") is not None
+    assert lexical.term_id("sağlı") is not None
+    assert lexical.term_id("yokte") is None
+    assert [lexical.chunk_id(i) for i in range(len(CHUNKS))] == list(CHUNKS)
+
+
+def test_identifier_terms_only_take_numbers_from_identifier_patterns():
+    assert identifier_terms("2024 yılında 7524 sayılı Kanun ne getirdi?") == ["7524"]
+    assert identifier_terms("Karar Sayısı: 2024/123 nedir?") == ["2024/123"]
+    assert identifier_terms("Vergi kanunu ne diyor?") == []
+
+
+def test_identifier_in_index_skips_embedding(retriever):
+    docs = retriever.invoke("7524 sayılı Kanun ne getiriyor?")
+    assert docs[0].id == "k7524"
+    assert retriever.embeddings.calls == 0
+    assert retriever.collection.queries == 0
+
+
+def test_identifier_not_in_index_falls_back_to_hybrid(retriever):
+    # 9999 indekste yok; "sayılı"/"kanun" eşleşmeleri kimlik eşleşmesi sayılmamalı
+    assert retriever.lexical.identifier_search("9999 sayılı Kanun ne getiriyor?", 2) == []
+    docs = retriever.invoke("9999 sayılı Kanun ne getiriyor?")
+    assert retriever.embeddings.calls == 1
+    assert retriever.collection.queries == 1
+    assert "ilan" in [doc.id for doc in docs] # vektör sonucu da birleştirildi
+
+
+def test_search_batch_matches_invoke(retriever):
+    queries = ["7524 sayılı Kanun ne getiriyor?", "9999 sayılı Kanun ne getiriyor?"]
+    batch = retriever.search_batch(queries, [[0.0, 1.0]] * len(queries))
+    assert [[doc.id for doc in docs] for docs in batch] == \
+        [[doc.id for doc in retriever.invoke(query)] for query in queries]
@@ -0,0 +1,124 @@
+"""Soru kısıtları testleri: `parse_query_filters`, `where_mask` ve filtre gevşetme.
+
+Arama için Chroma yerine, `where` filtresini `where_mask` ile bellek içi
+chunk'lara uygulayan sahte bir retriever kullanılır.
+"""
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from haberbot.metadata import QueryFilters, filtered_search, metadata_column, parse_query_filters, where_mask
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("12.03.2024 tarihli Resmi Gazete'de ne var?", {"date_from": 20240312, "date_to": 20240312, "precision": "day"}),
+    ("12 Mart 2024 tarihli ilanlar", {"date_from": 20240312, "date_to": 20240312, "precision": "day",
+                                     "doc_type": "İlan"}),
+    ("Mart 2024'te yayımlanan tebliğ", {"date_from": 20240301, "date_to": 20240331, "precision": "month",
+                                        "doc_type": "Tebliğ"}),
+    ("2023 yılında yayımlanan yönetmelikler", {"date_from": 20230101, "date_to": 20231231, "precision": "year",
+                                               "doc_type": "Yönetmelik"}),
+    ("2023'te çıkan kararlar", {"date_from": 20230101, "date_to": 20231231, "precision": "year"}),
+    ("Resmi Gazete'de 2023 yılında hangi kararlar var?", {"date_from": 20230101, "date_to": 20231231,
+                                                          "precision": "year"}),
+    ("32456 sayılı Resmi Gazete'de neler var?", {"issue": 32456}),
+])
+def test_parse_query_filters(question, expected):
+    assert parse_query_filters(question).describe() == expected
+
+
+@pytest.mark.parametrize("question", [
+    "2024 yılı bütçe kanunu ne zaman yayınlandı?", # yıl konuyu anlatıyor, yayım tarihini değil
+    "1982 Anayasası değişikliği neleri kapsıyor?",
+    "2022 sayılı kanun neyi düzenliyor?",
+    "Karar Sayısı: 2024/123 nedir?",
+    "Yeni kararlar ilan edildi mi?", # "ilan edildi" belge türü değil
+])
+def test_questions_without_constraints(question):
+    assert not parse_query_filters(question)
+
+
+def test_issue_number_is_not_read_as_a_year():
+    filters = parse_query_filters("2023 sayılı Resmi Gazete'de neler var?")
+    assert filters.issue == 2023 and filters.date_from is None
+
+
+METADATAS = [
+    {"date": 20240312, "issue": 32456, "doc_type": "Tebliğ"},
+    {"date": 20240315, "issue": 32459, "doc_type": "İlan"},
+    {"date": 20231201, "doc_type": "Tebliğ"},
+    {},
+]
+
+
+def mask(where):
+    return where_mask(where, metadata_column(METADATAS), len(METADATAS)).tolist()
+
+
+def test_where_mask_operators():
+    assert mask({"doc_type": "Tebliğ"}) == [True, False, True, False]
+    assert mask({"$and": [{"date": {"$gte": 20240301}}, {"date": {"$lte": 20240331}}]}) == [True, True, False, False]
+    assert mask({"$or": [{"issue": 32459}, {"date": {"$lt": 20240101}}]}) == [False, True, True, False]
+    assert mask({"doc_type": {"$in": ["İlan", "Genelge"]}}) == [False, True, False, False]
+    # Eksik alanlar hiçbir koşulu, $ne ve $nin dahil, sağlamaz
+    assert mask({"issue": {"$ne": 32456}}) == [False, True, False, False]
+    assert mask({"doc_type": {"$nin": ["İlan"]}}) == [True, False, True, False]
+
+
+def test_where_mask_numeric_columns_with_nan():
+    column = lambda field: np.array([20240312.0, np.nan, 20231201.0])
+    assert where_mask({"date": {"$ne": 20240312}}, column, 3).tolist() == [False, False, True]
+    assert where_mask({"date": {"$gt": 20240101}}, column, 3).tolist() == [True, False, False]
+
+
+def test_where_mask_rejects_unknown_operator():
+    with pytest.raises(ValueError):
+        mask({"date": {"$regex": "2024"}})
+
+
+def test_relaxation_levels_drop_type_then_widen_date():
+    filters = parse_query_filters("12.03.2024 tarihli tebliğ")
+    assert filters.relaxation_levels() == [
+        {"$and": [{"date": 20240312}, {"doc_type": "Tebliğ"}]},
+        {"date": 20240312},
+        {"$and": [{"date": {"$gte": 20240301}}, {"date": {"$lte": 20240331}}]},
+        None,
+    ]
+    assert QueryFilters(issue=32456).relaxation_levels() == [{"issue": 32456}, None]
+
+
+class FakeRetriever:
+    """`invoke(soru, filter=where)` ile bellek içi chunk'ları süzen retriever."""
+
+    def __init__(self, metadatas, k=3):
+        self.docs = [Document(page_content=f"chunk {i}", metadata=m, id=str(i)) for i, m in enumerate(metadatas)]
+        self.k = k
+        self.filters = []
+
+    def invoke(self, question, filter=None):
+        self.filters.append(filter)
+        if filter is None:
+            return self.docs[:self.k]
+        keep = where_mask(filter, metadata_column([d.metadata for d in self.docs]), len(self.docs))
+        return [d for d, ok in zip(self.docs, keep) if ok][:self.k]
+
+
+def test_filtered_search_relaxes_until_enough_hits():
+    retriever = FakeRetriever(METADATAS)
+    docs = filtered_search(retriever, "12.03.2024 tarihli ilan", k=3, min_hits=2)
+    # Tam kısıt sonuçsuz, türsüz 1 sonuç, aya genişletince 2 sonuç -> durur
+    assert len(retriever.filters) == 3
+    assert [d.id for d in docs] == ["0", "1"]
+
+
+def test_filtered_search_keeps_stricter_hits_first():
+    retriever = FakeRetriever(METADATAS)
+    docs = filtered_search(retriever, "12.03.2024 tarihli tebliğ", k=3, min_hits=3)
+    assert retriever.filters[-1] is None
+    assert docs[0].id == "0" and len({d.id for d in docs}) == len(docs) == 3
+
+
+def test_unconstrained_question_is_not_filtered():
+    retriever = FakeRetriever(METADATAS)
+    filtered_search(retriever, "2024 yılı bütçe kanunu ne zaman yayınlandı?")
+    assert retriever.filters == [None]
@@ -0,0 +1,140 @@
+"""`NewsClient` testleri: devre kesici, TTL önbelleği, zaman aşımı ve 429 Retry-After.
+
+Gerçek NewsData.io yerine yerel `NewsStubServer` kullanılır; süreler
+testler hızlı bitsin diye `config` üzerinden kısaltılır.
+"""
+import time
+
+import pytest
+
+from haberbot import config
+from haberbot.news import CircuitBreaker, CircuitOpenError, NewsApiError, NewsClient
+from haberbot.news_stub import NewsStubServer
+
+
+@pytest.fixture
+def stub():
+    server = NewsStubServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def fast_config(monkeypatch):
+    monkeypatch.setattr(config, "NEWS_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(config, "NEWS_BREAKER_COOLDOWN", 0.2)
+    monkeypatch.setattr(config, "NEWS_CACHE_TTL", 0.2)
+    monkeypatch.setattr(config, "NEWS_READ_TIMEOUT", 0.3)
+
+
+@pytest.fixture
+def client(stub, fast_config):
+    news = NewsClient("test", base_url=stub.base_url)
+    yield news
+    news.close()
+
+
+def test_breaker_opens_after_consecutive_failures(stub, client):
+    stub.mode = "error"
+    for _ in range(config.NEWS_BREAKER_FAILURES):
+        with pytest.raises(NewsApiError):
+            client.search("dolar kuru")
+    assert client.breaker.is_open
+
+    # Açıkken API hiç çağrılmaz
+    before = stub.requests
+    with pytest.raises(CircuitOpenError):
+        client.search("dolar kuru")
+    assert stub.requests == before
+
+
+def test_breaker_half_open_trial_recovers(stub, client):
+    stub.mode = "error"
+    for _ in range(config.NEWS_BREAKER_FAILURES):
+        with pytest.raises(NewsApiError):
+            client.search("dolar kuru")
+    time.sleep(config.NEWS_BREAKER_COOLDOWN + 0.05)
+
+    stub.mode = "ok"
+    data = client.search("dolar kuru")
+    assert data["status"] == "success"
+    assert not client.breaker.is_open
+    assert client.breaker.allow()
+
+
+def test_breaker_half_open_trial_failure_reopens(stub, client):
+    stub.mode = "error"
+    for _ in range(config.NEWS_BREAKER_FAILURES):
+        with pytest.raises(NewsApiError):
+            client.search("dolar kuru")
+    time.sleep(config.NEWS_BREAKER_COOLDOWN + 0.05)
+
+    # Tek deneme isteği başarısız olursa devre hemen yeniden açılır
+    with pytest.raises(NewsApiError):
+        client.search("dolar kuru")
+    before = stub.requests
+    with pytest.raises(CircuitOpenError):
+        client.search("dolar kuru")
+    assert stub.requests == before
+
+
+def test_breaker_allows_single_trial_when_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.1)
+    assert breaker.allow()
+    assert not breaker.allow() # Deneme sürerken ikinci istek geçmez
+    breaker.record_success()
+    assert breaker.allow()
+
+
+def test_cache_hit_within_ttl(stub, client):
+    first = client.search("Dolar kuru?")
+    second = client.search("dolar kuru")
+    assert second == first
+    assert stub.requests == 1
+    assert client.cache_hits == 1
+
+
+def test_cache_expires_after_ttl(stub, client):
+    client.search("dolar kuru")
+    time.sleep(config.NEWS_CACHE_TTL + 0.05)
+    client.search("dolar kuru")
+    assert stub.requests == 2
+    assert client.cache_hits == 0
+
+
+def test_error_responses_are_not_cached(stub, client):
+    stub.mode = "error"
+    with pytest.raises(NewsApiError):
+        client.search("dolar kuru")
+    stub.mode = "ok"
+    client.search("dolar kuru")
+    assert stub.requests == 2
+
+
+def test_read_timeout(stub, client):
+    stub.mode = "hang"
+    stub.latency = 2.0
+    started = time.monotonic()
+    with pytest.raises(NewsApiError):
+        client.search("dolar kuru")
+    assert time.monotonic() - started < 1.5
+    assert client.breaker._failures == 1
+
+
+def test_rate_limit_opens_breaker_for_retry_after(stub, client):
+    stub.mode = "rate_limit" # Stub "Retry-After: 30" döndürür
+    with pytest.raises(NewsApiError, match="429"):
+        client.search("dolar kuru")
+    # Tek bir 429 eşiği beklemeden devreyi açar; süre varsayılan değil Retry-After'dır
+    assert client.breaker.is_open
+    assert client.breaker._open_until - time.monotonic() > config.NEWS_BREAKER_COOLDOWN + 20
+
+    time.sleep(config.NEWS_BREAKER_COOLDOWN + 0.05)
+    before = stub.requests
+    with pytest.raises(CircuitOpenError):
+        client.search("dolar kuru")
+    assert stub.requests == before
@@ -0,0 +1,56 @@
+"""`ThinkFilter` testleri: `<think>` bölümlerinin parça parça gelen metinden ayıklanması."""
+import pytest
+
+from haberbot.streaming import ThinkFilter
+
+
+def run(chunks):
+    think = ThinkFilter()
+    pieces = [think.feed(chunk) for chunk in chunks]
+    pieces.append(think.flush())
+    return pieces
+
+
+def test_think_section_is_removed():
+    assert "".join(run(["<think>akıl yürütme</think>Cevap burada."])) == "Cevap burada."
+
+
+@pytest.mark.parametrize("split", range(1, len("<think>x</think>Cevap")))
+def test_tags_split_at_any_position(split):
+    text = "<think>x</think>Cevap"
+    assert "".join(run([text[:split], text[split:]])) == "Cevap"
+
+
+def test_tags_split_into_single_characters():
+    assert "".join(run(list("Önce <think>gizli</think> sonra"))) == "Önce  sonra"
+
+
+def test_partial_open_tag_is_held_back_then_released():
+    think = ThinkFilter()
+    assert think.feed("Metin <thi") == "Metin "
+    # Etiket ön eki değilmiş; bekletilen kısım sonraki parçayla birlikte verilir
+    assert think.feed("s değil") == "<this değil"
+
+
+def test_visible_text_is_not_delayed():
+    think = ThinkFilter()
+    assert think.feed("Merhaba") == "Merhaba"
+    assert think.feed(" dünya") == " dünya"
+
+
+def test_leading_whitespace_after_think_is_stripped():
+    assert "".join(run(["<think>a</think>", "\n\n", "  Cevap"])) == "Cevap"
+
+
+def test_unclosed_think_is_dropped_on_flush():
+    assert "".join(run(["Cevap <think>yarım kalan düşünce"])) == "Cevap "
+
+
+def test_dangling_partial_tag_is_emitted_on_flush():
+    think = ThinkFilter()
+    assert think.feed("Cevap <") == "Cevap "
+    assert think.flush() == "<"
+
+
+def test_multiple_think_sections():
+    assert "".join(run(["A<think>1</think>B<thi", "nk>2</th", "ink>C"])) == "ABC"